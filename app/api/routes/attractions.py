@@ -1,23 +1,27 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, Form
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
 import os
 import uuid
 from datetime import datetime
 
 from app.db.session import SessionLocal
+from app.utils.uploads import ensure_upload_dir, save_upload_file
+from app.services.thumbnails import generate_derivatives
 
 # Defensive imports for heavy logic
 try:
     from app.db.crud_attractions import (
-        create_attraction, get_attraction, get_attractions, get_attractions_count,
-        get_recommended_attractions, update_attraction, delete_attraction, search_attractions
+        create_attraction, get_attraction, get_attractions, get_attractions_by_ids, get_attractions_count,
+        get_recommended_attractions, update_attraction, delete_attraction, search_attractions_page
     )
     from app.schemas.attraction import (
-        AttractionCreate, AttractionUpdate, AttractionResponse, AttractionListResponse
+        AttractionCreate, AttractionUpdate, AttractionResponse, AttractionListResponse, NearbyAttractionResponse
     )
     from app.utils.ui_templates import format_for_ui
-    from app.services.ahp import AHPCalculator
+    from app.services.ahp_ranking import ahp_ranking
+    from app.services.geo_index import format_distance, nearby_index
 except ImportError:
     # If imports fail (e.g. some dependency missing), we might be in a broken state
     # but we define mock classes/functions to let the file load.
@@ -53,9 +57,8 @@ def list_attractions(
     skip = (page - 1) * page_size
     
     if keyword:
-        # 搜索模式
-        items = search_attractions(db, keyword, limit=page_size)
-        total = len(items)  # 简化处理，实际可优化为分页搜索
+        # 搜索模式：全文索引按相关度排序并分页，total 为命中总数
+        items, total = search_attractions_page(db, keyword, skip=skip, limit=page_size)
     else:
         # 普通列表模式
         items = get_attractions(db, skip=skip, limit=page_size, is_recommended=is_recommended, category=category)
@@ -79,28 +82,31 @@ def get_recommend_attractions(
 ):
     """获取推荐景点列表（供小程序调用，支持 AHP 加权）"""
     if ahp_at and ahp_tc and ahp_ac:
-        # AHP 模式
-        # 1. 获取所有推荐候选
-        candidates = get_attractions(db, limit=100, is_recommended=True)
-        
-        # 2. 计算权重
-        try:
-            weights = AHPCalculator.calculate_weights(ahp_at, ahp_tc, ahp_ac)
-            
-            # 3. 计算得分并排序
-            candidates.sort(
-                key=lambda x: AHPCalculator.calculate_score(x, weights),
-                reverse=True
-            )
-        except Exception:
-            # Fallback if AHP fails
-            pass
-        
-        return candidates[:limit]
-        
+        # AHP 模式：全部推荐景点的得分矩阵与缓存的权重向量相乘，取前 limit 个
+        return get_attractions_by_ids(db, ahp_ranking.rank(db, ahp_at, ahp_tc, ahp_ac, limit))
+
     return get_recommended_attractions(db, limit=limit)
 
 
+@router.get("/attractions/nearby", response_model=List[NearbyAttractionResponse])
+def get_nearby_attractions(
+    lat: float = Query(..., ge=-90, le=90, description="纬度"),
+    lon: float = Query(..., ge=-180, le=180, description="经度"),
+    radius: float = Query(5.0, gt=0, le=500, description="搜索半径（公里）"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量"),
+    db: Session = Depends(get_db)
+):
+    """按球面距离返回半径内最近的景点，distance 为实时计算的距离"""
+    hits = nearby_index.nearest(db, lat, lon, radius, limit)
+    km = dict(hits)
+    return [
+        NearbyAttractionResponse.model_validate(a).model_copy(
+            update={"distance": format_distance(km[a.id]), "distance_km": round(km[a.id], 3)}
+        )
+        for a in get_attractions_by_ids(db, [aid for aid, _ in hits])
+    ]
+
+
 @router.get("/attractions/{attraction_id}", response_model=AttractionResponse)
 def get_attraction_detail(attraction_id: int, db: Session = Depends(get_db)):
     """获取景点详情"""
@@ -144,24 +150,18 @@ async def upload_attraction_image(file: UploadFile = File(...)):
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="请上传图片文件")
     
-    # 创建上传目录
-    upload_dir = "storage/attractions"
-    try:
-        os.makedirs(upload_dir, exist_ok=True)
-    except Exception:
-        # Vercel fallback
-        upload_dir = "/tmp"
+    # 创建上传目录（Vercel fallback: /tmp）
+    upload_dir = ensure_upload_dir("storage/attractions")
     
     # 生成唯一文件名
     file_extension = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
     unique_filename = f"{uuid.uuid4().hex}{file_extension}"
     file_path = os.path.join(upload_dir, unique_filename)
     
-    # 保存文件
+    # 保存文件（流式写入，超过 UPLOAD_MAX_BYTES 返回 413）
     try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        await save_upload_file(file, file_path)
+        await run_in_threadpool(generate_derivatives, file_path)
         
         # 返回相对路径，供前端使用
         return {
@@ -169,6 +169,8 @@ async def upload_attraction_image(file: UploadFile = File(...)):
             "file_path": f"/static/attractions/{unique_filename}",
             "message": "图片上传成功"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"图片上传失败: {str(e)}")
 
@@ -188,13 +190,8 @@ async def upload_attraction_cover(
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="请上传图片文件")
     
-    # 创建上传目录
-    upload_dir = "storage/attractions"
-    try:
-        os.makedirs(upload_dir, exist_ok=True)
-    except Exception:
-        # Vercel fallback
-        upload_dir = "/tmp"
+    # 创建上传目录（Vercel fallback: /tmp）
+    upload_dir = ensure_upload_dir("storage/attractions")
     
     # 生成唯一文件名
     file_extension = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
@@ -202,9 +199,8 @@ async def upload_attraction_cover(
     file_path = os.path.join(upload_dir, unique_filename)
     
     try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        await save_upload_file(file, file_path)
+        await run_in_threadpool(generate_derivatives, file_path)
         
         # 更新景点封面图片路径
         cover_url = f"/static/attractions/{unique_filename}"
@@ -217,5 +213,7 @@ async def upload_attraction_cover(
             "cover_image": cover_url,
             "message": "封面图片上传成功"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"图片上传失败: {str(e)}")
\ No newline at end of file
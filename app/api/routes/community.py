@@ -1,19 +1,22 @@
 import os
-import shutil
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from datetime import datetime
 
 from app.db.session import SessionLocal, engine
+from app.utils.uploads import ensure_upload_dir, store_upload
+from app.services.thumbnails import generate_derivatives
+from app.utils.thumbnail_urls import thumbnail_url
 
 # Defensive imports
 try:
     from app.db.models_community import CommunityPost
-    from app.utils.oss import upload_file_to_oss
+    from app.db.crud_community import get_like_counts, get_posts_page, increment_likes
+    from app.services.community_feed import like_counter, trending_cache
+    from app.utils.oss import upload_path_to_oss
 except ImportError:
     pass
 
@@ -30,6 +33,12 @@ class PostResponse(BaseModel):
     likes: int
     created_at: datetime
 
+    @computed_field
+    @property
+    def thumbnail_url(self) -> str:
+        """信息流卡片用缩略图；未生成时回退原图"""
+        return thumbnail_url(self.image_url) or self.image_url
+
     class Config:
         from_attributes = True
 
@@ -50,9 +59,37 @@ except Exception:
     # Fallback to /tmp only when actually writing.
     pass
 
+def _with_current_likes(db: Session, posts) -> List[PostResponse]:
+    """点赞数取库中最新值并叠加尚未写库的缓冲点赞（热门榜缓存中的帖子点赞数可能已过时）"""
+    likes = like_counter.counts(lambda ids: get_like_counts(db, ids), [p.id for p in posts])
+    out = []
+    for p in posts:
+        item = PostResponse.model_validate(p)
+        if p.id in likes and likes[p.id] != item.likes:
+            item = item.model_copy(update={"likes": likes[p.id]})
+        out.append(item)
+    return out
+
 @router.get("/posts", response_model=List[PostResponse])
-def get_posts(db: Session = Depends(get_db)):
-    return db.query(CommunityPost).order_by(desc(CommunityPost.created_at)).all()
+def get_posts(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    db: Session = Depends(get_db)
+):
+    """按发布时间倒序分页；还有下一页时在响应头 X-Next-Cursor 返回游标"""
+    try:
+        posts, next_cursor = get_posts_page(db, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return _with_current_likes(db, posts)
+
+@router.get("/posts/trending", response_model=List[PostResponse])
+def get_trending_posts(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """热门帖子（周期性重算的缓存榜单，点赞数为实时值）"""
+    return _with_current_likes(db, trending_cache.get(like_counter)[:limit])
 
 @router.post("/posts", response_model=PostResponse)
 def create_post(
@@ -61,36 +98,32 @@ def create_post(
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
+    # 先流式落盘（超过 UPLOAD_MAX_BYTES 返回 413），OSS 再从该文件上传，不再整体读入内存
+    file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
+    filename = f"{uuid.uuid4()}.{file_ext}"
+    
+    # Use /tmp for Vercel if storage not available
+    final_dir = ensure_upload_dir(UPLOAD_DIR)
+    file_path = os.path.join(final_dir, filename)
+    
+    store_upload(file, file_path)
+    
     image_url = None
     
     # Try OSS Upload first
     if os.getenv("ALIYUN_OSS_BUCKET"):
         try:
-            image_url = upload_file_to_oss(file.file, file.filename)
+            image_url = upload_path_to_oss(file_path, file.filename)
         except Exception:
             pass
+        if image_url:
+            os.remove(file_path)
         
     # Fallback to local storage if OSS fails or not configured
     if not image_url:
-        file.file.seek(0) # Reset cursor
-        file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-        filename = f"{uuid.uuid4()}.{file_ext}"
-        
-        # Use /tmp for Vercel if storage not available
-        final_dir = UPLOAD_DIR
-        try:
-            if not os.path.exists(final_dir):
-                os.makedirs(final_dir, exist_ok=True)
-        except Exception:
-            final_dir = "/tmp"
-            
-        file_path = os.path.join(final_dir, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
         # Note: URL depends on static mount in main.py
         image_url = f"/static/community/{filename}"
+        generate_derivatives(file_path)
     
     new_post = CommunityPost(
         image_url=image_url,
@@ -104,9 +137,12 @@ def create_post(
 
 @router.post("/posts/{post_id}/like")
 def like_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(CommunityPost).filter(CommunityPost.id == post_id).first()
-    if not post:
+    if not like_counter.buffered:
+        likes = increment_likes(db, post_id)
+        if likes is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return {"likes": likes}
+    likes = like_counter.add_and_count(post_id, lambda ids: get_like_counts(db, ids))
+    if likes is None:
         raise HTTPException(status_code=404, detail="Post not found")
-    post.likes += 1
-    db.commit()
-    return {"likes": post.likes}
+    return {"likes": likes}
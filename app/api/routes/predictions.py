@@ -1,17 +1,23 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from typing import List
 from sqlalchemy.orm import Session
 
 from app.schemas.prediction import LakePrediction, RealtimeIndex, BestRealtimeResponse, BestTodayResponse
-from app.services.weather_client import get_forecast
+from app.services.weather_client import get_forecast, get_forecast_async
 from app.services.prediction_model import predict_for_lakes
-from app.services.realtime_index import compute_and_store_realtime_index
+from app.services.realtime_index import compute_and_store_realtime_index, compute_realtime_indices
+from app.services.prediction_snapshot import PredictionSnapshot, etag_matches, get_snapshot, publish_snapshot
 from app.db.session import SessionLocal
 from app.db.crud import get_latest_predictions
 from app.db.crud_realtime import save_realtime_index
+from app.services.analysis_pool import AnalysisQueueFull, ImageDecodeError, analysis_stats, submit_upload_analysis
+from app.capture.snapshot_catalog import record_snapshot
+from app.utils.uploads import ensure_upload_dir, save_upload_file
+import asyncio
 import os
+import weakref
 from datetime import datetime
-import numpy as np
 
 try:
     import cv2
@@ -27,21 +33,95 @@ LAKES = [
 ]
 
 
+def get_all_lakes_dict(db: Session) -> List[dict]:
+    """从数据库加载全部点位（与定时任务一致），为空时回退内置湖区列表。"""
+    from app.db.models_poi import PointOfInterest
+
+    pois = db.query(PointOfInterest).all()
+    return [{"id": p.id, "name": p.name} for p in pois] or LAKES
+
+
+def _load_latest_predictions() -> List[LakePrediction]:
+    db: Session = SessionLocal()
+    try:
+        return get_latest_predictions(db)
+    finally:
+        db.close()
+
+
+def _load_predictions_and_lakes():
+    db: Session = SessionLocal()
+    try:
+        return get_latest_predictions(db), get_all_lakes_dict(db)
+    finally:
+        db.close()
+
+
+# 快照重建的单飞锁（按事件循环各一把：asyncio.Lock 只能在同一个事件循环内使用）
+_rebuild_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _rebuild_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _rebuild_locks.get(loop)
+    if lock is None:
+        lock = _rebuild_locks[loop] = asyncio.Lock()
+    return lock
+
+
+async def _current_snapshot() -> PredictionSnapshot:
+    """读取预渲染快照；尚未构建（如未启动定时任务）或已过期时现场构建一次，并发请求只有一个执行重建。"""
+    snap = get_snapshot()
+    if snap is not None:
+        return snap
+    async with _rebuild_lock():
+        # 等锁期间其他请求可能已重建完成
+        snap = get_snapshot()
+        if snap is None:
+            # 数据库查询与快照构建（Pydantic 组装、JSON 序列化）放入线程池，天气预报在事件循环上异步获取
+            preds, lakes = await run_in_threadpool(_load_predictions_and_lakes)
+            forecast = await get_forecast_async(days=2)
+            snap = await run_in_threadpool(publish_snapshot, preds, lakes, forecast, LAKES)
+    return snap
+
+
+def _json_with_etag(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/today", response_model=List[LakePrediction])
-def get_today_prediction():
+async def get_today_prediction(request: Request):
+    # 直接返回预序列化的快照（含reason与factors）；DB为空时快照内为实时计算结果
+    snap = await _current_snapshot()
+    return _json_with_etag(request, snap.today_body, snap.today_etag)
+
+
+@router.get("/windows", response_model=List[LakePrediction])
+def get_window_predictions(
+    days: int = Query(1, ge=1, le=7, description="预测天数（最多7天）"),
+    window_hours: int = Query(2, ge=1, le=12, description="拍摄窗口长度（小时）"),
+    top_k: int = Query(3, ge=1, le=10, description="每个湖区返回的互不重叠窗口数"),
+):
+    """多日视野下各湖区的前 K 个最佳拍摄窗口（实时计算，不写库）"""
     db: Session = SessionLocal()
     try:
-        preds = get_latest_predictions(db)
-        forecast = get_forecast(days=2)
-        if preds:
-            # 数据库存在：补充reason与factors
-            from app.services.prediction_model import attach_explanations
-            return attach_explanations(preds, forecast)
-        # Fallback: 若DB为空，实时计算一批（含reason/factors）
-        preds = predict_for_lakes(LAKES, forecast, hours=24)
-        return preds
+        lakes = get_all_lakes_dict(db)
     finally:
         db.close()
+    forecast = get_forecast(days=days)
+    return predict_for_lakes(lakes, forecast, hours=days * 24, window_hours=window_hours, top_k=top_k)
+
+
+# 注意：/realtime/best 必须在 /realtime/{lake_id} 之前注册，否则 "best" 会被当作 lake_id 解析
+@router.get("/realtime/best", response_model=BestRealtimeResponse)
+def get_best_realtime():
+    """计算并返回当前3个湖区的实时指数及最佳项（并行分析，单事务写库）"""
+    indexes = compute_realtime_indices([l["id"] for l in LAKES])
+    best = max(indexes, key=lambda x: x.score)
+    return BestRealtimeResponse(best=best, all=indexes)
 
 
 @router.get("/realtime/{lake_id}", response_model=RealtimeIndex)
@@ -50,35 +130,44 @@ def get_realtime(lake_id: int):
     return idx
 
 
-@router.get("/realtime/best", response_model=BestRealtimeResponse)
-def get_best_realtime():
-    """计算并返回当前3个湖区的实时指数及最佳项"""
-    indexes = [compute_and_store_realtime_index(l["id"]) for l in LAKES]
-    best = max(indexes, key=lambda x: x.score)
-    return BestRealtimeResponse(best=best, all=indexes)
+def _snapshot_path(lake_id: int) -> str:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Vercel read-only fallback
+    dir_path = ensure_upload_dir("storage/snapshots")
+    return os.path.join(dir_path, f"lake{lake_id}_{ts}.jpg")
+
+
+def _load_latest_sensor(lake_id: int):
+    from app.db.crud_sensor import get_latest_sensor_reading
+
+    db: Session = SessionLocal()
+    try:
+        return get_latest_sensor_reading(db, lake_id)
+    finally:
+        db.close()
+
+
+def _save_upload_index(lake_id: int, score: int, file_path: str, captured_at: datetime):
+    db: Session = SessionLocal()
+    try:
+        save_realtime_index(db, lake_id, f"{lake_id}号盐湖", score, file_path, captured_at)
+    finally:
+        db.close()
 
 
 @router.post("/upload_snapshot", response_model=RealtimeIndex)
 async def upload_snapshot(lake_id: int = Form(...), file: UploadFile = File(...)):
     try:
-        contents = await file.read()
-        if not contents:
+        # 流式落盘（边写边算 SHA-1，超限 413），内存占用与文件大小无关
+        saved = await save_upload_file(file, _snapshot_path(lake_id))
+        file_path = saved.path
+        if not saved.size:
+            os.remove(file_path)
             raise HTTPException(status_code=400, detail="空文件")
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        dir_path = "storage/snapshots"
-        try:
-            os.makedirs(dir_path, exist_ok=True)
-        except Exception:
-            # Vercel read-only fallback
-            dir_path = "/tmp"
-            
-        filename = f"lake{lake_id}_{ts}.jpg"
-        file_path = os.path.join(dir_path, filename)
-        with open(file_path, "wb") as f:
-            f.write(contents)
-            
+
         # Check OpenCV availability
         if cv2 is None:
+            record_snapshot(lake_id, file_path)
              # Serverless fallback: Return a mock success response
             return RealtimeIndex(
                 lake_id=lake_id,
@@ -89,30 +178,42 @@ async def upload_snapshot(lake_id: int = Form(...), file: UploadFile = File(...)
                 reason="Serverless模式：图片已接收，但OpenCV未安装，跳过分析。",
                 factors={"image_analysis": {"mock": True}},
             )
-            
-        # 直接在内存中解码并分析
-        arr = np.frombuffer(contents, dtype=np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise HTTPException(status_code=400, detail="无法解码图片")
-        from app.services.image_analysis import (
-            compute_color_features,
-            score_from_features,
-            build_reason_from_features,
-        )
-        feats = compute_color_features(img)
-        img_score = score_from_features(feats)
-        reason_img = build_reason_from_features(feats)
+
+        from app.services.feature_cache import feature_cache, digest_key, file_key
+
+        # 同一内容重复上传时直接复用分析结果；否则交给有界进程池直接从落盘文件解码并分析，
+        # 事件循环只等待结果，不再被大图阻塞。队列已满时删除刚写入的文件并拒绝。
+        cache_key = digest_key(saved.sha1)
+        analysis = feature_cache.get(cache_key)
+        future = None
+        if analysis is None:
+            try:
+                future = submit_upload_analysis(file_path)
+            except AnalysisQueueFull:
+                os.remove(file_path)
+                raise HTTPException(status_code=429, detail="图像分析繁忙，请稍后重试", headers={"Retry-After": "1"})
+        record_snapshot(lake_id, file_path)
+        if future is not None:
+            try:
+                analysis, _ = await asyncio.wrap_future(future)
+            except ImageDecodeError:
+                raise HTTPException(status_code=400, detail="无法解码图片")
+            feature_cache.put(cache_key, analysis)
+            # 刚落盘的截图也登记，后续 /realtime/{lake_id} 轮询无需再次分析
+            saved_key = file_key(file_path)
+            if saved_key:
+                feature_cache.put(saved_key, analysis)
+        feats = analysis["features"]
+        img_score = analysis["score"]
+        reason_img = analysis["reason"]
 
         # 天气评分融合（取上传时刻附近两小时窗口）
-        from app.services.weather_client import get_forecast
         from app.services.prediction_model import deep_weather_score, build_weather_reason_and_factors
-        forecast = get_forecast(days=1)
-        hours = forecast.get("hours", [])
-        if hours:
-            # 简单取最后两个小时作为近似窗口
-            h1 = hours[max(0, len(hours) - 2)]
-            h2 = hours[-1]
+        from app.services.forecast_index import forecast_index
+        forecast = await get_forecast_async(days=1)
+        index = forecast_index(forecast)
+        if len(index):
+            h1, h2 = index.nearest_pair(datetime.now())
             w_score = (deep_weather_score(h1) + deep_weather_score(h2)) / 2
             w_reason, w_factors = build_weather_reason_and_factors(h1, h2)
         else:
@@ -125,13 +226,7 @@ async def upload_snapshot(lake_id: int = Form(...), file: UploadFile = File(...)
         final_factors.update(w_factors)
 
         # 融合现场传感器数据（如有）
-        from app.db.session import SessionLocal as _SessionLocal
-        from app.db.crud_sensor import get_latest_sensor_reading
-        db_s = _SessionLocal()
-        try:
-            sensor = get_latest_sensor_reading(db_s, lake_id)
-        finally:
-            db_s.close()
+        sensor = await run_in_threadpool(_load_latest_sensor, lake_id)
         if sensor:
             s = {
                 "air_temp": sensor.air_temp,
@@ -169,12 +264,8 @@ async def upload_snapshot(lake_id: int = Form(...), file: UploadFile = File(...)
             if parts:
                 final_reason = final_reason + " 现场监测参考：" + "、".join(parts) + "。"
         # 写库
-        db: Session = SessionLocal()
         captured_at = datetime.now()
-        try:
-            save_realtime_index(db, lake_id, f"{lake_id}号盐湖", final_score, file_path, captured_at)
-        finally:
-            db.close()
+        await run_in_threadpool(_save_upload_index, lake_id, final_score, file_path, captured_at)
         return RealtimeIndex(
             lake_id=lake_id,
             lake_name=f"{lake_id}号盐湖",
@@ -190,22 +281,16 @@ async def upload_snapshot(lake_id: int = Form(...), file: UploadFile = File(...)
         raise HTTPException(status_code=500, detail=f"上传处理失败: {e}")
 
 
+@router.get("/analysis_stats")
+def get_analysis_stats():
+    """上传图像分析队列的深度、拒绝数与各阶段耗时（排队/解码/分析/总计），以及特征缓存命中情况"""
+    from app.services.feature_cache import feature_cache
+
+    return {**analysis_stats(), "feature_cache": feature_cache.stats()}
+
+
 @router.get("/today/best", response_model=BestTodayResponse)
-def get_today_best():
-    """返回当天预测的最佳湖区及完整列表（含原因/因素）"""
-    db: Session = SessionLocal()
-    try:
-        preds = get_latest_predictions(db)
-        forecast = get_forecast(days=2)
-        lakes = get_all_lakes_dict(db)
-        
-        if preds and len(preds) >= len(lakes):
-            from app.services.prediction_model import attach_explanations
-            preds = attach_explanations(preds, forecast)
-        else:
-            preds = predict_for_lakes(lakes, forecast, hours=24)
-            
-        best = max(preds, key=lambda x: x.score)
-        return BestTodayResponse(best=best, all=preds)
-    finally:
-        db.close()
\ No newline at end of file
+async def get_today_best(request: Request):
+    """返回当天预测的最佳湖区及完整列表（含原因/因素），来自预渲染快照"""
+    snap = await _current_snapshot()
+    return _json_with_etag(request, snap.best_body, snap.best_etag)
@@ -1,13 +1,33 @@
-from fastapi import APIRouter, HTTPException
+import json
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from app.db.session import SessionLocal
 
 # Defensive imports
 try:
-    from app.schemas.sensor import SensorReadingCreate, SensorReadingResponse
-    from app.db.crud_sensor import save_sensor_reading, get_latest_sensor_reading
+    from app.schemas.sensor import (
+        SensorReadingCreate,
+        SensorReadingResponse,
+        SensorBatchResult,
+        SensorSeriesPoint,
+        SensorSeriesResponse,
+    )
+    from app.db.crud_sensor import (
+        ROLLUP_RESOLUTIONS,
+        SENSOR_BATCH_CHUNK,
+        SENSOR_FIELDS,
+        get_sensor_series,
+        save_sensor_reading,
+        save_sensor_readings,
+        sensor_row,
+        get_latest_sensor_reading,
+    )
 except ImportError:
     pass
 
@@ -20,7 +40,7 @@ def ingest_sensor(payload: SensorReadingCreate):
         captured_at = None
         if payload.captured_at:
             try:
-                captured_at = datetime.fromisoformat(payload.captured_at)
+                captured_at = _parse_captured_at(payload.captured_at)
             except Exception:
                 captured_at = None
         rec = save_sensor_reading(
@@ -54,6 +74,150 @@ def ingest_sensor(payload: SensorReadingCreate):
     finally:
         db.close()
 
+# 单次批量请求允许的最大行数：JSON 数组超出时返回 413（不写入任何行）；
+# NDJSON 边收边写，超出时停止读取，已接收的行照常写入，响应的 truncated_at 为第一条未处理的行号
+SENSOR_BATCH_MAX_ROWS = int(os.getenv("SENSOR_BATCH_MAX_ROWS", "100000"))
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    """带时区的时间转为 UTC 并去掉时区；库中传感器时间与 utcnow() 默认值一致，均为无时区的 UTC。"""
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _parse_captured_at(value: str) -> datetime:
+    """解析上报时间（带时区的统一转为 UTC），与库中其它无时区的时间可比较。"""
+    return _to_utc_naive(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _parse_row(item) -> dict:
+    """校验一行上报数据并转换为 sensor_readings 行；非法时抛出 ValueError。"""
+    try:
+        payload = SensorReadingCreate.model_validate(item)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    captured_at = None
+    if payload.captured_at:
+        # 离线缓存的数据必须带有效时间，批量接口不回退为当前时间
+        try:
+            captured_at = _parse_captured_at(payload.captured_at)
+        except ValueError:
+            raise ValueError(f"captured_at: 无法解析的时间 {payload.captured_at!r}")
+    return sensor_row(payload.lake_id, captured_at, *(getattr(payload, f) for f in SENSOR_FIELDS))
+
+
+def _write_chunk(rows: list):
+    db: Session = SessionLocal()
+    try:
+        save_sensor_readings(db, rows)
+    finally:
+        db.close()
+
+
+class _BatchWriter:
+    """累积合法行，每满一个 chunk 写库一次；记录逐行错误。"""
+
+    def __init__(self):
+        self.pending: list = []
+        self.pending_idx: list = []
+        self.accepted = 0
+        self.errors: list = []
+        self.total = 0
+        self.truncated_at: Optional[int] = None
+
+    @property
+    def full(self) -> bool:
+        return self.total >= SENSOR_BATCH_MAX_ROWS
+
+    def add(self, index: int, item):
+        self.total += 1
+        try:
+            self.pending.append(_parse_row(item))
+            self.pending_idx.append(index)
+        except ValueError as e:
+            self.errors.append({"index": index, "error": str(e)})
+
+    def reject(self, index: int, error: str):
+        self.total += 1
+        self.errors.append({"index": index, "error": error})
+
+    async def flush(self, force: bool = False):
+        if not self.pending or (not force and len(self.pending) < SENSOR_BATCH_CHUNK):
+            return
+        rows, idx = self.pending, self.pending_idx
+        self.pending, self.pending_idx = [], []
+        try:
+            await run_in_threadpool(_write_chunk, rows)
+            self.accepted += len(rows)
+        except Exception as e:
+            self.errors.extend({"index": i, "error": f"写库失败: {e}"} for i in idx)
+
+    def result(self) -> SensorBatchResult:
+        self.errors.sort(key=lambda err: err["index"])
+        return SensorBatchResult(
+            accepted=self.accepted, rejected=len(self.errors), errors=self.errors, truncated_at=self.truncated_at
+        )
+
+
+@router.post("/sensors/ingest/batch", response_model=SensorBatchResult)
+async def ingest_sensor_batch(request: Request):
+    """
+    批量上报传感器数据（供离线缓存后补传的采集终端使用）。
+    - application/json：SensorReadingCreate 数组；
+    - application/x-ndjson：每行一个 SensorReadingCreate，边接收边分块写库；
+      超过 SENSOR_BATCH_MAX_ROWS 行时停止读取，truncated_at 为第一条未处理的行号，客户端从该行续传。
+    每块一次 executemany；非法行不影响其它行，逐行返回错误。
+    """
+    writer = _BatchWriter()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        buf = b""
+        index = 0
+
+        async def handle(line: bytes) -> bool:
+            """处理一行；已达行数上限时返回 False。"""
+            nonlocal index
+            if not line.strip():
+                return True
+            if writer.full:
+                writer.truncated_at = index
+                return False
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                writer.reject(index, f"JSON解析失败: {e}")
+            else:
+                writer.add(index, item)
+            index += 1
+            await writer.flush()
+            return True
+
+        async def consume() -> None:
+            nonlocal buf
+            async for chunk in request.stream():
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for line in lines:
+                    if not await handle(line):
+                        return
+            await handle(buf)
+
+        await consume()
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"JSON解析失败: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="请求体应为数组")
+        if len(items) > SENSOR_BATCH_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"单次最多上报{SENSOR_BATCH_MAX_ROWS}行")
+        for i, item in enumerate(items):
+            writer.add(i, item)
+            await writer.flush()
+    await writer.flush(force=True)
+    return writer.result()
+
+
 @router.get("/sensors/latest/{lake_id}", response_model=SensorReadingResponse)
 def latest_sensor(lake_id: int):
     db: Session = SessionLocal()
@@ -62,7 +226,7 @@ def latest_sensor(lake_id: int):
         if not rec:
             raise HTTPException(status_code=404, detail="暂无传感器数据")
         return SensorReadingResponse(
-            id=rec.id,
+            id=rec.reading_id,
             lake_id=rec.lake_id,
             captured_at=rec.captured_at.isoformat(),
             air_temp=rec.air_temp,
@@ -75,4 +239,59 @@ def latest_sensor(lake_id: int):
             turbidity=rec.turbidity,
         )
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# 单次区间查询最多返回的时间桶数；resolution=auto 时选不超过该数量的最细粒度
+SENSOR_SERIES_MAX_POINTS = int(os.getenv("SENSOR_SERIES_MAX_POINTS", "2000"))
+
+
+@router.get("/sensors/{lake_id}/series", response_model=SensorSeriesResponse)
+def sensor_series(
+    lake_id: int,
+    start: datetime = Query(..., alias="from", description="起始时间（ISO）"),
+    end: Optional[datetime] = Query(None, alias="to", description="结束时间（ISO，默认当前）"),
+    resolution: str = Query("auto", pattern="^(auto|1m|1h|1d)$", description="聚合粒度"),
+    metrics: Optional[str] = Query(None, description="逗号分隔的指标名，默认全部"),
+):
+    """传感器历史曲线：只读 1m/1h/1d 预聚合，不扫描原始数据。"""
+    # 预聚合按无时区的 UTC 存储：带时区的参数先换算为 UTC，而不是直接丢弃偏移
+    start = _to_utc_naive(start)
+    end = _to_utc_naive(end) if end else datetime.utcnow()
+    if end <= start:
+        raise HTTPException(status_code=400, detail="to 必须晚于 from")
+    span = (end - start).total_seconds()
+    if resolution == "auto":
+        resolution = next(
+            (r for r, sec in ROLLUP_RESOLUTIONS.items() if span / sec <= SENSOR_SERIES_MAX_POINTS), "1d"
+        )
+    elif span / ROLLUP_RESOLUTIONS[resolution] > SENSOR_SERIES_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"时间范围过大，{resolution} 粒度最多{SENSOR_SERIES_MAX_POINTS}个点，请选择更粗的粒度")
+    wanted = None
+    if metrics:
+        wanted = [m.strip() for m in metrics.split(",") if m.strip()]
+        unknown = set(wanted) - set(SENSOR_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知指标: {', '.join(sorted(unknown))}")
+
+    db: Session = SessionLocal()
+    try:
+        buckets = get_sensor_series(db, lake_id, resolution, start, end, wanted)
+    finally:
+        db.close()
+    points: dict = {}
+    for b in buckets:
+        stats = points.setdefault(b.bucket_start, {})
+        stats[b.metric] = {
+            "min": b.min_value,
+            "max": b.max_value,
+            "avg": b.sum_value / b.count if b.count else 0.0,
+            "count": b.count,
+        }
+    return SensorSeriesResponse(
+        lake_id=lake_id,
+        resolution=resolution,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        points=[SensorSeriesPoint(t=t.isoformat(), metrics=m) for t, m in points.items()],
+    )
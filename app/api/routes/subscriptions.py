@@ -21,7 +21,7 @@ def subscribe(payload: SubscriptionCreate):
             "message": "订阅成功",
             "data": {
                 "openid": sub.openid,
-                "lake_ids": sub.lake_ids,
+                "lake_ids": ",".join(str(x) for x in dict.fromkeys(payload.lake_ids)),
                 "threshold": sub.threshold,
                 "created_at": sub.created_at.isoformat() if sub.created_at else None,
             },
@@ -2,12 +2,13 @@ from fastapi import APIRouter
 from datetime import datetime
 from typing import Dict, Any
 
-from app.services.weather_client import get_forecast
+from app.services.weather_client import get_forecast_async, get_forecast_cache_stats
+from app.services.forecast_index import forecast_index
 
 router = APIRouter()
 
 @router.get("/now2h")
-def get_now_and_next2h() -> Dict[str, Any]:
+async def get_now_and_next2h() -> Dict[str, Any]:
     """返回当前小时和未来两个小时的天气要素。
     依赖服务器端和风天气配置，避免在小程序暴露密钥。
     返回示例：
@@ -17,15 +18,22 @@ def get_now_and_next2h() -> Dict[str, Any]:
       "next2h": [{ ... }, { ... }]
     }
     """
-    fc = get_forecast(days=1)
-    hours = fc.get("hours", [])
+    fc = await get_forecast_async(days=1)
+    index = forecast_index(fc)
     result: Dict[str, Any] = {
         "source": fc.get("source", "HeWeather"),
         "now": None,
         "next2h": []
     }
-    if hours:
-        # 取列表前3个作为当前与后续两小时（若不足自动裁剪）
-        result["now"] = hours[0]
-        result["next2h"] = hours[1:3]
-    return result
\ No newline at end of file
+    if len(index):
+        # 当前时刻所在小时及其后两小时（缓存中的预报可能已过去若干小时）；预报末尾不足时取最后三小时
+        idx = min(index.current_index(), max(0, len(index) - 3))
+        result["now"] = index.hours[idx]
+        result["next2h"] = index.hours[idx + 1:idx + 3]
+    return result
+
+
+@router.get("/cache_stats")
+def get_cache_stats() -> Dict[str, Any]:
+    """天气预报缓存的命中/未命中/合并/后台刷新计数。"""
+    return get_forecast_cache_stats()
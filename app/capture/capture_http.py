@@ -1,7 +1,9 @@
 import os
-import requests
 from datetime import datetime
 
+from app.capture.snapshot_catalog import record_snapshot
+from app.utils.http_pool import get_session
+
 
 def http_snapshot_once(url: str, lake_id: int, output_dir: str = "storage/snapshots") -> str | None:
     """
@@ -10,7 +12,7 @@ def http_snapshot_once(url: str, lake_id: int, output_dir: str = "storage/snapsh
     """
     os.makedirs(output_dir, exist_ok=True)
     try:
-        resp = requests.get(url, timeout=8)
+        resp = get_session().get(url, timeout=8)
         resp.raise_for_status()
         content = resp.content
         if not content:
@@ -19,6 +21,7 @@ def http_snapshot_once(url: str, lake_id: int, output_dir: str = "storage/snapsh
         path = os.path.join(output_dir, f"lake{lake_id}_{ts}.jpg")
         with open(path, "wb") as f:
             f.write(content)
+        record_snapshot(lake_id, path)
         return path
     except Exception:
         return None
\ No newline at end of file
@@ -2,6 +2,8 @@ import time
 import os
 from datetime import datetime
 
+from app.capture.snapshot_catalog import record_snapshot
+
 try:
     import cv2
 except ImportError:
@@ -28,6 +30,7 @@ def capture_rtsp(rtsp_url: str, lake_id: int, interval_seconds: int = 60, output
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
             path = os.path.join(output_dir, f"lake{lake_id}_{ts}.jpg")
             cv2.imwrite(path, frame)
+            record_snapshot(lake_id, path)
             print("已保存截图:", path)
             time.sleep(interval_seconds)
     finally:
@@ -53,6 +56,7 @@ def capture_once(rtsp_url: str, lake_id: int, output_dir: str = "storage/snapsho
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         path = os.path.join(output_dir, f"lake{lake_id}_{ts}.jpg")
         cv2.imwrite(path, frame)
+        record_snapshot(lake_id, path)
         print("已保存截图:", path)
         return path
     finally:
@@ -0,0 +1,221 @@
+import os
+import re
+import time
+import logging
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from app.capture.snapshot_catalog import DEFAULT_SNAPSHOT_DIR, record_snapshot
+
+logger = logging.getLogger("rtsp_ingest")
+
+# 多路 RTSP 持续接入：每个湖区一条常驻连接（独立线程），避免 capture_once 每帧都重新进行 RTSP 协商。
+# - 线程持续 grab 以排空码流，仅每 RTSP_DECODE_INTERVAL 秒解码一帧放入环形缓冲；
+# - 断流后按指数退避重连（RTSP_BACKOFF_BASE ~ RTSP_BACKOFF_MAX 秒）；
+# - 每 RTSP_SNAPSHOT_INTERVAL 秒将最新帧落盘一张，保留历史截图（<=0 关闭）；
+# - 实时指数优先直接读取内存中的最新帧。
+# 每次（重新）连接生成新的 session 标识，帧以 (session, seq) 唯一标识，可安全用作分析结果缓存的键。
+
+
+class Frame(NamedTuple):
+    seq: int
+    captured_at: datetime
+    image: np.ndarray
+    session: str = ""
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class CameraStream(threading.Thread):
+    def __init__(
+        self,
+        lake_id: int,
+        url: str,
+        buffer_size: int = 4,
+        decode_interval: Optional[float] = None,
+        snapshot_interval: Optional[float] = None,
+        output_dir: str = DEFAULT_SNAPSHOT_DIR,
+        capture_factory: Optional[Callable] = None,
+    ):
+        super().__init__(name=f"rtsp-lake{lake_id}", daemon=True)
+        self.lake_id = lake_id
+        self.url = url
+        self.decode_interval = _env_float("RTSP_DECODE_INTERVAL", 1.0) if decode_interval is None else decode_interval
+        self.snapshot_interval = _env_float("RTSP_SNAPSHOT_INTERVAL", 60) if snapshot_interval is None else snapshot_interval
+        self.backoff_base = _env_float("RTSP_BACKOFF_BASE", 1.0)
+        self.backoff_max = _env_float("RTSP_BACKOFF_MAX", 60.0)
+        self.output_dir = output_dir
+        self._capture_factory = capture_factory or (lambda u: cv2.VideoCapture(u))
+        self._frames: deque = deque(maxlen=max(1, buffer_size))
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._seq = 0
+        self._session = ""
+        self._persisted: Optional[tuple] = None  # (session, seq, 截图路径)：最近落盘的帧
+        self.reconnects = 0
+        self.connected = False
+
+    def latest(self) -> Optional[Frame]:
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+    def frames(self) -> list:
+        with self._lock:
+            return list(self._frames)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _backoff(self, failures: int):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, failures - 1)))
+        self._stop_event.wait(delay)
+
+    def run(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            cap = self._capture_factory(self.url)
+            if cap is None or not cap.isOpened():
+                failures += 1
+                logger.warning(f"无法打开RTSP流（lake{self.lake_id}，第{failures}次）: {self.url}")
+                if cap is not None:
+                    cap.release()
+                self._backoff(failures)
+                continue
+            if failures:
+                self.reconnects += 1
+            failures = 0
+            self._session = uuid.uuid4().hex[:12]
+            self.connected = True
+            try:
+                self._read_loop(cap)
+            finally:
+                self.connected = False
+                cap.release()
+            if not self._stop_event.is_set():
+                failures += 1
+                logger.warning(f"RTSP流中断（lake{self.lake_id}），准备重连")
+                self._backoff(failures)
+
+    def _read_loop(self, cap):
+        last_decode = 0.0
+        last_snapshot = time.monotonic()
+        while not self._stop_event.is_set():
+            if not cap.grab():
+                return
+            now = time.monotonic()
+            if now - last_decode < self.decode_interval:
+                continue
+            ok, image = cap.retrieve()
+            if not ok or image is None:
+                return
+            last_decode = now
+            with self._lock:
+                self._seq += 1
+                frame = Frame(self._seq, datetime.now(), image, self._session)
+                self._frames.append(frame)
+            if self.snapshot_interval > 0 and now - last_snapshot >= self.snapshot_interval:
+                last_snapshot = now
+                self._persist(frame)
+
+    def _persist(self, frame: Frame):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"lake{self.lake_id}_{frame.captured_at.strftime('%Y%m%d_%H%M%S')}.jpg")
+            if cv2 is not None and cv2.imwrite(path, frame.image):
+                record_snapshot(self.lake_id, path)
+                with self._lock:
+                    self._persisted = (frame.session, frame.seq, path)
+        except Exception as e:
+            logger.warning(f"保存截图失败（lake{self.lake_id}）: {e}")
+
+    def snapshot_path(self, frame: Frame) -> Optional[str]:
+        """frame 恰好是按 snapshot_interval 落盘的那一帧时返回其截图路径，否则返回 None（不做任何编码或写盘）。"""
+        with self._lock:
+            persisted = self._persisted
+        if persisted and persisted[:2] == (frame.session, frame.seq):
+            return persisted[2]
+        return None
+
+
+class IngestionService:
+    """管理多路 CameraStream，按湖区提供内存中的最新帧。"""
+
+    def __init__(self):
+        self._streams: Dict[int, CameraStream] = {}
+        self._lock = threading.Lock()
+
+    def start(self, cameras: Dict[int, str], **stream_kwargs) -> int:
+        if cv2 is None and "capture_factory" not in stream_kwargs:
+            logger.warning("OpenCV not available. Skipping RTSP ingestion.")
+            return 0
+        with self._lock:
+            for lake_id, url in cameras.items():
+                if lake_id in self._streams:
+                    continue
+                stream = CameraStream(lake_id, url, **stream_kwargs)
+                self._streams[lake_id] = stream
+                stream.start()
+            return len(self._streams)
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            streams, self._streams = list(self._streams.values()), {}
+        for s in streams:
+            s.stop()
+        for s in streams:
+            s.join(timeout)
+
+    def latest_frame(self, lake_id: int, max_age: Optional[float] = None) -> Optional[Frame]:
+        """返回湖区最新解码帧；超过 max_age 秒（默认 RTSP_FRAME_MAX_AGE=120）视为过期返回 None。"""
+        with self._lock:
+            stream = self._streams.get(lake_id)
+        frame = stream.latest() if stream else None
+        if frame is None:
+            return None
+        max_age = _env_float("RTSP_FRAME_MAX_AGE", 120) if max_age is None else max_age
+        if (datetime.now() - frame.captured_at).total_seconds() > max_age:
+            return None
+        return frame
+
+    def snapshot_path(self, lake_id: int, frame: Frame) -> Optional[str]:
+        """frame 本身已落盘时返回其截图路径；多数帧只在内存中，返回 None。"""
+        with self._lock:
+            stream = self._streams.get(lake_id)
+        return stream.snapshot_path(frame) if stream else None
+
+    def status(self) -> Dict[int, dict]:
+        with self._lock:
+            streams = dict(self._streams)
+        return {
+            lake_id: {
+                "connected": s.connected,
+                "reconnects": s.reconnects,
+                "last_frame_at": s.latest().captured_at.isoformat() if s.latest() else None,
+            }
+            for lake_id, s in streams.items()
+        }
+
+
+def cameras_from_env() -> Dict[int, str]:
+    """读取 RTSP_LAKE_{id} 中的 rtsp:// 地址（HTTP 快照地址仍由 capture_http 按需抓取）。"""
+    cameras = {}
+    for key, value in os.environ.items():
+        m = re.fullmatch(r"RTSP_LAKE_(\d+)", key)
+        if m and value.lower().startswith("rtsp://"):
+            cameras[int(m.group(1))] = value
+    return cameras
+
+
+ingestion_service = IngestionService()
@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+# 截图目录索引：记录每个湖区最新一帧的路径与时间，O(1) 回答“湖区 N 的最新截图”，
+# 取代每次请求 glob + sorted 扫描整个目录。
+# - 本进程内写入截图时调用 record_snapshot 登记；
+# - 首次查询或启动时 rescan 从磁盘重建；
+# - 其他进程（如独立运行的 capture_rtsp）写入时目录 mtime 会变化，查询时据此触发一次重扫。
+
+DEFAULT_SNAPSHOT_DIR = "storage/snapshots"
+
+_SNAPSHOT_NAME = re.compile(r"^lake(\d+)_(\d{8}_\d{6})\.jpg$")
+
+
+class SnapshotEntry(NamedTuple):
+    name: str
+    path: str
+    captured_at: datetime
+
+
+def _parse_name(name: str):
+    m = _SNAPSHOT_NAME.match(name)
+    if not m:
+        return None
+    try:
+        return int(m.group(1)), datetime.strptime(m.group(2), "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+
+
+class SnapshotCatalog:
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+        self._latest: Dict[int, SnapshotEntry] = {}
+        self._lock = threading.Lock()
+        self._dir_mtime: Optional[int] = None  # None 表示尚未扫描
+
+    def _stat_dir(self) -> Optional[int]:
+        try:
+            return os.stat(self.dir_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def rescan(self) -> int:
+        """从磁盘重建索引（启动时或检测到外部写入时调用），返回登记的湖区数。"""
+        latest: Dict[int, SnapshotEntry] = {}
+        mtime = self._stat_dir()
+        if mtime is not None:
+            with os.scandir(self.dir_path) as it:
+                for de in it:
+                    parsed = _parse_name(de.name)
+                    if parsed is None:
+                        continue
+                    lake_id, ts = parsed
+                    cur = latest.get(lake_id)
+                    if cur is None or de.name > cur.name:
+                        latest[lake_id] = SnapshotEntry(de.name, os.path.join(self.dir_path, de.name), ts)
+        with self._lock:
+            self._latest = latest
+            self._dir_mtime = mtime if mtime is not None else -1
+        return len(latest)
+
+    def record(self, lake_id: int, path: str):
+        """登记一张新写入的截图（文件名需符合 lake{id}_{YYYYmmdd_HHMMSS}.jpg）。"""
+        name = os.path.basename(path)
+        parsed = _parse_name(name)
+        if parsed is None or parsed[0] != lake_id:
+            return
+        with self._lock:
+            if self._dir_mtime is None:
+                return  # 尚未扫描，首次查询时会从磁盘完整重建
+            cur = self._latest.get(lake_id)
+            if cur is None or name >= cur.name:
+                self._latest[lake_id] = SnapshotEntry(name, path, parsed[1])
+            # 本进程的写入已登记，无需因目录 mtime 变化而重扫
+            self._dir_mtime = self._stat_dir()
+
+    def latest(self, lake_id: int) -> Optional[SnapshotEntry]:
+        with self._lock:
+            scanned_mtime = self._dir_mtime
+            entry = self._latest.get(lake_id)
+        if scanned_mtime is None or self._stat_dir() != scanned_mtime or (entry and not os.path.exists(entry.path)):
+            self.rescan()
+            with self._lock:
+                entry = self._latest.get(lake_id)
+        return entry
+
+
+_catalogs: Dict[str, SnapshotCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(dir_path: str = DEFAULT_SNAPSHOT_DIR) -> SnapshotCatalog:
+    key = os.path.abspath(dir_path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = SnapshotCatalog(dir_path)
+    return catalog
+
+
+def record_snapshot(lake_id: int, path: str):
+    """截图写入后调用，登记到其所在目录的索引。"""
+    get_catalog(os.path.dirname(path) or ".").record(lake_id, path)
+
+
+def find_latest_snapshot(lake_id: int, dir_path: str = DEFAULT_SNAPSHOT_DIR) -> Optional[str]:
+    entry = get_catalog(dir_path).latest(lake_id)
+    return entry.path if entry else None
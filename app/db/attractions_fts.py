@@ -0,0 +1,178 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("attractions_fts")
+
+# 景点全文索引（SQLite FTS5）：attractions_fts 的 rowid 即 attractions.id，
+# 各列存放预先切好的词（空格分隔），由 unicode61 分词器按空格切分：
+# - 中文连续片段切成单字 + 相邻二字（bigram），查询时两字及以上按 bigram 全部命中（AND），单字按单字命中；
+# - 英文 / 数字按词切分并转小写，查询时按前缀匹配。
+# 按 bm25 排序（名称权重 10、分类 5、简介 1）。索引表由 migrations.upgrade() 创建并构建，
+# 之后在 crud 的增删改中同事务维护；批量改动（如 sync_poi_to_attraction.py）后调用 rebuild_attractions_fts。
+# 非 SQLite、SQLite 未编译 FTS5 或尚未升级建表时 available() 为 False，搜索退回 LIKE。
+
+FTS_TABLE = "attractions_fts"
+_WEIGHTS = (10.0, 1.0, 5.0)  # name, description, category
+
+_CJK = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+|[0-9a-zA-Z]+")
+
+_ready: set = set()  # 已确认存在索引表的数据库 URL
+
+
+def tokenize(value: Optional[str]) -> str:
+    """索引用切词：中文输出单字与二字，英文数字输出小写词。"""
+    if not value:
+        return ""
+    tokens: List[str] = []
+    for run in _RUN.findall(value):
+        if _CJK.fullmatch(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return " ".join(tokens)
+
+
+def _quote(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+def build_match(keyword: str) -> Optional[str]:
+    """把用户输入转成 FTS5 MATCH 表达式（各词 AND）；没有可检索的字符时返回 None。"""
+    terms: List[str] = []
+    for run in _RUN.findall(keyword or ""):
+        if _CJK.fullmatch(run):
+            if len(run) == 1:
+                terms.append(_quote(run))
+            else:
+                terms.extend(_quote(run[i:i + 2]) for i in range(len(run) - 1))
+        else:
+            terms.append(_quote(run.lower()) + "*")
+    return " AND ".join(dict.fromkeys(terms)) or None
+
+
+def ensure_fts_table(engine) -> bool:
+    """在独立连接上建索引表（首次创建时从 attractions 全量构建），由 migrations.upgrade() 调用；不支持 FTS5 时返回 False。"""
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        with engine.begin() as conn:
+            if not _table_exists(conn):
+                _create(conn)
+                _rebuild(conn)
+    except Exception as e:
+        logger.warning(f"FTS5 不可用，景点搜索退回 LIKE: {e}")
+        return False
+    _ready.add(str(engine.url))
+    return True
+
+
+def _create(conn):
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, description, category, tokenize = 'unicode61')"
+    ))
+
+
+def _table_exists(conn) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": FTS_TABLE}
+    ).first() is not None
+
+
+def available(db: Session) -> bool:
+    """
+    索引表是否已存在（只读探测，不提交也不回滚调用方的会话：增删改景点时会在 flush 之后调用）。
+    表由 migrations.upgrade() 创建；尚未创建时搜索退回 LIKE，增删改不维护索引，升级时全量重建。
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return False
+    key = str(bind.url)
+    if key in _ready:
+        return True
+    if not _table_exists(db):
+        return False
+    _ready.add(key)
+    return True
+
+
+def _row(attraction_id: int, name, description, category) -> dict:
+    return {"id": attraction_id, "name": tokenize(name), "description": tokenize(description), "category": tokenize(category)}
+
+
+def _rebuild(db: Session) -> int:
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    rows = [
+        _row(*r)
+        for r in db.execute(text("SELECT id, name, description, category FROM attractions"))
+    ]
+    if rows:
+        db.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, name, description, category) VALUES (:id, :name, :description, :category)"), rows)
+    return len(rows)
+
+
+def rebuild_attractions_fts(db: Session) -> int:
+    """
+    全量重建索引（索引表不存在时先创建）并提交调用方会话，返回索引的景点数；不支持 FTS5 时返回 0。
+    供迁移与批量维护脚本在写完数据后调用。
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return 0
+    try:
+        _create(db)
+    except Exception as e:
+        logger.warning(f"FTS5 不可用，景点搜索退回 LIKE: {e}")
+        return 0
+    count = _rebuild(db)
+    db.commit()
+    _ready.add(str(bind.url))
+    return count
+
+
+def index_attraction(db: Session, attraction) -> None:
+    """写入 / 覆盖一个景点的索引行（不提交，随调用方事务提交）。"""
+    if not available(db):
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": attraction.id})
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, name, description, category) VALUES (:id, :name, :description, :category)"),
+        _row(attraction.id, attraction.name, attraction.description, attraction.category),
+    )
+
+
+def unindex_attraction(db: Session, attraction_id: int) -> None:
+    if not available(db):
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": attraction_id})
+
+
+def search_ids(db: Session, match: str, skip: int, limit: int) -> Tuple[List[int], int]:
+    """按 bm25 排序返回 (本页景点 id, 命中总数)。"""
+    w = ", ".join(str(x) for x in _WEIGHTS)
+    total = db.execute(text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"), {"q": match}).scalar()
+    if not total or skip >= total:
+        return [], total or 0
+    ids = [
+        r[0]
+        for r in db.execute(
+            text(
+                f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE} JOIN attractions a ON a.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH :q "
+                f"ORDER BY bm25({FTS_TABLE}, {w}), a.sort_order DESC, a.rating DESC, a.id "
+                f"LIMIT :limit OFFSET :skip"
+            ),
+            {"q": match, "limit": limit, "skip": skip},
+        )
+    ]
+    return ids, total
+
+
+def reset_cache():
+    """测试或切换数据库后清除“索引表已就绪”的记忆。"""
+    _ready.clear()
@@ -1,46 +1,39 @@
 from typing import List
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.db.models import Prediction
+from app.db.models import CurrentPrediction, Prediction
+from app.db.upsert import upsert_latest
 from app.schemas.prediction import LakePrediction, TimeWindow
 
 
 def save_predictions(db: Session, preds: List[LakePrediction]):
-    for p in preds:
-        rec = Prediction(
-            lake_id=p.lake_id,
-            lake_name=p.lake_name,
-            score=p.score,
-            best_start=p.best_time.start,
-            best_end=p.best_time.end,
-            updated_at=datetime.fromisoformat(p.updated_at.replace("Z", "+00:00")) if "T" in p.updated_at else datetime.utcnow(),
-        )
-        db.add(rec)
+    """追加写入历史归档，并在同一事务中用本批预测替换当前预测（不在本批中的湖区一并删除）。"""
+    rows = [
+        {
+            "lake_id": p.lake_id,
+            "lake_name": p.lake_name,
+            "score": p.score,
+            "best_start": p.best_time.start,
+            "best_end": p.best_time.end,
+            "updated_at": datetime.fromisoformat(p.updated_at.replace("Z", "+00:00")) if "T" in p.updated_at else datetime.utcnow(),
+        }
+        for p in preds
+    ]
+    if not rows:
+        return
+    db.execute(insert(Prediction), rows)
+    upsert_latest(db, CurrentPrediction, rows, ts="updated_at", newer_only=False)
+    db.query(CurrentPrediction).filter(CurrentPrediction.lake_id.notin_({r["lake_id"] for r in rows})).delete(
+        synchronize_session=False
+    )
     db.commit()
 
 
 def get_latest_predictions(db: Session) -> List[LakePrediction]:
-    # 修改逻辑：获取每个 lake_id 的最新一条预测，而不是全局最新的 3 条
-    from sqlalchemy import func
-    
-    # 子查询：找到每个 lake_id 最新的 updated_at
-    subquery = (
-        db.query(
-            Prediction.lake_id,
-            func.max(Prediction.updated_at).label("max_updated_at")
-        )
-        .group_by(Prediction.lake_id)
-        .subquery()
-    )
-    
-    # 主查询：连接子查询，获取完整记录
-    rows = (
-        db.query(Prediction)
-        .join(subquery, (Prediction.lake_id == subquery.c.lake_id) & (Prediction.updated_at == subquery.c.max_updated_at))
-        .all()
-    )
-    
+    # 每个湖区一行的当前预测表，读取代价只与湖区数有关，不随历史归档增长
+    rows = db.query(CurrentPrediction).order_by(CurrentPrediction.lake_id).all()
     return [
         LakePrediction(
             lake_id=r.lake_id,
@@ -50,4 +43,12 @@ def get_latest_predictions(db: Session) -> List[LakePrediction]:
             updated_at=r.updated_at.isoformat(),
         )
         for r in rows
-    ]
\ No newline at end of file
+    ]
+
+
+def clear_predictions(db: Session) -> int:
+    """清空当前预测与历史归档（供手动刷新脚本使用），返回删除的归档行数。"""
+    db.query(CurrentPrediction).delete()
+    num = db.query(Prediction).delete()
+    db.commit()
+    return num
@@ -1,15 +1,32 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, asc
 from app.db.models_attractions import Attraction
+from app.db.attractions_fts import available as fts_available, build_match, index_attraction, search_ids, unindex_attraction
 from app.schemas.attraction import AttractionCreate, AttractionUpdate
 
+# 进程内的景点数据版本号：本模块每次增删改后递增，
+# 供由景点派生的内存结构（如附近景点的空间索引）判断是否需要重建
+_version = 0
+
+
+def attractions_version() -> int:
+    return _version
+
+
+def bump_attractions_version():
+    global _version
+    _version += 1
+
 
 def create_attraction(db: Session, attraction: AttractionCreate) -> Attraction:
     """创建景点"""
     db_attraction = Attraction(**attraction.dict())
     db.add(db_attraction)
+    db.flush()
+    index_attraction(db, db_attraction)
     db.commit()
+    bump_attractions_version()
     db.refresh(db_attraction)
     return db_attraction
 
@@ -60,6 +77,35 @@ def get_attractions_count(
     return query.count()
 
 
+def get_attraction_coordinates(db: Session) -> List[Tuple[int, float, float]]:
+    """所有有坐标的景点 (id, 纬度, 经度)"""
+    return [
+        (aid, lat, lon)
+        for aid, lat, lon in db.query(Attraction.id, Attraction.latitude, Attraction.longitude)
+        .filter(Attraction.latitude.isnot(None), Attraction.longitude.isnot(None))
+    ]
+
+
+def get_recommended_score_rows(db: Session) -> List[Tuple[int, Optional[float], Optional[float], Optional[float]]]:
+    """全部推荐景点的 (id, 可达性, 主题性, 色彩性)，按列表默认顺序（排序权重、创建时间倒序）"""
+    return [
+        tuple(r)
+        for r in db.query(
+            Attraction.id, Attraction.accessibility_score, Attraction.thematic_score, Attraction.colorfulness_score
+        )
+        .filter(Attraction.is_recommended == True)
+        .order_by(desc(Attraction.sort_order), desc(Attraction.created_at))
+    ]
+
+
+def get_attractions_by_ids(db: Session, attraction_ids: List[int]) -> List[Attraction]:
+    """按给定顺序返回景点（不存在的跳过）"""
+    if not attraction_ids:
+        return []
+    by_id = {a.id: a for a in db.query(Attraction).filter(Attraction.id.in_(attraction_ids))}
+    return [by_id[i] for i in attraction_ids if i in by_id]
+
+
 def get_recommended_attractions(db: Session, limit: int = 10) -> List[Attraction]:
     """获取推荐景点列表"""
     return (
@@ -81,7 +127,10 @@ def update_attraction(db: Session, attraction_id: int, attraction_update: Attrac
     for field, value in update_data.items():
         setattr(db_attraction, field, value)
     
+    if update_data.keys() & {"name", "description", "category"}:
+        index_attraction(db, db_attraction)
     db.commit()
+    bump_attractions_version()
     db.refresh(db_attraction)
     return db_attraction
 
@@ -92,21 +141,36 @@ def delete_attraction(db: Session, attraction_id: int) -> bool:
     if not db_attraction:
         return False
     
+    unindex_attraction(db, attraction_id)
     db.delete(db_attraction)
     db.commit()
+    bump_attractions_version()
     return True
 
 
 def search_attractions(db: Session, keyword: str, limit: int = 20) -> List[Attraction]:
     """搜索景点"""
-    return (
-        db.query(Attraction)
-        .filter(
-            (Attraction.name.contains(keyword)) |
-            (Attraction.description.contains(keyword)) |
-            (Attraction.category.contains(keyword))
-        )
-        .order_by(desc(Attraction.sort_order), desc(Attraction.rating))
+    return search_attractions_page(db, keyword, skip=0, limit=limit)[0]
+
+
+def search_attractions_page(db: Session, keyword: str, skip: int = 0, limit: int = 20) -> Tuple[List[Attraction], int]:
+    """全文检索景点（bm25 相关度排序），返回 (本页景点, 命中总数)；不支持 FTS5 时退回 LIKE 扫描"""
+    if fts_available(db):
+        match = build_match(keyword)
+        if match is None:
+            return [], 0
+        ids, total = search_ids(db, match, skip, limit)
+        return get_attractions_by_ids(db, ids), total
+
+    query = db.query(Attraction).filter(
+        (Attraction.name.contains(keyword)) |
+        (Attraction.description.contains(keyword)) |
+        (Attraction.category.contains(keyword))
+    )
+    items = (
+        query.order_by(desc(Attraction.sort_order), desc(Attraction.rating))
+        .offset(skip)
         .limit(limit)
         .all()
-    )
\ No newline at end of file
+    )
+    return items, query.count()
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, bindparam, func, or_, type_coerce, update
+from sqlalchemy.orm import Session
+
+from app.db.models_community import CommunityPost
+
+
+def _created_key(db: Session):
+    # SQLite 中 created_at 以文本存储，且服务器默认值（CURRENT_TIMESTAMP）与 Python 写入的格式不同（有无微秒），
+    # 游标直接使用库中原始文本比较（不加 CAST，仍走索引），避免格式差异导致翻页重复或漏行；其他数据库按时间类型比较
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(CommunityPost.created_at, String)
+    return CommunityPost.created_at
+
+
+def encode_cursor(created, post_id: int) -> str:
+    value = created.isoformat() if isinstance(created, datetime) else created
+    raw = json.dumps([value, post_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(db: Session, cursor: str) -> Tuple[object, int]:
+    """解析游标；格式错误时抛出 ValueError。"""
+    try:
+        value, post_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f"无效游标: {cursor}") from e
+    if not isinstance(value, str) or not isinstance(post_id, int):
+        raise ValueError(f"无效游标: {cursor}")
+    if db.get_bind().dialect.name != "sqlite":
+        value = datetime.fromisoformat(value)
+    return value, post_id
+
+
+def get_posts_page(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[CommunityPost], Optional[str]]:
+    """
+    按 (created_at, id) 倒序的键集分页：每页只扫描索引上的 limit+1 行，与翻到第几页无关。
+    返回 (本页帖子, 下一页游标)；没有更多时游标为 None。
+    """
+    key = _created_key(db)
+    q = db.query(CommunityPost, key)
+    if cursor:
+        c_created, c_id = decode_cursor(db, cursor)
+        q = q.filter(or_(key < c_created, and_(key == c_created, CommunityPost.id < c_id)))
+    rows = q.order_by(key.desc(), CommunityPost.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0].id)
+    return [post for post, _ in rows], next_cursor
+
+
+def increment_likes(db: Session, post_id: int, count: int = 1) -> Optional[int]:
+    """原子自增点赞数（单条 UPDATE ... RETURNING），返回新值；帖子不存在时返回 None。"""
+    likes = db.execute(
+        update(CommunityPost)
+        .where(CommunityPost.id == post_id)
+        .values(likes=func.coalesce(CommunityPost.likes, 0) + count)
+        .returning(CommunityPost.likes)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    return likes
+
+
+def add_likes(db: Session, deltas: Dict[int, int]) -> int:
+    """批量累加点赞增量（一次 executemany、一个事务）。返回更新的帖子数。"""
+    if not deltas:
+        return 0
+    table = CommunityPost.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("post_id"))
+        .values(likes=func.coalesce(table.c.likes, 0) + bindparam("delta"))
+    )
+    db.execute(stmt, [{"post_id": pid, "delta": d} for pid, d in deltas.items()])
+    db.commit()
+    return len(deltas)
+
+
+def get_like_counts(db: Session, post_ids: List[int]) -> Dict[int, int]:
+    if not post_ids:
+        return {}
+    rows = db.query(CommunityPost.id, CommunityPost.likes).filter(CommunityPost.id.in_(post_ids))
+    return {pid: likes or 0 for pid, likes in rows}
+
+
+def get_recent_post_stats(db: Session, since: datetime) -> List[Tuple[int, int, datetime]]:
+    """since 之后发布的帖子 (id, likes, created_at)，走 created_at 索引的范围扫描。"""
+    return [
+        (pid, likes or 0, created)
+        for pid, likes, created in db.query(CommunityPost.id, CommunityPost.likes, CommunityPost.created_at)
+        .filter(CommunityPost.created_at >= since)
+    ]
+
+
+def get_posts_by_ids(db: Session, post_ids: List[int]) -> List[CommunityPost]:
+    """按给定顺序返回帖子（已删除的跳过）。"""
+    if not post_ids:
+        return []
+    by_id = {p.id: p for p in db.query(CommunityPost).filter(CommunityPost.id.in_(post_ids))}
+    return [by_id[pid] for pid in post_ids if pid in by_id]
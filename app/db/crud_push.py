@@ -0,0 +1,109 @@
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+
+from app.db.models import PushMessage
+from app.db.upsert import conflict_insert
+
+
+def dedup_key(openid: str, lake_id: Optional[int], window: str) -> str:
+    return f"{openid}|{lake_id}|{window}"
+
+
+def enqueue_push_messages(db: Session, messages: List[Dict]) -> int:
+    """
+    写入发件箱（单条 executemany）。messages 需含 openid/lake_id/window/title/body，可选 provider。
+    相同 (openid, lake_id, window) 已存在时忽略。返回新入队条数。
+    """
+    if not messages:
+        return 0
+    now = datetime.utcnow()
+    rows = {}
+    for m in messages:
+        key = dedup_key(m["openid"], m.get("lake_id"), m["window"])
+        rows[key] = {
+            "dedup_key": key,
+            "provider": m.get("provider") or "wechat",
+            "openid": m["openid"],
+            "lake_id": m.get("lake_id"),
+            "window": m["window"],
+            "title": m.get("title"),
+            "body": m.get("body"),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+    stmt = conflict_insert(db, PushMessage.__table__)
+    if stmt is not None:
+        inserted = db.execute(stmt.on_conflict_do_nothing(index_elements=["dedup_key"]), list(rows.values())).rowcount
+    else:
+        existing = {k for (k,) in db.query(PushMessage.dedup_key).filter(PushMessage.dedup_key.in_(list(rows)))}
+        new_rows = [r for k, r in rows.items() if k not in existing]
+        if new_rows:
+            db.execute(insert(PushMessage), new_rows)
+        inserted = len(new_rows)
+    db.commit()
+    return inserted
+
+
+def claim_push_batch(db: Session, limit: int, lease_seconds: float = 60.0) -> List[PushMessage]:
+    """
+    领取一批到期消息：状态置为 sending 并把 next_attempt_at 设为租约到期时间。
+    工作线程异常退出时，租约过期后消息会被重新领取。
+    """
+    now = datetime.utcnow()
+    ids = [
+        r.id
+        for r in db.query(PushMessage.id)
+        .filter(PushMessage.status.in_(("pending", "sending")), PushMessage.next_attempt_at <= now)
+        .order_by(PushMessage.next_attempt_at, PushMessage.id)
+        .limit(limit)
+    ]
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=lease_seconds)
+    # 条件更新防止多个工作线程重复领取同一条
+    db.execute(
+        update(PushMessage)
+        .where(PushMessage.id.in_(ids), PushMessage.next_attempt_at <= now, or_(PushMessage.status == "pending", PushMessage.status == "sending"))
+        .values(status="sending", next_attempt_at=lease)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return (
+        db.query(PushMessage)
+        .filter(PushMessage.id.in_(ids), PushMessage.status == "sending", PushMessage.next_attempt_at == lease)
+        .order_by(PushMessage.id)
+        .all()
+    )
+
+
+def mark_push_sent(db: Session, ids: List[int]):
+    if ids:
+        db.execute(
+            update(PushMessage)
+            .where(PushMessage.id.in_(ids))
+            .values(status="sent", sent_at=datetime.utcnow(), last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def mark_push_failed(db: Session, messages: List[PushMessage], error: str, max_attempts: int, retry_base: float):
+    """投递失败：指数退避后重试，超过 max_attempts 次置为 dead。"""
+    now = datetime.utcnow()
+    for m in messages:
+        m.attempts = (m.attempts or 0) + 1
+        m.last_error = error[:500]
+        if m.attempts >= max_attempts:
+            m.status = "dead"
+        else:
+            m.status = "pending"
+            m.next_attempt_at = now + timedelta(seconds=retry_base * (2 ** (m.attempts - 1)))
+    db.commit()
+
+
+def push_queue_counts(db: Session) -> Dict[str, int]:
+    return dict(db.query(PushMessage.status, func.count(PushMessage.id)).group_by(PushMessage.status).all())
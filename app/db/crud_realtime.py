@@ -1,7 +1,10 @@
+from typing import Dict, List
+from sqlalchemy import insert, func
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.db.models import RealtimeIndexRecord
+from app.db.models import LatestRealtimeIndex, RealtimeIndexRecord
+from app.db.upsert import upsert_latest
 
 
 def save_realtime_index(db: Session, lake_id: int, lake_name: str, score: int, image_path: str | None, captured_at: datetime) -> RealtimeIndexRecord:
@@ -13,15 +16,61 @@ def save_realtime_index(db: Session, lake_id: int, lake_name: str, score: int, i
         captured_at=captured_at,
     )
     db.add(rec)
+    db.flush()
+    upsert_latest(db, LatestRealtimeIndex, [_latest_row(rec.id, lake_id, lake_name, score, image_path, captured_at)])
     db.commit()
     db.refresh(rec)
     return rec
 
 
-def get_latest_realtime_index_record(db: Session, lake_id: int) -> RealtimeIndexRecord | None:
+def save_realtime_indices(db: Session, rows: List[Dict]) -> int:
+    """批量写入实时指数（单条 executemany，一个事务）。rows 的键与 RealtimeIndexRecord 字段一致。"""
+    if not rows:
+        return 0
+    db.execute(insert(RealtimeIndexRecord), rows)
+    newest: Dict[int, Dict] = {}
+    for row in rows:
+        cur = newest.get(row["lake_id"])
+        if cur is None or row["captured_at"] >= cur["captured_at"]:
+            newest[row["lake_id"]] = row
+    # executemany 不回传主键，按 (lake_id, captured_at) 索引补查 id
+    latest_rows = []
+    for lake_id, row in newest.items():
+        record_id = (
+            db.query(func.max(RealtimeIndexRecord.id))
+            .filter(RealtimeIndexRecord.lake_id == lake_id, RealtimeIndexRecord.captured_at == row["captured_at"])
+            .scalar()
+        )
+        latest_rows.append(_latest_row(record_id, lake_id, row.get("lake_name"), row.get("score"), row.get("image_path"), row["captured_at"]))
+    upsert_latest(db, LatestRealtimeIndex, latest_rows)
+    db.commit()
+    return len(rows)
+
+
+def _latest_row(record_id, lake_id, lake_name, score, image_path, captured_at) -> Dict:
+    return {
+        "lake_id": lake_id,
+        "record_id": record_id,
+        "lake_name": lake_name,
+        "score": score,
+        "image_path": image_path,
+        "captured_at": captured_at,
+    }
+
+
+def get_latest_realtime_index_record(db: Session, lake_id: int) -> LatestRealtimeIndex | None:
+    """读取湖区最新实时指数（物化表主键查找）；原始记录 id 为 record_id。"""
+    return db.get(LatestRealtimeIndex, lake_id, populate_existing=True)
+
+
+def get_daily_average_score(db: Session, lake_id: int, start: datetime, end: datetime) -> float | None:
+    """[start, end) 内的平均实时指数，走 (lake_id, captured_at, score) 覆盖索引。"""
     return (
-        db.query(RealtimeIndexRecord)
-        .filter(RealtimeIndexRecord.lake_id == lake_id)
-        .order_by(RealtimeIndexRecord.captured_at.desc())
-        .first()
+        db.query(func.avg(RealtimeIndexRecord.score))
+        .filter(
+            RealtimeIndexRecord.lake_id == lake_id,
+            RealtimeIndexRecord.captured_at >= start,
+            RealtimeIndexRecord.captured_at < end,
+        )
+        .scalar()
     )
\ No newline at end of file
@@ -1,8 +1,11 @@
-from typing import Optional
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import insert, func
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.db.models import SensorReading
+from app.db.models import LatestSensorReading, SensorReading, SensorRollup
+from app.db.upsert import conflict_insert, greatest, least, upsert_latest
 
 
 def save_sensor_reading(
@@ -18,28 +21,215 @@ def save_sensor_reading(
     tds: Optional[float],
     turbidity: Optional[float],
 ) -> SensorReading:
-    rec = SensorReading(
-        lake_id=lake_id,
-        captured_at=captured_at or datetime.utcnow(),
-        air_temp=int(air_temp) if air_temp is not None else None,
-        humidity=int(humidity) if humidity is not None else None,
-        wind_speed=int(wind_speed) if wind_speed is not None else None,
-        water_temp=int(water_temp) if water_temp is not None else None,
-        salinity=int(salinity) if salinity is not None else None,
-        dissolved_oxygen=int(dissolved_oxygen) if dissolved_oxygen is not None else None,
-        tds=int(tds) if tds is not None else None,
-        turbidity=int(turbidity) if turbidity is not None else None,
+    row = sensor_row(
+        lake_id, captured_at, air_temp, humidity, wind_speed, water_temp,
+        salinity, dissolved_oxygen, tds, turbidity,
     )
+    rec = SensorReading(**row)
     db.add(rec)
+    db.flush()
+    upsert_latest(db, LatestSensorReading, [dict(row, reading_id=rec.id)])
+    upsert_rollups(db, aggregate_rollups([row]))
     db.commit()
     db.refresh(rec)
     return rec
 
 
-def get_latest_sensor_reading(db: Session, lake_id: int) -> Optional[SensorReading]:
-    return (
-        db.query(SensorReading)
-        .filter(SensorReading.lake_id == lake_id)
-        .order_by(SensorReading.captured_at.desc())
-        .first()
-    )
\ No newline at end of file
+SENSOR_FIELDS = ("air_temp", "humidity", "wind_speed", "water_temp", "salinity", "dissolved_oxygen", "tds", "turbidity")
+
+# 批量写入时每个 executemany 的行数
+SENSOR_BATCH_CHUNK = int(os.getenv("SENSOR_BATCH_CHUNK", "1000"))
+
+
+def sensor_row(lake_id: int, captured_at: Optional[datetime], *values: Optional[float]) -> Dict:
+    """组装一行 sensor_readings 数据（列为整型，与单条写入的取整方式一致）。values 顺序同 SENSOR_FIELDS。"""
+    row = {"lake_id": lake_id, "captured_at": captured_at or datetime.utcnow()}
+    for name, v in zip(SENSOR_FIELDS, values):
+        row[name] = int(v) if v is not None else None
+    return row
+
+
+def save_sensor_readings(db: Session, rows: List[Dict], chunk_size: Optional[int] = None) -> int:
+    """批量写入传感器数据：每 chunk_size 行一次 executemany（连同预聚合增量）并提交，不回读主键。返回写入行数。"""
+    chunk_size = chunk_size or SENSOR_BATCH_CHUNK
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        db.execute(insert(SensorReading), chunk)
+        _update_latest(db, chunk)
+        upsert_rollups(db, aggregate_rollups(chunk))
+        db.commit()
+    return len(rows)
+
+
+def _update_latest(db: Session, rows: List[Dict]):
+    """批量写入后同步各湖区最新值；executemany 不回传主键，按 (lake_id, captured_at) 索引补查 id。"""
+    newest: Dict[int, Dict] = {}
+    for row in rows:
+        cur = newest.get(row["lake_id"])
+        if cur is None or row["captured_at"] >= cur["captured_at"]:
+            newest[row["lake_id"]] = row
+    latest_rows = []
+    for lake_id, row in newest.items():
+        reading_id = (
+            db.query(func.max(SensorReading.id))
+            .filter(SensorReading.lake_id == lake_id, SensorReading.captured_at == row["captured_at"])
+            .scalar()
+        )
+        latest_rows.append(dict(row, reading_id=reading_id))
+    upsert_latest(db, LatestSensorReading, latest_rows)
+
+
+# ---- 时序预聚合 ----
+# 写入原始数据时同步累加 1m/1h/1d 三档时间桶的 min/max/sum/count，
+# 区间查询只读预聚合表，不扫描原始数据；原始数据超过保留期后由定时任务删除。
+
+ROLLUP_RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+_ROLLUP_KEY = ("lake_id", "resolution", "bucket_start", "metric")
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    if resolution == "1m":
+        return ts.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == "1d":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"未知的聚合粒度: {resolution}")
+
+
+def aggregate_rollups(rows: Iterable[Dict]) -> List[Dict]:
+    """将一批原始数据在内存中先按 (湖区, 粒度, 时间桶, 指标) 合并，减少 upsert 行数。"""
+    acc: Dict[tuple, list] = {}
+    for row in rows:
+        ts = row["captured_at"]
+        buckets = [(res, bucket_start(ts, res)) for res in ROLLUP_RESOLUTIONS]
+        for metric in SENSOR_FIELDS:
+            v = row.get(metric)
+            if v is None:
+                continue
+            for res, start in buckets:
+                key = (row["lake_id"], res, start, metric)
+                a = acc.get(key)
+                if a is None:
+                    acc[key] = [v, v, v, 1]
+                else:
+                    if v < a[0]:
+                        a[0] = v
+                    if v > a[1]:
+                        a[1] = v
+                    a[2] += v
+                    a[3] += 1
+    return [
+        dict(zip(_ROLLUP_KEY, key), min_value=a[0], max_value=a[1], sum_value=a[2], count=a[3])
+        for key, a in acc.items()
+    ]
+
+
+def upsert_rollups(db: Session, rollups: List[Dict]) -> int:
+    """将增量合并进 sensor_rollups（不提交，随原始数据同一事务）。SQLite/PostgreSQL 使用 ON CONFLICT 单条 executemany。"""
+    if not rollups:
+        return 0
+    table = SensorRollup.__table__
+    stmt = conflict_insert(db, table)
+    if stmt is None:
+        for r in rollups:
+            rec = db.query(SensorRollup).filter_by(**{k: r[k] for k in _ROLLUP_KEY}).first()
+            if rec is None:
+                db.add(SensorRollup(**r))
+            else:
+                rec.min_value = min(rec.min_value, r["min_value"])
+                rec.max_value = max(rec.max_value, r["max_value"])
+                rec.sum_value += r["sum_value"]
+                rec.count += r["count"]
+        return len(rollups)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(_ROLLUP_KEY),
+        set_={
+            "min_value": least(db, table.c.min_value, stmt.excluded.min_value),
+            "max_value": greatest(db, table.c.max_value, stmt.excluded.max_value),
+            "sum_value": table.c.sum_value + stmt.excluded.sum_value,
+            "count": table.c.count + stmt.excluded.count,
+        },
+    )
+    db.execute(stmt, rollups)
+    return len(rollups)
+
+
+def get_sensor_series(
+    db: Session,
+    lake_id: int,
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    metrics: Optional[Sequence[str]] = None,
+) -> List[SensorRollup]:
+    """按粒度读取 [start, end) 内的预聚合时间桶（走唯一索引范围扫描），按时间升序。"""
+    q = db.query(SensorRollup).filter(
+        SensorRollup.lake_id == lake_id,
+        SensorRollup.resolution == resolution,
+        SensorRollup.bucket_start >= bucket_start(start, resolution),
+        SensorRollup.bucket_start < end,
+    )
+    if metrics:
+        q = q.filter(SensorRollup.metric.in_(list(metrics)))
+    return q.order_by(SensorRollup.bucket_start).all()
+
+
+def compact_sensor_data(
+    db: Session,
+    raw_retention_days: int,
+    minute_retention_days: int,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    删除超过保留期的原始数据与 1m 聚合（1h/1d 聚合长期保留）。
+    截止时间对齐到零点，保证仍保留的原始数据总是覆盖完整的自然日，便于 rebuild_sensor_rollups 重建。
+    """
+    today = bucket_start(now or datetime.utcnow(), "1d")
+    raw_cutoff = today - timedelta(days=raw_retention_days)
+    minute_cutoff = today - timedelta(days=minute_retention_days)
+    raw = db.query(SensorReading).filter(SensorReading.captured_at < raw_cutoff).delete(synchronize_session=False)
+    minute = (
+        db.query(SensorRollup)
+        .filter(SensorRollup.resolution == "1m", SensorRollup.bucket_start < minute_cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return {"raw_deleted": raw, "minute_rollups_deleted": minute}
+
+
+def rebuild_sensor_rollups(db: Session, lake_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """
+    由现存原始数据重建预聚合（用于启用预聚合前的历史数据）。
+    仅覆盖原始数据仍在保留期内的自然日，更早的聚合保持不变。返回处理的原始行数。
+    """
+    base = db.query(SensorReading)
+    if lake_id is not None:
+        base = base.filter(SensorReading.lake_id == lake_id)
+    earliest = base.with_entities(func.min(SensorReading.captured_at)).scalar()
+    if earliest is None:
+        return 0
+    since = bucket_start(earliest, "1d")
+    stale = db.query(SensorRollup).filter(SensorRollup.bucket_start >= since)
+    if lake_id is not None:
+        stale = stale.filter(SensorRollup.lake_id == lake_id)
+    stale.delete(synchronize_session=False)
+
+    columns = [getattr(SensorReading, c) for c in ("id", "lake_id", "captured_at") + SENSOR_FIELDS]
+    processed = 0
+    last_id = 0
+    while True:
+        batch = base.with_entities(*columns).filter(SensorReading.id > last_id).order_by(SensorReading.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        upsert_rollups(db, aggregate_rollups(r._asdict() for r in batch))
+        processed += len(batch)
+    db.commit()
+    return processed
+
+
+def get_latest_sensor_reading(db: Session, lake_id: int) -> Optional[LatestSensorReading]:
+    """读取湖区最新传感器数据（物化表主键查找）；原始行 id 为 reading_id。"""
+    return db.get(LatestSensorReading, lake_id, populate_existing=True)
\ No newline at end of file
@@ -1,20 +1,27 @@
-from typing import List
+from typing import Iterator, List, Tuple
+from sqlalchemy import delete, func, insert, select
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.db.models import Subscription
+from app.db.models import Subscription, SubscriptionLake
 
 
 def upsert_subscription(db: Session, openid: str, lake_ids: List[int], threshold: int = 90) -> Subscription:
-    """根据 openid 更新或创建订阅。lake_ids 存 CSV。"""
-    csv = ",".join(str(x) for x in lake_ids)
+    """根据 openid 更新或创建订阅，并整体替换其订阅的湖区。"""
     sub = db.query(Subscription).filter(Subscription.openid == openid).first()
     if sub:
-        sub.lake_ids = csv
         sub.threshold = threshold
     else:
-        sub = Subscription(openid=openid, lake_ids=csv, threshold=threshold, created_at=datetime.utcnow())
+        sub = Subscription(openid=openid, threshold=threshold, created_at=datetime.utcnow())
         db.add(sub)
+    db.flush()
+    db.execute(delete(SubscriptionLake).where(SubscriptionLake.subscription_id == sub.id))
+    rows = [
+        {"subscription_id": sub.id, "lake_id": lake_id, "threshold": threshold if threshold is not None else 90}
+        for lake_id in dict.fromkeys(lake_ids)
+    ]
+    if rows:
+        db.execute(insert(SubscriptionLake), rows)
     db.commit()
     db.refresh(sub)
     return sub
@@ -24,14 +31,31 @@ def get_all_subscriptions(db: Session) -> List[Subscription]:
     return db.query(Subscription).all()
 
 
-def get_subscriptions_for_lake(db: Session, lake_id: int) -> List[Subscription]:
-    subs = db.query(Subscription).all()
-    result: List[Subscription] = []
-    for s in subs:
-        try:
-            ids = [int(x) for x in (s.lake_ids or '').split(',') if x]
-        except ValueError:
-            ids = []
-        if lake_id in ids:
-            result.append(s)
-    return result
\ No newline at end of file
+def get_subscription_lake_ids(db: Session, subscription_id: int) -> List[int]:
+    rows = db.query(SubscriptionLake.lake_id).filter(SubscriptionLake.subscription_id == subscription_id).order_by(SubscriptionLake.id)
+    return [r.lake_id for r in rows]
+
+
+def get_subscriptions_for_lake(db: Session, lake_id: int, max_threshold: int | None = None) -> List[Subscription]:
+    """订阅了某湖区的用户；给定 max_threshold 时只返回阈值不高于它的（走 (lake_id, threshold) 索引）。"""
+    q = db.query(Subscription).join(SubscriptionLake, SubscriptionLake.subscription_id == Subscription.id).filter(
+        SubscriptionLake.lake_id == lake_id
+    )
+    if max_threshold is not None:
+        q = q.filter(SubscriptionLake.threshold <= max_threshold)
+    return q.all()
+
+
+def subscription_version(db: Session) -> Tuple[int, int]:
+    """订阅关联表的变更标记 (行数, 最大 id)：任何订阅写入都会改变它（id 不复用）。"""
+    count, max_id = db.query(func.count(SubscriptionLake.id), func.max(SubscriptionLake.id)).one()
+    return count or 0, max_id or 0
+
+
+def iter_subscription_lakes(db: Session) -> Iterator[Tuple[int, int, str]]:
+    """流式读取全部 (lake_id, threshold, openid)（不排序，由调用方分湖区排序），供构建内存倒排索引。"""
+    stmt = select(SubscriptionLake.lake_id, SubscriptionLake.threshold, Subscription.openid).join(
+        Subscription, Subscription.id == SubscriptionLake.subscription_id
+    )
+    for row in db.execute(stmt):
+        yield tuple(row)
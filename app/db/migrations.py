@@ -0,0 +1,129 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.db.session import Base, engine as default_engine
+
+logger = logging.getLogger("migrations")
+
+# 已有数据库（如线上的 data.db）的增量升级：create_all 只会建缺失的表，
+# 不会给已存在的表补索引，也不会回填物化表。本模块幂等，可在每次启动时执行：
+#   python -m app.db.migrations
+
+# 物化表回填：每个湖区取时间最新（同一时间取 id 最大）的一行；按湖区逐个查找，避免逐行关联子查询
+_BACKFILL_LATEST = {
+    "current_predictions": """
+        INSERT INTO current_predictions (lake_id, lake_name, score, best_start, best_end, updated_at)
+        SELECT p.lake_id, p.lake_name, p.score, p.best_start, p.best_end, p.updated_at
+        FROM predictions p
+        WHERE p.id IN (
+            SELECT (
+                SELECT p2.id FROM predictions p2
+                WHERE p2.lake_id = l.lake_id
+                ORDER BY p2.updated_at DESC, p2.id DESC LIMIT 1
+            )
+            FROM (SELECT DISTINCT lake_id FROM predictions) l
+        )
+    """,
+    "realtime_indices_latest": """
+        INSERT INTO realtime_indices_latest (lake_id, record_id, lake_name, score, captured_at, image_path)
+        SELECT r.lake_id, r.id, r.lake_name, r.score, r.captured_at, r.image_path
+        FROM realtime_indices r
+        WHERE r.id IN (
+            SELECT (
+                SELECT r2.id FROM realtime_indices r2
+                WHERE r2.lake_id = l.lake_id
+                ORDER BY r2.captured_at DESC, r2.id DESC LIMIT 1
+            )
+            FROM (SELECT DISTINCT lake_id FROM realtime_indices) l
+        )
+    """,
+    "sensor_readings_latest": """
+        INSERT INTO sensor_readings_latest (lake_id, reading_id, captured_at, air_temp, humidity, wind_speed,
+                                            water_temp, salinity, dissolved_oxygen, tds, turbidity)
+        SELECT s.lake_id, s.id, s.captured_at, s.air_temp, s.humidity, s.wind_speed,
+               s.water_temp, s.salinity, s.dissolved_oxygen, s.tds, s.turbidity
+        FROM sensor_readings s
+        WHERE s.id IN (
+            SELECT (
+                SELECT s2.id FROM sensor_readings s2
+                WHERE s2.lake_id = l.lake_id
+                ORDER BY s2.captured_at DESC, s2.id DESC LIMIT 1
+            )
+            FROM (SELECT DISTINCT lake_id FROM sensor_readings) l
+        )
+    """,
+}
+
+
+def _migrate_subscription_csv(conn) -> int:
+    """旧版 subscriptions.lake_ids（CSV）迁移到 subscription_lakes 关联表；旧列保留不删，仅在关联表为空时执行。"""
+    columns = {c["name"] for c in inspect(conn).get_columns("subscriptions")}
+    if "lake_ids" not in columns:
+        return 0
+    if conn.execute(text("SELECT 1 FROM subscription_lakes LIMIT 1")).first() is not None:
+        return 0
+    rows = []
+    for sub_id, csv, threshold in conn.execute(text("SELECT id, lake_ids, threshold FROM subscriptions")):
+        seen = set()
+        for part in (csv or "").split(","):
+            try:
+                lake_id = int(part)
+            except ValueError:
+                continue
+            if lake_id not in seen:
+                seen.add(lake_id)
+                rows.append({"sid": sub_id, "lake": lake_id, "th": threshold if threshold is not None else 90})
+    if rows:
+        conn.execute(text("INSERT INTO subscription_lakes (subscription_id, lake_id, threshold) VALUES (:sid, :lake, :th)"), rows)
+    return len(rows)
+
+
+def upgrade(engine=None) -> dict:
+    """建缺失的表与索引，并回填空的物化表。返回本次执行的变更摘要。"""
+    from app.db import models, models_attractions, models_community  # noqa: F401  注册模型
+    from app.db.attractions_fts import FTS_TABLE, ensure_fts_table, rebuild_attractions_fts
+
+    engine = engine or default_engine
+    created_tables, created_indexes, backfilled = [], [], {}
+    existing = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    created_tables = [t for t in Base.metadata.tables if t not in existing]
+
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if table.name in created_tables:
+                continue
+            present = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(conn)
+                    created_indexes.append(index.name)
+        for name, sql in _BACKFILL_LATEST.items():
+            if conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+                count = conn.execute(text(sql)).rowcount
+                if count:
+                    backfilled[name] = count
+        migrated = _migrate_subscription_csv(conn)
+        if migrated:
+            backfilled["subscription_lakes"] = migrated
+        if engine.dialect.name == "sqlite" and created_indexes:
+            conn.execute(text("ANALYZE"))
+
+    # 景点全文索引（FTS5 虚表不在 metadata 中）：缺失时创建并全量构建，条数不一致时重建
+    if ensure_fts_table(engine):
+        with Session(bind=engine) as db:
+            indexed = db.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+            if indexed != db.execute(text("SELECT count(*) FROM attractions")).scalar():
+                backfilled[FTS_TABLE] = rebuild_attractions_fts(db)
+
+    summary = {"tables": created_tables, "indexes": created_indexes, "backfilled": backfilled}
+    logger.info(f"数据库升级完成: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(upgrade())
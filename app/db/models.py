@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, UniqueConstraint
 from datetime import datetime
 
 from app.db.session import Base
 
 
 class Prediction(Base):
+    """预测历史归档（只追加）。接口读取当前预测请用 CurrentPrediction。"""
     __tablename__ = "predictions"
     id = Column(Integer, primary_key=True, index=True)
     lake_id = Column(Integer, index=True)
@@ -15,8 +16,23 @@ class Prediction(Base):
     updated_at = Column(DateTime, default=datetime.utcnow)
 
 
+class CurrentPrediction(Base):
+    """每个湖区当前有效的预测，每次刷新整体覆盖写入（与归档同一事务）。"""
+    __tablename__ = "current_predictions"
+    lake_id = Column(Integer, primary_key=True, autoincrement=False)
+    lake_name = Column(String)
+    score = Column(Integer)
+    best_start = Column(String)
+    best_end = Column(String)
+    updated_at = Column(DateTime)
+
+
 class RealtimeIndexRecord(Base):
     __tablename__ = "realtime_indices"
+    __table_args__ = (
+        # 按湖区取最新一条 / 按天求平均分：含 score 的覆盖索引，无需回表
+        Index("ix_realtime_indices_lake_captured", "lake_id", "captured_at", "score"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     lake_id = Column(Integer, index=True)
     lake_name = Column(String)
@@ -29,13 +45,53 @@ class Subscription(Base):
     __tablename__ = "subscriptions"
     id = Column(Integer, primary_key=True, index=True)
     openid = Column(String, unique=True, index=True)
-    lake_ids = Column(String)  # 简化：CSV形式
     threshold = Column(Integer, default=90)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class SubscriptionLake(Base):
+    """订阅与湖区的关联（取代原 CSV 列）。threshold 冗余自订阅，便于按 (lake_id, threshold) 范围查询。"""
+    __tablename__ = "subscription_lakes"
+    __table_args__ = (
+        UniqueConstraint("subscription_id", "lake_id", name="uq_subscription_lake"),
+        Index("ix_subscription_lakes_lake_threshold", "lake_id", "threshold"),
+        # id 不复用，(count, max(id)) 可作为订阅数据的变更标记
+        {"sqlite_autoincrement": True},
+    )
+    id = Column(Integer, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False)
+    lake_id = Column(Integer, nullable=False)
+    threshold = Column(Integer, nullable=False)
+
+
+class PushMessage(Base):
+    """推送发件箱：按 (openid, 湖区, 时间窗口) 去重，由推送工作线程批量投递、失败退避重试。"""
+    __tablename__ = "push_outbox"
+    __table_args__ = (
+        # 工作线程按状态取到期消息
+        Index("ix_push_outbox_status_due", "status", "next_attempt_at"),
+    )
+    id = Column(Integer, primary_key=True)
+    dedup_key = Column(String, unique=True, nullable=False)
+    provider = Column(String(32), default="wechat")
+    openid = Column(String, nullable=False)
+    lake_id = Column(Integer)
+    window = Column(String)
+    title = Column(String)
+    body = Column(String)
+    status = Column(String(16), default="pending")  # pending / sending / sent / dead
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
 class SensorReading(Base):
     __tablename__ = "sensor_readings"
+    __table_args__ = (
+        Index("ix_sensor_readings_lake_captured", "lake_id", "captured_at"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     lake_id = Column(Integer, index=True)
     captured_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -46,4 +102,49 @@ class SensorReading(Base):
     salinity = Column(Integer, nullable=True)
     dissolved_oxygen = Column(Integer, nullable=True)
     tds = Column(Integer, nullable=True)
-    turbidity = Column(Integer, nullable=True)
\ No newline at end of file
+    turbidity = Column(Integer, nullable=True)
+
+
+class LatestRealtimeIndex(Base):
+    """每个湖区最新一条实时指数（写入时同步更新），取最新值为主键查找。"""
+    __tablename__ = "realtime_indices_latest"
+    lake_id = Column(Integer, primary_key=True, autoincrement=False)
+    record_id = Column(Integer)
+    lake_name = Column(String)
+    score = Column(Integer)
+    captured_at = Column(DateTime)
+    image_path = Column(String, nullable=True)
+
+
+class LatestSensorReading(Base):
+    """每个湖区最新一条传感器数据（写入时同步更新），字段与 SensorReading 一致，reading_id 指向原始行。"""
+    __tablename__ = "sensor_readings_latest"
+    lake_id = Column(Integer, primary_key=True, autoincrement=False)
+    reading_id = Column(Integer)
+    captured_at = Column(DateTime)
+    air_temp = Column(Integer, nullable=True)
+    humidity = Column(Integer, nullable=True)
+    wind_speed = Column(Integer, nullable=True)
+    water_temp = Column(Integer, nullable=True)
+    salinity = Column(Integer, nullable=True)
+    dissolved_oxygen = Column(Integer, nullable=True)
+    tds = Column(Integer, nullable=True)
+    turbidity = Column(Integer, nullable=True)
+
+
+class SensorRollup(Base):
+    """传感器预聚合：每湖区、每指标在 1m/1h/1d 时间桶内的 min/max/sum/count（avg = sum / count）。"""
+    __tablename__ = "sensor_rollups"
+    __table_args__ = (
+        # 同时作为按时间范围查询的索引：lake_id + resolution 等值，bucket_start 范围扫描
+        UniqueConstraint("lake_id", "resolution", "bucket_start", "metric", name="uq_sensor_rollup_bucket"),
+    )
+    id = Column(Integer, primary_key=True)
+    lake_id = Column(Integer, nullable=False)
+    resolution = Column(String(4), nullable=False)  # 1m / 1h / 1d
+    bucket_start = Column(DateTime, nullable=False)
+    metric = Column(String(32), nullable=False)
+    min_value = Column(Float)
+    max_value = Column(Float)
+    sum_value = Column(Float)
+    count = Column(Integer)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -11,3 +11,8 @@ class CommunityPost(Base):
     author_name = Column(String, default="Visitor")
     likes = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # 信息流键集分页与热门榜时间窗口扫描
+        Index("ix_community_posts_created_id", "created_at", "id"),
+    )
@@ -0,0 +1,57 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+# ON CONFLICT upsert 的方言适配：SQLite 与 PostgreSQL 语法一致（仅两参数 min/max 函数名不同），
+# 其它数据库返回 None，由调用方回退为先查后写。
+
+
+def conflict_insert(db: Session, table):
+    """返回支持 on_conflict_do_update 的 insert(table)；当前数据库不支持时返回 None。"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(table)
+
+
+def least(db: Session, a, b):
+    return func.least(a, b) if db.get_bind().dialect.name == "postgresql" else func.min(a, b)
+
+
+def greatest(db: Session, a, b):
+    return func.greatest(a, b) if db.get_bind().dialect.name == "postgresql" else func.max(a, b)
+
+
+def upsert_latest(db: Session, model, rows, key: str = "lake_id", ts: str = "captured_at", newer_only: bool = True) -> int:
+    """
+    按 key 覆盖写入“最新一条”物化表。newer_only 时仅当新行时间不早于已有行才覆盖（乱序补传的历史数据不会回退最新值），
+    否则无条件覆盖。rows 中同一 key 只保留时间最新的一行。不提交事务。
+    """
+    latest = {}
+    for row in rows:
+        cur = latest.get(row[key])
+        if cur is None or row[ts] >= cur[ts]:
+            latest[row[key]] = row
+    if not latest:
+        return 0
+    table = model.__table__
+    stmt = conflict_insert(db, table)
+    if stmt is None:
+        for row in latest.values():
+            rec = db.get(model, row[key])
+            if rec is None:
+                db.add(model(**row))
+            elif not newer_only or getattr(rec, ts) is None or row[ts] >= getattr(rec, ts):
+                for k, v in row.items():
+                    setattr(rec, k, v)
+        return len(latest)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={c: stmt.excluded[c] for c in next(iter(latest.values())) if c != key},
+        where=(table.c[ts] <= stmt.excluded[ts]) if newer_only else None,
+    )
+    db.execute(stmt, list(latest.values()))
+    return len(latest)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from typing import Optional
 from datetime import datetime
 
+from app.utils.thumbnail_urls import thumbnail_url
+
 
 class AttractionBase(BaseModel):
     """景点基础模型"""
@@ -44,11 +46,21 @@ class AttractionResponse(AttractionBase):
     id: int
     created_at: datetime
     updated_at: datetime
+
+    @computed_field(description="列表卡片用的封面缩略图（未生成时为原图）")
+    @property
+    def cover_thumbnail(self) -> Optional[str]:
+        return thumbnail_url(self.cover_image) or self.cover_image
     
     class Config:
         from_attributes = True
 
 
+class NearbyAttractionResponse(AttractionResponse):
+    """附近景点响应模型（distance 为按当前位置实时计算的距离文本）"""
+    distance_km: Optional[float] = Field(None, description="与查询位置的球面距离（公里）")
+
+
 class AttractionListResponse(BaseModel):
     """景点列表响应模型"""
     total: int
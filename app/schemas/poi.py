@@ -18,6 +18,7 @@ class PointRecommendation(BaseModel):
     ui_category_icon: Optional[str] = None
     ui_is_photo_hotspot: bool = False
     ui_cover_image: Optional[str] = None
+    ui_cover_thumbnail: Optional[str] = None
     
     # 经纬度
     latitude: Optional[float] = None
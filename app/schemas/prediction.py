@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 
 
@@ -7,6 +7,10 @@ class TimeWindow(BaseModel):
     end: str
 
 
+class ScoredWindow(TimeWindow):
+    score: int
+
+
 class LakePrediction(BaseModel):
     lake_id: int
     lake_name: str
@@ -15,6 +19,7 @@ class LakePrediction(BaseModel):
     updated_at: str
     reason: Optional[str] = None
     factors: Optional[Dict[str, Any]] = None
+    windows: Optional[List[ScoredWindow]] = None
 
 
 class RealtimeIndex(BaseModel):
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class SensorReadingCreate(BaseModel):
@@ -24,4 +24,31 @@ class SensorReadingResponse(BaseModel):
     salinity: Optional[float] = None
     dissolved_oxygen: Optional[float] = None
     tds: Optional[float] = None
-    turbidity: Optional[float] = None
\ No newline at end of file
+    turbidity: Optional[float] = None
+
+class SensorRowError(BaseModel):
+    index: int  # 在请求中的行号（从0开始；NDJSON 为非空行序号）
+    error: str
+
+class SensorBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: List[SensorRowError] = []
+    truncated_at: Optional[int] = None  # NDJSON 超过行数上限时第一条未处理的行号，之前的行已写入
+
+class SensorMetricStats(BaseModel):
+    min: float
+    max: float
+    avg: float
+    count: int
+
+class SensorSeriesPoint(BaseModel):
+    t: str  # 时间桶起点（ISO）
+    metrics: Dict[str, SensorMetricStats]
+
+class SensorSeriesResponse(BaseModel):
+    lake_id: int
+    resolution: str
+    start: str
+    end: str
+    points: List[SensorSeriesPoint]
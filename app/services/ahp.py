@@ -1,4 +1,22 @@
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Tuple
+
+
+@lru_cache(maxsize=1024)
+def _weights_for(comp_at: float, comp_tc: float, comp_ac: float) -> Tuple[float, float, float]:
+    matrix = [
+        [1.0,      comp_at,    comp_ac],
+        [1.0/comp_at, 1.0,     comp_tc],
+        [1.0/comp_ac, 1.0/comp_tc, 1.0]
+    ]
+    gm = [0.0] * 3
+    for i in range(3):
+        product = 1.0
+        for j in range(3):
+            product *= matrix[i][j]
+        gm[i] = product ** (1.0/3.0)
+    total = sum(gm)
+    return tuple(x / total for x in gm)
 
 class AHPCalculator:
     """
@@ -37,25 +55,9 @@ class AHPCalculator:
         # 为了处理一致性，我们通常尽量使用传递性，但在用户输入场景下，
         # 我们直接使用用户输入的三个值构建矩阵（即使可能不完全一致）
         
-        matrix = [
-            [1.0,      comp_at,    comp_ac],
-            [1.0/comp_at, 1.0,     comp_tc],
-            [1.0/comp_ac, 1.0/comp_tc, 1.0]
-        ]
-        
         # 使用几何平均法计算权重 (Geometric Mean Method)
         # 这种方法对于3x3矩阵计算简单且效果好
-        
-        gm = [0.0] * 3
-        for i in range(3):
-            product = 1.0
-            for j in range(3):
-                product *= matrix[i][j]
-            gm[i] = product ** (1.0/3.0)
-            
-        # 归一化
-        total = sum(gm)
-        weights = [x / total for x in gm]
+        weights = AHPCalculator.weight_vector(comp_at, comp_tc, comp_ac)
         
         return {
             "accessibility": weights[0],
@@ -63,6 +65,17 @@ class AHPCalculator:
             "colorfulness": weights[2]
         }
 
+    @staticmethod
+    def weight_vector(comp_at: float, comp_tc: float, comp_ac: float) -> Tuple[float, float, float]:
+        """
+        (可达性, 主题性, 色彩性) 权重向量。判断值按 6 位小数归一后缓存，
+        同一组偏好（小程序里只有有限的几档）只计算一次。非正数判断值抛出 ValueError。
+        """
+        key = tuple(round(float(x), 6) for x in (comp_at, comp_tc, comp_ac))
+        if min(key) <= 0:
+            raise ValueError(f"AHP 判断值必须为正数: {key}")
+        return _weights_for(*key)
+
     @staticmethod
     def calculate_score(attraction, weights: Dict[str, float]) -> float:
         """
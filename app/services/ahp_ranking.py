@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db.crud_attractions import attractions_version, get_recommended_score_rows
+from app.services.ahp import AHPCalculator
+
+# /attractions/recommend 的 AHP 排序：全部推荐景点的三列得分（可达性、主题性、色彩性）预先组成 n×3 矩阵，
+# 每次请求只需一次矩阵-向量乘法得到综合得分，再用 argpartition 取前 k 个，不再逐个 getattr 打分排序，也不再限制候选数。
+# 缺失或为 0 的得分按 0.5 处理（与 AHPCalculator.calculate_score 一致）；同分时保持列表默认顺序。
+# 景点增删改后 attractions_version 变化，下次请求时重建；另每 AHP_MATRIX_TTL 秒（默认 300）重建一次，覆盖其他进程的写入。
+
+
+class ScoreMatrix:
+    def __init__(self, rows):
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        scores = np.array([[v or 0.5 for v in r[1:]] for r in rows], dtype=np.float64)
+        self.scores = scores.reshape(len(rows), 3)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def top_k(self, weights, k: int) -> List[int]:
+        """综合得分最高的 k 个景点 id（得分降序，同分按默认顺序）。"""
+        n = len(self.ids)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        total = self.scores @ np.asarray(weights, dtype=np.float64)
+        idx = np.argpartition(-total, k - 1)[:k] if k < n else np.arange(n)
+        # 先按位置再按得分稳定排序：得分降序、同分保持默认顺序
+        idx = np.sort(idx)
+        idx = idx[np.argsort(-total[idx], kind="stable")]
+        # argpartition 在第 k 名有并列时可能选到靠后的同分项，按默认顺序替换为靠前的
+        kth = total[idx[-1]]
+        ties = np.flatnonzero(total == kth)
+        if len(ties) > 1:
+            above = idx[total[idx] > kth]
+            idx = np.concatenate([above, ties[: k - len(above)]])
+        return self.ids[idx].tolist()
+
+
+class AHPRanking:
+    """进程内共享的推荐景点得分矩阵，按景点版本号与 TTL 自动重建。"""
+
+    def __init__(self):
+        self._matrix: Optional[ScoreMatrix] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> ScoreMatrix:
+        ttl = float(os.getenv("AHP_MATRIX_TTL", "300"))
+        version = attractions_version()
+        matrix = self._matrix
+        if matrix is not None and self._version == version and time.monotonic() - self._built_at <= ttl:
+            return matrix
+        with self._lock:
+            if self._matrix is not None and self._version == version and time.monotonic() - self._built_at <= ttl:
+                return self._matrix
+            built = ScoreMatrix(get_recommended_score_rows(db))
+            self._matrix, self._version, self._built_at = built, version, time.monotonic()
+            return built
+
+    def invalidate(self):
+        with self._lock:
+            self._matrix = None
+
+    def rank(self, db: Session, comp_at: float, comp_tc: float, comp_ac: float, limit: int) -> List[int]:
+        """按 AHP 权重排序的前 limit 个推荐景点 id；判断值非法时按默认顺序返回。"""
+        matrix = self.get(db)
+        try:
+            weights = AHPCalculator.weight_vector(comp_at, comp_tc, comp_ac)
+        except (ValueError, ZeroDivisionError, TypeError):
+            return matrix.ids[:limit].tolist()
+        return matrix.top_k(weights, limit)
+
+
+ahp_ranking = AHPRanking()
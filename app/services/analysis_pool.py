@@ -0,0 +1,225 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("analysis_pool")
+
+# 图像解码与 HSV 分析是 CPU 密集型任务，放到进程池中绕开 GIL。
+# ANALYSIS_WORKERS 控制进程数（默认 min(4, CPU 核数)），设为 0 则始终在当前进程内串行执行。
+# 子进程用 spawn 启动：服务进程内有多个线程（调度器、RTSP 接入、点赞刷新），fork 可能复制到被持有的锁。
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_fallback_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _workers() -> int:
+    return int(os.getenv("ANALYSIS_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """返回进程级共享的进程池；ANALYSIS_WORKERS=0 时返回 None。"""
+    global _pool
+    if _workers() <= 0:
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=get_context("spawn"))
+    return _pool
+
+
+def reset_pool(broken: Optional[ProcessPoolExecutor] = None):
+    """
+    丢弃当前进程池（仅用于子进程崩溃导致 BrokenProcessPool 后），下次调用时重建。
+    传入 broken 时只在它仍是当前进程池时丢弃，避免并发调用方把别人刚重建的池关掉。
+    """
+    global _pool
+    with _lock:
+        if broken is not None and _pool is not broken:
+            return
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_image_file(path: str) -> Optional[Dict]:
+    """
+    进程池任务：读取图片并计算色彩特征、图像得分与文字原因。
+    返回 {"score", "reason", "features"}；OpenCV 不可用时返回 None。
+    """
+    from app.services.image_analysis import cv2
+
+    if cv2 is None:
+        return None
+    return analyze_image(cv2.imread(path))
+
+
+class ImageDecodeError(ValueError):
+    pass
+
+
+def analyze_upload(path: str, submitted_at: float) -> Tuple[Optional[Dict], Dict[str, float]]:
+    """
+    进程池任务：从磁盘解码已流式落盘的上传图片并分析，图片字节不经进程间传递。
+    返回 (分析结果, 各阶段耗时毫秒)；OpenCV 不可用时分析结果为 None，无法解码时抛出 ImageDecodeError。
+    """
+    from app.services.image_analysis import cv2
+
+    started = time.time()
+    timings = {"queue_wait": (started - submitted_at) * 1000}
+    if cv2 is None:
+        return None, timings
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    decoded = time.time()
+    timings["decode"] = (decoded - started) * 1000
+    if img is None:
+        raise ImageDecodeError("无法解码图片")
+    analysis = analyze_image(img)
+    timings["analyze"] = (time.time() - decoded) * 1000
+    return analysis, timings
+
+
+def analyze_image(img) -> Optional[Dict]:
+    """进程池任务：分析已解码的 BGR 帧（如 RTSP 接入服务内存中的最新帧）。"""
+    from app.services.image_analysis import cv2, compute_color_features, score_from_features, build_reason_from_features
+
+    if cv2 is None:
+        return None
+    feats = compute_color_features(img)
+    return {
+        "score": int(score_from_features(feats)),
+        "reason": build_reason_from_features(feats),
+        "features": feats,
+    }
+
+
+# ---- 有界提交（上传接口使用）----
+# 同时在途（排队 + 执行中）的上传分析任务不超过 ANALYSIS_QUEUE_SIZE（默认 进程数×4），
+# 超出时 submit_upload_analysis 立即抛出 AnalysisQueueFull，接口返回 429，避免请求无限堆积。
+
+
+class AnalysisQueueFull(Exception):
+    pass
+
+
+class _StageStats:
+    """各阶段耗时（毫秒）的最近样本，用于输出 p50/p95/max。"""
+
+    def __init__(self, window: int = 512):
+        self._samples: Dict[str, deque] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, timings: Dict[str, float]):
+        with self._lock:
+            for stage, ms in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=self._window)).append(ms)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._samples.items()}
+        out = {}
+        for stage, values in snapshot.items():
+            n = len(values)
+            out[stage] = {
+                "count": n,
+                "p50_ms": round(values[n // 2], 2),
+                "p95_ms": round(values[min(n - 1, int(n * 0.95))], 2),
+                "max_ms": round(values[-1], 2),
+            }
+        return out
+
+
+class _UploadQueue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.stages = _StageStats()
+
+    @staticmethod
+    def capacity() -> int:
+        return int(os.getenv("ANALYSIS_QUEUE_SIZE", str(max(1, _workers()) * 4)))
+
+    def submit(self, path: str) -> Future:
+        with self._lock:
+            if self._in_flight >= self.capacity():
+                self.rejected += 1
+                raise AnalysisQueueFull("图像分析队列已满")
+            self._in_flight += 1
+            self.submitted += 1
+        submitted_at = time.time()
+        executor = _executor()
+        try:
+            future = executor.submit(analyze_upload, path, submitted_at)
+        except (BrokenProcessPool, RuntimeError):
+            # 进程池已损坏或刚被其他调用方关闭：重建后再提交一次
+            reset_pool(executor)
+            try:
+                future = _executor().submit(analyze_upload, path, submitted_at)
+            except Exception:
+                self._done()
+                raise
+        future.add_done_callback(lambda f: self._finished(f, submitted_at))
+        return future
+
+    def _done(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _finished(self, future: Future, submitted_at: float):
+        self._done()
+        total = {"total": (time.time() - submitted_at) * 1000}
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                self.failed += 1
+            self.stages.record(total)
+            return
+        _, timings = future.result()
+        self.stages.record({**timings, **total})
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = {
+                "queue_depth": self._in_flight,
+                "capacity": self.capacity(),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+        counters["workers"] = _workers()
+        counters["stages"] = self.stages.summary()
+        return counters
+
+
+def _executor():
+    """进程池不可用（ANALYSIS_WORKERS=0）时退回线程池，至少不阻塞事件循环。"""
+    global _fallback_pool
+    pool = get_pool()
+    if pool is not None:
+        return pool
+    with _lock:
+        if _fallback_pool is None:
+            _fallback_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+        return _fallback_pool
+
+
+upload_queue = _UploadQueue()
+
+
+def submit_upload_analysis(path: str) -> Future:
+    """提交已落盘上传图片的解码与分析；队列已满时抛出 AnalysisQueueFull。结果为 (分析结果, 各阶段耗时)。"""
+    return upload_queue.submit(path)
+
+
+def analysis_stats() -> Dict:
+    return upload_queue.stats()
@@ -0,0 +1,236 @@
+import os
+import heapq
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from app.db.session import SessionLocal
+from app.db.crud_community import add_likes, get_posts_by_ids, get_recent_post_stats
+
+logger = logging.getLogger("community_feed")
+
+# 社区信息流的两个热点：
+# 1. 点赞缓冲：点赞先累加到内存，由后台线程每 LIKE_FLUSH_INTERVAL 秒（默认 1）把各帖子的增量
+#    合并为一次批量 UPDATE likes = likes + Δ 写库；爆款帖子的点赞风暴不再是逐条写事务。
+#    待写入的增量会叠加到接口返回的点赞数上；进程异常退出最多丢失一个刷新周期的点赞。
+#    读库不持锁（counts / add_and_count）：读库期间若有批次正在写库，结果无法判断是否已含该批次，
+#    等该批次写完后重读，避免同一批点赞被计两次或漏计；读请求之间互不阻塞，也不阻塞刷新。
+#    LIKE_FLUSH_INTERVAL=0 关闭缓冲，每次点赞直接执行原子 UPDATE。
+#    LIKE_FLUSH_MAX（默认 1000）：待写入点赞超过该值时立即刷新。
+# 2. 热门榜：按 点赞 / (发布小时数 + 2)^TRENDING_GRAVITY 打分，只看最近 TRENDING_WINDOW_DAYS 天的帖子，
+#    结果缓存 TRENDING_TTL 秒（默认 300）；过期后由一个请求重算，其他请求继续使用旧榜单。
+
+
+class LikeCounter:
+    def __init__(self, interval: Optional[float] = None, max_pending: Optional[int] = None):
+        self.interval = interval if interval is not None else float(os.getenv("LIKE_FLUSH_INTERVAL", "1"))
+        self.max_pending = max_pending or int(os.getenv("LIKE_FLUSH_MAX", "1000"))
+        self._pending: Dict[int, int] = {}
+        self._inflight: Dict[int, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._writing = False
+        self._epoch = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+
+    @property
+    def buffered(self) -> bool:
+        return self.interval > 0
+
+    def add(self, post_id: int, count: int = 1) -> int:
+        """记一次点赞，返回该帖子尚未写库的点赞数（含正在写入的）。"""
+        self._ensure_started()
+        with self._lock:
+            full = self._add_locked(post_id, count)
+            pending = self._pending[post_id] + self._inflight.get(post_id, 0)
+        if full:
+            self._wake.set()
+        return pending
+
+    def _add_locked(self, post_id: int, count: int) -> bool:
+        self._pending[post_id] = self._pending.get(post_id, 0) + count
+        self._total += count
+        return self._total >= self.max_pending
+
+    def pending(self, post_id: int) -> int:
+        with self._lock:
+            return self._pending.get(post_id, 0) + self._inflight.get(post_id, 0)
+
+    def pending_many(self, post_ids: List[int]) -> Dict[int, int]:
+        with self._lock:
+            return {pid: self._pending.get(pid, 0) + self._inflight.get(pid, 0) for pid in post_ids}
+
+    def counts(self, read_counts: Callable[[List[int]], Dict[int, int]], post_ids: List[int]) -> Dict[int, int]:
+        """库中点赞数 + 缓冲增量；read_counts 为按 id 批量读库的函数，不存在的帖子不在结果中。"""
+        return self._read_with_pending(read_counts, post_ids)
+
+    def add_and_count(self, post_id: int, read_counts: Callable[[List[int]], Dict[int, int]]) -> Optional[int]:
+        """记一次点赞并返回最新总数；帖子不存在时返回 None 且不计数。"""
+        self._ensure_started()
+        return self._read_with_pending(read_counts, [post_id], like=post_id).get(post_id)
+
+    def _read_with_pending(
+        self,
+        read_counts: Callable[[List[int]], Dict[int, int]],
+        post_ids: List[int],
+        like: Optional[int] = None,
+    ) -> Dict[int, int]:
+        while True:
+            with self._lock:
+                while self._writing:
+                    self._settled.wait()
+                epoch = self._epoch
+            stored = read_counts(post_ids)
+            full = False
+            with self._lock:
+                if self._writing or self._epoch != epoch:
+                    continue
+                if like is not None and like in stored:
+                    full = self._add_locked(like, 1)
+                out = {
+                    pid: n + self._pending.get(pid, 0) + self._inflight.get(pid, 0)
+                    for pid, n in stored.items()
+                }
+            if full:
+                self._wake.set()
+            return out
+
+    def flush(self) -> int:
+        """把累计的增量写库，返回写入的点赞数；失败时增量放回缓冲，下次重试。"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+                self._total = 0
+                self._writing = True
+                batch = self._inflight
+            db = SessionLocal()
+            try:
+                add_likes(db, batch)
+            except Exception as e:
+                logger.warning(f"点赞写库失败，稍后重试: {e}")
+                with self._lock:
+                    for pid, n in batch.items():
+                        self._pending[pid] = self._pending.get(pid, 0) + n
+                        self._total += n
+                    self._settle_locked()
+                return 0
+            finally:
+                db.close()
+            with self._lock:
+                self._settle_locked()
+            written = sum(batch.values())
+            self.flushed += written
+            return written
+
+    def _settle_locked(self):
+        self._inflight = {}
+        self._writing = False
+        self._epoch += 1
+        self._settled.notify_all()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="like-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"点赞刷新线程异常: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        self.flush()
+
+
+def _age_hours(created: datetime, now: datetime) -> float:
+    if created.tzinfo is not None:
+        created = created.astimezone(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (now - created).total_seconds() / 3600)
+
+
+def trending_score(likes: int, created: datetime, now: datetime, gravity: float) -> float:
+    return likes / (_age_hours(created, now) + 2) ** gravity
+
+
+class TrendingCache:
+    def __init__(self, size: int = 100):
+        self.size = size
+        self._posts: List = []
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def ttl() -> float:
+        return float(os.getenv("TRENDING_TTL", "300"))
+
+    def recompute(self, likes: Optional[LikeCounter] = None) -> List:
+        """重算榜单（点赞数包含尚未写库的增量），返回帖子列表。"""
+        now = datetime.utcnow()
+        gravity = float(os.getenv("TRENDING_GRAVITY", "1.5"))
+        since = now - timedelta(days=float(os.getenv("TRENDING_WINDOW_DAYS", "7")))
+        db = SessionLocal()
+        try:
+            stats = get_recent_post_stats(db, since)
+            extra = likes.pending_many([pid for pid, _, _ in stats]) if likes is not None else {}
+            top = heapq.nlargest(
+                self.size,
+                stats,
+                key=lambda s: (trending_score(s[1] + extra.get(s[0], 0), s[2], now, gravity), s[0]),
+            )
+            posts = get_posts_by_ids(db, [pid for pid, _, _ in top])
+            for p in posts:
+                db.expunge(p)
+        finally:
+            db.close()
+        self._posts = posts
+        self._built_at = time.monotonic()
+        return posts
+
+    def get(self, likes: Optional[LikeCounter] = None) -> List:
+        """返回缓存的榜单；过期时由拿到锁的请求重算，其余请求返回旧榜单（首次构建时等待）。"""
+        fresh = self._built_at is not None and time.monotonic() - self._built_at <= self.ttl()
+        if fresh:
+            return self._posts
+        if self._built_at is None:
+            with self._lock:
+                if self._built_at is None:
+                    return self.recompute(likes)
+                return self._posts
+        if self._lock.acquire(blocking=False):
+            try:
+                return self.recompute(likes)
+            finally:
+                self._lock.release()
+        return self._posts
+
+    def invalidate(self):
+        self._built_at = None
+        self._posts = []
+
+
+like_counter = LikeCounter()
+trending_cache = TrendingCache()
+atexit.register(like_counter.stop)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+# 图像分析结果（色彩特征 + 图像得分 + 原因）的 LRU 缓存：
+# - 磁盘截图按 (路径, mtime, 大小) 作键，文件未变化则不重复解码与分析；
+# - 上传内容按 SHA-1 作键，同一张图重复上传只分析一次。
+# FEATURE_CACHE_SIZE 控制最多保留的条目数（默认 256），超出时淘汰最久未使用的条目。
+
+
+class FeatureCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Dict):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries), "max_entries": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+
+def file_key(path: str) -> Optional[tuple]:
+    """磁盘文件的缓存键；文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return ("file", os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def content_key(data: bytes) -> tuple:
+    """上传内容的缓存键。"""
+    return digest_key(hashlib.sha1(data).hexdigest())
+
+
+def digest_key(sha1_hex: str) -> tuple:
+    """已知 SHA-1（如流式落盘时边写边算）的上传内容缓存键，与 content_key 一致。"""
+    return ("sha1", sha1_hex)
+
+
+feature_cache = FeatureCache(int(os.getenv("FEATURE_CACHE_SIZE", "256")))
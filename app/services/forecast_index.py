@@ -0,0 +1,78 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+# 逐小时预报的时间索引：把 hours[*]["time"] 解析为时间戳后二分查找最近的小时，
+# 取代按字符串 list.index 精确匹配（匹配不到时退化为取中位小时）。
+# 同一份预报（缓存中的同一 hours 列表）只解析一次，供 attach_explanations、上传融合与 /weather/now2h 共用。
+
+
+def _to_ts(value: Union[str, datetime, None]) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    # 无时区的时间按服务器本地时间解释，与带 +08:00 的和风天气时间可直接比较
+    return value.timestamp()
+
+
+class HourlyForecast:
+    def __init__(self, hours: List[Dict]):
+        self.hours = hours
+        parsed = [(_to_ts(h.get("time")), i) for i, h in enumerate(hours)]
+        parsed = sorted(p for p in parsed if p[0] is not None)
+        self._ts = [p[0] for p in parsed]
+        self._pos = [p[1] for p in parsed]
+
+    def __len__(self) -> int:
+        return len(self.hours)
+
+    def nearest_index(self, when: Union[str, datetime]) -> Optional[int]:
+        """与 when 最接近的小时在 hours 中的下标；无法解析时返回 None。"""
+        ts = _to_ts(when)
+        if ts is None or not self._ts:
+            return None
+        i = bisect_left(self._ts, ts)
+        if i == len(self._ts) or (i > 0 and ts - self._ts[i - 1] <= self._ts[i] - ts):
+            i -= 1
+        return self._pos[i]
+
+    def current_index(self, now: Optional[datetime] = None) -> int:
+        """now 所在的小时（最后一个不晚于 now 的小时）；预报整体在 now 之后时返回 0。"""
+        if not self._ts:
+            return 0
+        i = bisect_right(self._ts, (now or datetime.now()).timestamp()) - 1
+        return self._pos[max(0, i)]
+
+    def pair_at(self, idx: int) -> Tuple[Dict, Dict]:
+        return self.hours[idx], self.hours[min(idx + 1, len(self.hours) - 1)]
+
+    def nearest_pair(self, when: Union[str, datetime]) -> Tuple[Dict, Dict]:
+        """以最接近 when 的小时开始的两小时窗口；无法解析时取中位窗口（保持原回退行为）。"""
+        idx = self.nearest_index(when)
+        if idx is None:
+            idx = max(0, min(len(self.hours) - 2, len(self.hours) // 2))
+        return self.pair_at(idx)
+
+
+_memo: List[HourlyForecast] = []
+_memo_lock = threading.Lock()
+_MEMO_SIZE = 8
+
+
+def forecast_index(forecast: Dict) -> HourlyForecast:
+    """返回预报的时间索引；按 hours 列表对象记忆，缓存命中的同一份预报不重复解析。"""
+    hours = forecast.get("hours", [])
+    with _memo_lock:
+        for idx in _memo:
+            if idx.hours is hours:
+                return idx
+    built = HourlyForecast(hours)
+    with _memo_lock:
+        _memo.insert(0, built)
+        del _memo[_MEMO_SIZE:]
+    return built
@@ -0,0 +1,130 @@
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db.crud_attractions import attractions_version, get_attraction_coordinates
+
+# 附近景点的内存网格索引：按 GEO_CELL_DEG（默认 0.05°，约 5.5 km）把坐标划入经纬网格，
+# 点按网格排序存成 NumPy 数组，每个网格对应数组中的一段连续切片。
+# 查询时只取覆盖半径的网格内的点，向量化计算 haversine 距离，再用 argpartition 取最近的 k 个。
+# 景点增删改后 attractions_version 变化，下次查询时重建（数万点为毫秒级）；
+# 另每 GEO_INDEX_TTL 秒（默认 300）重建一次，以覆盖其他进程直接写库的情况。
+# 坐标为 (0, 0) 的景点视为未设置坐标（sync_poi_to_attraction.py 的占位值），不参与索引。
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEG = EARTH_RADIUS_KM * math.pi / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """球面距离（公里）；参数可为标量或 NumPy 数组。"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    def __init__(self, points: Iterable[Tuple[int, float, float]], cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        pts = [(i, lat, lon) for i, lat, lon in points if not (lat == 0 and lon == 0)]
+        ids = np.array([p[0] for p in pts], dtype=np.int64)
+        lat = np.array([p[1] for p in pts], dtype=np.float64)
+        lon = np.array([p[2] for p in pts], dtype=np.float64)
+        cy = np.floor(lat / cell_deg).astype(np.int64)
+        cx = np.floor(lon / cell_deg).astype(np.int64)
+        order = np.lexsort((cx, cy))
+        self.ids, self.lat, self.lon = ids[order], lat[order], lon[order]
+        cy, cx = cy[order], cx[order]
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if len(self.ids):
+            starts = np.flatnonzero(np.r_[True, (cy[1:] != cy[:-1]) | (cx[1:] != cx[:-1])])
+            ends = np.r_[starts[1:], len(self.ids)]
+            for s, e in zip(starts.tolist(), ends.tolist()):
+                self._cells[(int(cy[s]), int(cx[s]))] = (s, e)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> Optional[np.ndarray]:
+        """覆盖半径的网格内的点下标；需要遍历的网格多于已有网格时返回 None（直接全量计算更快）。"""
+        # 略放大的外包矩形：经度跨度按圆内离赤道最远的纬度计算，保证不漏掉边界上的点
+        dlat = radius_km / _KM_PER_DEG * 1.01
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + dlat)))
+        dlon = min(180.0, dlat / cos_lat)
+        y0, y1 = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        x0, x1 = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self._cells) or dlon >= 180.0 or lon - dlon < -180 or lon + dlon > 180:
+            return None
+        slices = [
+            self._cells[(y, x)]
+            for y in range(y0, y1 + 1)
+            for x in range(x0, x1 + 1)
+            if (y, x) in self._cells
+        ]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in slices])
+
+    def nearest(self, lat: float, lon: float, radius_km: float, limit: int) -> List[Tuple[int, float]]:
+        """半径内最近的 limit 个点，返回 [(id, 距离公里)]，按距离升序。"""
+        if not len(self.ids) or limit <= 0:
+            return []
+        idx = self._candidates(lat, lon, radius_km)
+        if idx is None:
+            dist = haversine_km(lat, lon, self.lat, self.lon)
+            idx = np.arange(len(self.ids))
+        else:
+            if not len(idx):
+                return []
+            dist = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+        if len(dist) > limit:
+            part = np.argpartition(dist, limit - 1)[:limit]
+            idx, dist = idx[part], dist[part]
+        order = np.argsort(dist, kind="stable")
+        return [(int(self.ids[i]), float(d)) for i, d in zip(idx[order], dist[order])]
+
+
+class NearbyIndex:
+    """进程内共享的附近景点索引，按景点版本号与 TTL 自动重建。"""
+
+    def __init__(self):
+        self._index: Optional[GeoGridIndex] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> GeoGridIndex:
+        ttl = float(os.getenv("GEO_INDEX_TTL", "300"))
+        version = attractions_version()
+        index = self._index
+        if index is not None and self._version == version and time.monotonic() - self._built_at <= ttl:
+            return index
+        with self._lock:
+            if self._index is not None and self._version == version and time.monotonic() - self._built_at <= ttl:
+                return self._index
+            built = GeoGridIndex(get_attraction_coordinates(db), float(os.getenv("GEO_CELL_DEG", "0.05")))
+            self._index, self._version, self._built_at = built, version, time.monotonic()
+            return built
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def nearest(self, db: Session, lat: float, lon: float, radius_km: float, limit: int) -> List[Tuple[int, float]]:
+        return self.get(db).nearest(lat, lon, radius_km, limit)
+
+
+nearby_index = NearbyIndex()
+
+
+def format_distance(km: float) -> str:
+    """与原 distance 字段一致的展示文本，如 '850 m'、'2.5 km'。"""
+    if km < 1:
+        return f"{int(round(km * 1000))} m"
+    return f"{km:.1f} km"
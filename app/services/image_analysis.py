@@ -1,3 +1,4 @@
+import os
 import numpy as np
 from typing import Dict
 
@@ -7,10 +8,21 @@ except ImportError:
     cv2 = None
 
 
+_FEATURE_KEYS = (
+    "lake_saturation", "lake_red_ratio", "lake_pink_ratio", "lake_pink_vivid_ratio",
+    "sky_blue_ratio", "sky_brightness_mean", "sky_whiteness_ratio",
+    "saturation_mean", "red_ratio", "pink_ratio",
+)
+
+
+def _empty_features() -> Dict[str, float]:
+    return {k: 0.0 for k in _FEATURE_KEYS}
+
+
 # 重新定义：分区域分析（湖面+天空），并侧重湖面颜色
 # 保持函数名与接口不变，向下兼容（返回中仍包含旧键，但语义改为湖面区域）
 
-def compute_color_features(img_bgr: np.ndarray) -> Dict[str, float]:
+def compute_color_features(img_bgr: np.ndarray, fast: bool | None = None) -> Dict[str, float]:
     """
     提取色彩特征（分区域）：
     - 湖面区域（底部 65%）：饱和度、红/粉占比、粉色鲜艳度
@@ -20,35 +32,19 @@ def compute_color_features(img_bgr: np.ndarray) -> Dict[str, float]:
     - sky_blue_ratio, sky_brightness_mean, sky_whiteness_ratio
     - saturation_mean（与 lake_saturation 一致，用于兼容旧逻辑）
     - red_ratio, pink_ratio（与湖面区域一致，用于兼容旧逻辑）
+    fast=True（或未指定且环境变量 IMAGE_ANALYSIS_FAST=1）时改用降采样的单遍算法 compute_color_features_fast。
     """
     if cv2 is None:
         # 如果没有 OpenCV，返回默认全0特征
-        return {
-            "lake_saturation": 0.0,
-            "lake_red_ratio": 0.0,
-            "lake_pink_ratio": 0.0,
-            "lake_pink_vivid_ratio": 0.0,
-            "sky_blue_ratio": 0.0,
-            "sky_brightness_mean": 0.0,
-            "sky_whiteness_ratio": 0.0,
-            "saturation_mean": 0.0,
-            "red_ratio": 0.0,
-            "pink_ratio": 0.0,
-        }
+        return _empty_features()
 
     if img_bgr is None or img_bgr.size == 0:
-        return {
-            "lake_saturation": 0.0,
-            "lake_red_ratio": 0.0,
-            "lake_pink_ratio": 0.0,
-            "lake_pink_vivid_ratio": 0.0,
-            "sky_blue_ratio": 0.0,
-            "sky_brightness_mean": 0.0,
-            "sky_whiteness_ratio": 0.0,
-            "saturation_mean": 0.0,
-            "red_ratio": 0.0,
-            "pink_ratio": 0.0,
-        }
+        return _empty_features()
+
+    if fast is None:
+        fast = os.getenv("IMAGE_ANALYSIS_FAST", "0") == "1"
+    if fast:
+        return compute_color_features_fast(img_bgr)
 
     h, w = img_bgr.shape[:2]
     split_y = int(h * 0.35)  # 顶部天空约 35%，底部湖面约 65%
@@ -105,6 +101,95 @@ def compute_color_features(img_bgr: np.ndarray) -> Dict[str, float]:
     }
 
 
+# 单遍融合提取：每个通道一张查找表，表值为“该通道值满足哪些颜色类别条件”的位掩码，
+# 三表按位与即得像素所属类别集合，再用一次 bincount 统计所有类别组合。
+_RED, _PINK, _VIVID, _BLUE, _WHITE = (1 << i for i in range(5))
+
+
+def _build_luts():
+    v = np.arange(256)
+    lut_h = np.zeros(256, dtype=np.uint8)
+    lut_s = np.zeros(256, dtype=np.uint8)
+    lut_v = np.zeros(256, dtype=np.uint8)
+    # 红色：H 0-10 或 170-180，S>80，V>50
+    lut_h[(v <= 10) | (v >= 170)] |= _RED
+    lut_s[v > 80] |= _RED
+    lut_v[v > 50] |= _RED
+    # 粉色：H 150-170，S>40，V>120
+    lut_h[(v >= 150) & (v <= 170)] |= _PINK
+    lut_s[v > 40] |= _PINK
+    lut_v[v > 120] |= _PINK
+    # 粉色鲜艳：H 145-175，S>100，V>130
+    lut_h[(v >= 145) & (v <= 175)] |= _VIVID
+    lut_s[v > 100] |= _VIVID
+    lut_v[v > 130] |= _VIVID
+    # 天空蓝：H 90-130，S>50，V>60
+    lut_h[(v >= 90) & (v <= 130)] |= _BLUE
+    lut_s[v > 50] |= _BLUE
+    lut_v[v > 60] |= _BLUE
+    # 白云：任意 H，S<30，V>180
+    lut_h[:] |= _WHITE
+    lut_s[v < 30] |= _WHITE
+    lut_v[v > 180] |= _WHITE
+    return lut_h, lut_s, lut_v
+
+
+_LUT_H, _LUT_S, _LUT_V = _build_luts()
+
+
+def _bit_counts(codes: np.ndarray) -> Dict[int, int]:
+    counts = np.bincount(codes.ravel(), minlength=32)
+    return {bit: int(counts[(np.arange(32) & bit) != 0].sum()) for bit in (_RED, _PINK, _VIVID, _BLUE, _WHITE)}
+
+
+def compute_color_features_fast(img_bgr: np.ndarray, target_pixels: int | None = None) -> Dict[str, float]:
+    """
+    compute_color_features 的快速版本，返回相同的键：
+    - 先按面积缩放到约 target_pixels 个像素（INTER_AREA，默认取环境变量
+      IMAGE_ANALYSIS_TARGET_PIXELS，缺省 640×360；<=0 表示不缩放）；
+    - 整帧只做一次 HSV 转换，三张查找表按位与得到各像素颜色类别，一次 bincount 统计全部占比。
+    不缩放时结果与 compute_color_features 完全一致。
+    """
+    if cv2 is None or img_bgr is None or img_bgr.size == 0:
+        return _empty_features()
+
+    if target_pixels is None:
+        target_pixels = int(os.getenv("IMAGE_ANALYSIS_TARGET_PIXELS", str(640 * 360)))
+    h, w = img_bgr.shape[:2]
+    if 0 < target_pixels < h * w:
+        scale = (target_pixels / float(h * w)) ** 0.5
+        img_bgr = cv2.resize(img_bgr, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        h, w = img_bgr.shape[:2]
+
+    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
+    codes = _LUT_H[hsv[:, :, 0]] & _LUT_S[hsv[:, :, 1]] & _LUT_V[hsv[:, :, 2]]
+
+    split_y = int(h * 0.35)  # 顶部天空约 35%，底部湖面约 65%
+    lake_counts = _bit_counts(codes[split_y:])
+    sky_counts = _bit_counts(codes[:split_y])
+    lake_total = max(1, (h - split_y) * w)
+    sky_total = max(1, split_y * w)
+
+    lake_sat = float(np.mean(hsv[split_y:, :, 1])) / 255.0 if split_y < h else 0.0
+    sky_brightness = float(np.mean(hsv[:split_y, :, 2])) if split_y > 0 else float("nan")
+    lake_red_ratio = lake_counts[_RED] / lake_total
+    lake_pink_ratio = lake_counts[_PINK] / lake_total
+
+    return {
+        "lake_saturation": lake_sat,
+        "lake_red_ratio": lake_red_ratio,
+        "lake_pink_ratio": lake_pink_ratio,
+        "lake_pink_vivid_ratio": lake_counts[_VIVID] / lake_total,
+        "sky_blue_ratio": sky_counts[_BLUE] / sky_total,
+        "sky_brightness_mean": sky_brightness / 255.0,  # 归一化到0-1
+        "sky_whiteness_ratio": sky_counts[_WHITE] / sky_total,
+        # 兼容旧字段（改为湖面语义）
+        "saturation_mean": lake_sat,
+        "red_ratio": lake_red_ratio,
+        "pink_ratio": lake_pink_ratio,
+    }
+
+
 def score_from_features(feats: Dict[str, float]) -> int:
     """根据特征计算0-100出片指数：湖面为主（85%），天空为辅（15%）。"""
     # 湖面
@@ -1,7 +1,13 @@
 from datetime import datetime
 from typing import List, Dict
 
-from app.schemas.prediction import LakePrediction, TimeWindow
+import numpy as np
+
+from app.schemas.prediction import LakePrediction, TimeWindow, ScoredWindow
+from app.services.forecast_index import forecast_index
+
+# 预测视野上限：7 天逐小时
+MAX_FORECAST_HOURS = 168
 
 
 def _score_hour(h: Dict) -> int:
@@ -81,8 +87,118 @@ def deep_weather_score(h: Dict) -> int:
     return int(max(0, min(100, round(score))))
 
 
-def predict_for_lakes(lakes: List[Dict], forecast: Dict, hours: int = 24) -> List[LakePrediction]:
-    hours_data = forecast.get("hours", [])[:hours]
+# 特征矩阵列顺序（hours × features），与天气字典字段一一对应
+FORECAST_FEATURES = ("uvIndex", "cloud", "windSpeed", "humidity", "temp", "precip")
+_FEATURE_DEFAULTS = (0, 50, 3.0, 60, 25, 0.0)
+
+
+def build_forecast_matrix(hours_data: List[Dict]) -> np.ndarray:
+    """将逐小时天气字典转为 float64 矩阵（hours × features），缺失字段取与标量评分一致的默认值。"""
+    if not hours_data:
+        return np.zeros((0, len(FORECAST_FEATURES)), dtype=np.float64)
+    return np.array(
+        [[h.get(k, d) for k, d in zip(FORECAST_FEATURES, _FEATURE_DEFAULTS)] for h in hours_data],
+        dtype=np.float64,
+    )
+
+
+def score_hours(matrix: np.ndarray) -> np.ndarray:
+    """_score_hour 的向量化版本：一次计算全部小时，结果与逐小时调用逐一相同。"""
+    uv, cloud, wind, humidity, temp = (matrix[:, i] for i in range(5))
+    score = np.full(len(matrix), 15.0)
+    score += np.where((uv >= 4) & (uv <= 7), 30.0, np.maximum(0.0, uv * 8))
+    score += np.maximum(0.0, 30 - np.trunc(cloud * 0.4))
+    score += np.maximum(0.0, 20 - np.trunc(np.abs(60 - humidity) * 0.4))
+    score += np.maximum(0.0, 20 - np.trunc(wind * 2))
+    score += np.maximum(0.0, 15 - np.trunc(np.abs(25 - temp) * 0.4))
+    return np.trunc(np.clip(score, 0, 100)).astype(np.int64)
+
+
+def deep_weather_scores(matrix: np.ndarray) -> np.ndarray:
+    """deep_weather_score 的向量化版本（0-100 整数数组）。"""
+    uv, cloud, wind, humidity, temp, precip = (matrix[:, i] for i in range(6))
+    uv_mid = (uv >= 4) & (uv <= 7)
+    score = np.where(uv_mid, 28.0, np.maximum(0.0, np.minimum(uv * 4.5, 24.0)))
+    score += np.maximum(0.0, 32.0 - cloud * 0.4)
+    score += np.maximum(0.0, 18.0 - (wind ** 1.2) * 2.5)
+    score += np.maximum(0.0, 18.0 - np.abs(60.0 - humidity) * 0.3)
+    score += np.maximum(0.0, 12.0 - np.abs(25.0 - temp) * 0.6)
+    score += np.maximum(-25.0, -precip * 30.0)
+    score += np.where((cloud <= 30) & uv_mid, 6.0, 0.0)
+    return np.clip(np.round(score), 0, 100).astype(np.int64)
+
+
+def _lake_adjustments(lakes: List[Dict]) -> (np.ndarray, np.ndarray):
+    """
+    模拟景点特性：根据日期+ID生成稳定的随机因子（当天多次调用结果一致）。
+    返回 (分数偏移 -10~+15, 最佳时间索引偏移 -2~+2)。
+    """
+    import random
+
+    day = datetime.now().strftime('%Y%m%d')
+    offsets = np.empty(len(lakes), dtype=np.int64)
+    shifts = np.empty(len(lakes), dtype=np.int64)
+    for i, lake in enumerate(lakes):
+        random.seed(f"{day}_{lake['id']}")
+        offsets[i] = random.randint(-10, 15)
+        shifts[i] = random.randint(-2, 2)
+    return offsets, shifts
+
+
+def sliding_window_means(scores: np.ndarray, window_hours: int) -> np.ndarray:
+    """
+    前缀和 O(n) 计算所有长度为 window_hours 的连续窗口平均分。
+    数据不足一个窗口时，退化为整段长度的单一窗口。
+    """
+    w = max(1, min(window_hours, len(scores)))
+    csum = np.concatenate(([0], np.cumsum(scores)))
+    return (csum[w:] - csum[:-w]) / w
+
+
+def top_k_windows(window_avg: np.ndarray, window_hours: int, k: int = 1) -> List[int]:
+    """
+    贪心选取得分最高且互不重叠的 k 个窗口起点（同分取更早的时段）。
+    返回按得分降序排列的起点索引。
+    """
+    order = np.argsort(-window_avg, kind="stable")
+    blocked = np.zeros(len(window_avg), dtype=bool)
+    picked: List[int] = []
+    for start in order.tolist():
+        if blocked[start]:
+            continue
+        picked.append(start)
+        if len(picked) >= k:
+            break
+        # 与已选窗口重叠的起点：[start - w + 1, start + w - 1]
+        blocked[max(0, start - window_hours + 1):start + window_hours] = True
+    return picked
+
+
+def _window_reason_and_factors(window: List[Dict]) -> (str, dict):
+    """多小时窗口取各要素均值后复用两小时解释逻辑。"""
+    if len(window) <= 2:
+        return _build_reason_and_factors(window[0], window[-1])
+    mean = {
+        k: sum(h.get(k, 0) for h in window) / len(window)
+        for k in ("cloud", "uvIndex", "windSpeed", "temp", "humidity", "precip")
+    }
+    return _build_reason_and_factors(mean, mean)
+
+
+def predict_for_lakes(
+    lakes: List[Dict],
+    forecast: Dict,
+    hours: int = 24,
+    window_hours: int = 2,
+    top_k: int = 1,
+) -> List[LakePrediction]:
+    """
+    预测各湖区的出片指数与最佳时段。
+    - hours：预测视野（最多 MAX_FORECAST_HOURS，即 7 天）
+    - window_hours：拍摄窗口长度（小时）
+    - top_k：>1 时在 windows 字段返回互不重叠、按得分降序的前 K 个窗口（已含湖区时间偏移），best_time 为其中第一个
+    """
+    hours_data = forecast.get("hours", [])[:min(hours, MAX_FORECAST_HOURS)]
     if not hours_data:
         now = datetime.now().isoformat()
         return [
@@ -96,61 +212,67 @@ def predict_for_lakes(lakes: List[Dict], forecast: Dict, hours: int = 24) -> Lis
             for lake in lakes
         ]
 
-    # 计算两小时滑动窗口的平均得分，选最佳时段
-    best_start_idx = 0
-    best_avg = -1.0
-    for start in range(0, max(1, len(hours_data) - 1)):
-        avg = (_score_hour(hours_data[start]) + _score_hour(hours_data[min(start + 1, len(hours_data) - 1)])) / 2
-        if avg > best_avg:
-            best_avg = avg
-            best_start_idx = start
-
+    n = len(hours_data)
+    w = max(1, min(window_hours, n))
+    scores = score_hours(build_forecast_matrix(hours_data))
+    window_avg = sliding_window_means(scores, w)
+    # top_k > 1 时取全部互不重叠的候选：湖区时间偏移与边界截断后可能出现重叠窗口，需要候选补位
+    candidates = 1 if top_k <= 1 else len(window_avg)
+    starts = np.array(top_k_windows(window_avg, w, candidates), dtype=np.int64)
+
+    # 每个湖区的分数/时间偏移作为数组运算（lakes × 候选数）
+    offsets, shifts = _lake_adjustments(lakes)
+    idxs = np.clip(starts[None, :] + shifts[:, None], 0, n - w)
+    # 降低最低分限制，让差异更明显，但整体已被_score_hour抬高
+    final_scores = np.trunc(np.clip(window_avg[idxs] + offsets[:, None], 30, 100)).astype(np.int64)
+
+    # 同一窗口的解释文案只构建一次
+    explained: Dict[int, tuple] = {}
+
+    def _explain(idx: int) -> tuple:
+        if idx not in explained:
+            explained[idx] = _window_reason_and_factors(hours_data[idx:idx + w])
+        return explained[idx]
+
+    updated_at = datetime.now().isoformat()
     results: List[LakePrediction] = []
-    import random
-    
-    # 模拟景点特性：根据ID生成稳定的随机因子
-    # 这样每天同一个景点的因子是固定的，但不同景点有差异
-    for lake in lakes:
-        # 使用日期+ID作为种子，保证当天多次调用结果一致
-        seed_key = f"{datetime.now().strftime('%Y%m%d')}_{lake['id']}"
-        random.seed(seed_key)
-        
-        # 基础分偏移：-10 到 +15 分，增加差异性
-        offset = random.randint(-10, 15)
-        
-        # 最佳时间偏移：随机向前或向后推移 0-3 个小时
-        # 注意：为了简化，这里暂时只偏移索引
-        time_shift = random.randint(-2, 2)
-        idx = max(0, min(best_start_idx + time_shift, len(hours_data) - 2))
-        
-        # 计算偏移后的分数
-        base_score = (_score_hour(hours_data[idx]) + _score_hour(hours_data[idx+1])) / 2
-        # 降低最低分限制，让差异更明显，但整体已被_score_hour抬高
-        final_score = int(min(100, max(30, base_score + offset)))
-        
-        start_t = hours_data[idx]["time"]
-        end_t = hours_data[idx+1]["time"]
-        
-        h1 = hours_data[idx]
-        h2 = hours_data[idx+1]
-        
-        reason, factors = _build_reason_and_factors(h1, h2)
-        
+    for lake, lake_idxs, offset, lake_scores in zip(lakes, idxs.tolist(), offsets.tolist(), final_scores.tolist()):
+        picked = list(zip(lake_idxs, lake_scores))[:1]
+        if top_k > 1:
+            # 偏移后按得分重新贪心选取互不重叠的前 K 个（同分保持原排名）
+            picked = []
+            for rank in sorted(range(len(lake_idxs)), key=lambda r: -lake_scores[r]):
+                i = lake_idxs[rank]
+                if all(abs(i - j) >= w for j, _ in picked):
+                    picked.append((i, lake_scores[rank]))
+                    if len(picked) >= top_k:
+                        break
+        idx, score = picked[0]
+        reason, factors = _explain(idx)
+
         # 微调 reason，避免完全一样
         if offset > 3:
             reason += " 该区域受地形影响，局部微气候更佳。"
         elif offset < -3:
             reason += " 局部风力可能略大，请注意防风。"
-            
+
+        windows = None
+        if top_k > 1:
+            windows = [
+                ScoredWindow(start=hours_data[i]["time"], end=hours_data[i + w - 1]["time"], score=sc)
+                for i, sc in picked
+            ]
+
         results.append(
             LakePrediction(
                 lake_id=lake["id"],
                 lake_name=lake["name"],
-                score=final_score,
-                best_time=TimeWindow(start=start_t, end=end_t),
-                updated_at=datetime.now().isoformat(),
+                score=score,
+                best_time=TimeWindow(start=hours_data[idx]["time"], end=hours_data[idx + w - 1]["time"]),
+                updated_at=updated_at,
                 reason=reason,
                 factors=factors,
+                windows=windows,
             )
         )
     return results
@@ -205,35 +327,13 @@ def build_weather_reason_and_factors(h1: dict, h2: dict) -> (str, dict):
 
 
 def attach_explanations(preds: List[LakePrediction], forecast: Dict) -> List[LakePrediction]:
-    hours = forecast.get("hours", [])
-    if not hours:
+    index = forecast_index(forecast)
+    if not len(index):
         return preds
-    # 将时间映射到最接近的两个小时窗口
-    def _nearest_pair(target_iso: str):
-        # 找到最接近的索引
-        try:
-            # 直接按时间字符串比较，若格式相同（ISO），可近似使用
-            times = [h.get("time") for h in hours]
-            if target_iso in times:
-                idx = times.index(target_iso)
-            else:
-                # 简化策略：取中位
-                idx = max(0, min(len(hours) - 2, len(hours)//2))
-            return hours[idx], hours[min(idx+1, len(hours)-1)]
-        except Exception:
-            return hours[0], hours[min(1, len(hours)-1)]
-
     enriched = []
     for p in preds:
-        h1, h2 = _nearest_pair(p.best_time.start)
+        # 将时间映射到最接近的两个小时窗口（二分查找）
+        h1, h2 = index.nearest_pair(p.best_time.start)
         reason, factors = _build_reason_and_factors(h1, h2)
-        enriched.append(LakePrediction(
-            lake_id=p.lake_id,
-            lake_name=p.lake_name,
-            score=p.score,
-            best_time=p.best_time,
-            updated_at=p.updated_at,
-            reason=reason,
-            factors=factors,
-        ))
+        enriched.append(p.model_copy(update={"reason": reason, "factors": factors}))
     return enriched
\ No newline at end of file
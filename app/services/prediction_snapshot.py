@@ -0,0 +1,79 @@
+import hashlib
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from pydantic import TypeAdapter
+
+from app.schemas.prediction import BestTodayResponse, LakePrediction
+from app.services.prediction_model import attach_explanations, predict_for_lakes
+
+# /prediction/today 与 /prediction/today/best 的预渲染快照：
+# 预测每小时刷新一次，刷新后即把两个接口的完整响应序列化为 JSON 字节并整体替换，
+# 热路径只需读取当前快照、比较 ETag，不再查库、拉天气或做 Pydantic 校验。
+# 快照超过 PREDICTION_SNAPSHOT_TTL 秒（默认 600）后由下一次请求重建，以覆盖其他进程直接写库的情况。
+
+_LIST_ADAPTER = TypeAdapter(List[LakePrediction])
+
+
+class PredictionSnapshot(NamedTuple):
+    today_body: bytes
+    today_etag: str
+    best_body: bytes
+    best_etag: str
+    built_at: float
+
+
+_current: Optional[PredictionSnapshot] = None
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def build_snapshot(preds: List[LakePrediction], lakes: List[Dict], forecast: Dict, default_lakes: List[Dict]) -> PredictionSnapshot:
+    """按原接口逻辑渲染两份响应：today 在库为空时用 default_lakes 实时计算；best 在库中数据不全时按 lakes 实时计算。"""
+    explained = attach_explanations(preds, forecast) if preds else None
+    today = explained if explained is not None else predict_for_lakes(default_lakes, forecast, hours=24)
+    if explained is not None and len(preds) >= len(lakes):
+        best_list = explained
+    else:
+        best_list = predict_for_lakes(lakes, forecast, hours=24)
+
+    today_body = _LIST_ADAPTER.dump_json(today)
+    best_body = BestTodayResponse(best=max(best_list, key=lambda x: x.score), all=best_list).model_dump_json().encode()
+    return PredictionSnapshot(today_body, _etag(today_body), best_body, _etag(best_body), time.monotonic())
+
+
+def publish_snapshot(preds: List[LakePrediction], lakes: List[Dict], forecast: Dict, default_lakes: List[Dict]) -> PredictionSnapshot:
+    """构建并原子替换当前快照（单次引用赋值，读者要么拿到旧快照要么拿到新快照）。"""
+    global _current
+    snap = build_snapshot(preds, lakes, forecast, default_lakes)
+    _current = snap
+    return snap
+
+
+def get_snapshot() -> Optional[PredictionSnapshot]:
+    """返回当前快照；未构建或已过期时返回 None。"""
+    snap = _current
+    if snap is None:
+        return None
+    if time.monotonic() - snap.built_at > float(os.getenv("PREDICTION_SNAPSHOT_TTL", "600")):
+        return None
+    return snap
+
+
+def clear_snapshot():
+    global _current
+    _current = None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 比较（弱比较：忽略 W/ 前缀，支持逗号分隔与 *）。"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
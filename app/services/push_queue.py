@@ -0,0 +1,191 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from app.db.session import SessionLocal
+from app.db.crud_push import claim_push_batch, enqueue_push_messages, mark_push_failed, mark_push_sent, push_queue_counts
+from app.utils.http_pool import get_session
+
+logger = logging.getLogger("push_queue")
+
+# 推送投递队列：定时任务只把消息写入发件箱（push_outbox，SQLite 持久化）后立即返回，
+# 由后台工作线程批量领取、按推送渠道限速投递，失败按指数退避重试。
+# - PUSH_ENDPOINT：推送网关地址（POST {"provider", "messages": [...]}，2xx 视为整批成功）；未配置时仅记录日志
+# - PUSH_WORKERS（2）/ PUSH_BATCH_SIZE（50）：工作线程数与每批条数
+# - PUSH_RATE_PER_SEC（20）/ PUSH_BURST（同速率）：每个渠道的令牌桶限速（条/秒）
+# - PUSH_MAX_ATTEMPTS（5）/ PUSH_RETRY_BASE（30 秒）：最大投递次数与退避基数
+
+
+class TokenBucket:
+    """线程安全的令牌桶，acquire 在令牌不足时阻塞等待。"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0, stop: Optional[threading.Event] = None) -> bool:
+        """取 n 个令牌（n 大于桶容量时分次取）；stop 被置位时放弃并返回 False。"""
+        remaining = n
+        while remaining > 0:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                take = min(remaining, self._tokens)
+                self._tokens -= take
+                remaining -= take
+                wait = min(remaining, self.capacity) / self.rate if remaining > 0 else 0.0
+            if wait > 0:
+                if stop is not None:
+                    if stop.wait(wait):
+                        return False
+                else:
+                    time.sleep(wait)
+        return True
+
+
+class LogProvider:
+    """未配置推送网关时的占位渠道：记录日志，视为投递成功。"""
+
+    def send(self, provider: str, messages: List[Dict]):
+        for m in messages:
+            logger.info(f"[WECHAT PUSH] {m['openid']} | {m['title']} | {m['body']}")
+
+
+class HttpProvider:
+    """通过连接池向推送网关批量 POST。"""
+
+    def __init__(self, endpoint: str, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def send(self, provider: str, messages: List[Dict]):
+        resp = get_session().post(self.endpoint, json={"provider": provider, "messages": messages}, timeout=self.timeout)
+        resp.raise_for_status()
+
+
+def _default_provider():
+    endpoint = os.getenv("PUSH_ENDPOINT", "")
+    return HttpProvider(endpoint) if endpoint else LogProvider()
+
+
+class PushWorkerPool:
+    def __init__(
+        self,
+        provider=None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        rate_per_sec: Optional[float] = None,
+        burst: Optional[float] = None,
+        poll_interval: float = 5.0,
+    ):
+        self.provider = provider or _default_provider()
+        self.workers = workers or int(os.getenv("PUSH_WORKERS", "2"))
+        self.batch_size = batch_size or int(os.getenv("PUSH_BATCH_SIZE", "50"))
+        self.rate_per_sec = rate_per_sec or float(os.getenv("PUSH_RATE_PER_SEC", "20"))
+        self.burst = burst if burst is not None else (float(os.getenv("PUSH_BURST")) if os.getenv("PUSH_BURST") else None)
+        self.max_attempts = int(os.getenv("PUSH_MAX_ATTEMPTS", "5"))
+        self.retry_base = float(os.getenv("PUSH_RETRY_BASE", "30"))
+        self.poll_interval = poll_interval
+        self._limiters: Dict[str, TokenBucket] = {}
+        self._limiters_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._claim_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def _limiter(self, provider: str) -> TokenBucket:
+        with self._limiters_lock:
+            bucket = self._limiters.get(provider)
+            if bucket is None:
+                bucket = self._limiters[provider] = TokenBucket(self.rate_per_sec, self.burst)
+            return bucket
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"push-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """有新消息入队时唤醒工作线程，无需等待下一轮轮询。"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.process_once()
+            except Exception as e:
+                logger.exception(f"推送工作线程异常: {e}")
+                handled = 0
+            if not handled:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def process_once(self) -> int:
+        """领取并投递一批消息，返回处理条数。"""
+        db = SessionLocal()
+        try:
+            # SQLite 只有一个写者，领取串行化即可；投递（网络 I/O）在锁外并行
+            with self._claim_lock:
+                batch = claim_push_batch(db, self.batch_size)
+            if not batch:
+                return 0
+            by_provider: Dict[str, list] = {}
+            for m in batch:
+                by_provider.setdefault(m.provider or "wechat", []).append(m)
+            for provider, messages in by_provider.items():
+                if not self._limiter(provider).acquire(len(messages), self._stop):
+                    return len(batch)  # 停止中：租约到期后由下次启动重新领取
+                payload = [
+                    {"id": m.id, "openid": m.openid, "lake_id": m.lake_id, "window": m.window, "title": m.title, "body": m.body}
+                    for m in messages
+                ]
+                try:
+                    self.provider.send(provider, payload)
+                except Exception as e:
+                    logger.warning(f"推送投递失败（{provider}，{len(messages)}条）: {e}")
+                    mark_push_failed(db, messages, str(e), self.max_attempts, self.retry_base)
+                    self.failed += len(messages)
+                else:
+                    mark_push_sent(db, [m.id for m in messages])
+                    self.sent += len(messages)
+            return len(batch)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict:
+        db = SessionLocal()
+        try:
+            counts = push_queue_counts(db)
+        finally:
+            db.close()
+        return {"workers": len(self._threads), "sent": self.sent, "failed": self.failed, "queue": counts}
+
+
+push_workers = PushWorkerPool()
+
+
+def enqueue_pushes(db, messages: List[Dict]) -> int:
+    """写入发件箱并唤醒工作线程；重复的 (openid, lake_id, window) 会被忽略。返回新入队条数。"""
+    count = enqueue_push_messages(db, messages)
+    if count:
+        push_workers.notify()
+    return count
@@ -1,7 +1,9 @@
 import os
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-import glob
+import logging
 import random
+from typing import Dict, List, Optional, Tuple
 
 try:
     import cv2
@@ -11,15 +13,48 @@ except ImportError:
 from sqlalchemy.orm import Session
 from app.schemas.prediction import RealtimeIndex
 from app.db.session import SessionLocal
-from app.db.crud_realtime import save_realtime_index
+from app.db.crud_realtime import save_realtime_index, save_realtime_indices
 from app.capture.capture_rtsp import capture_once
 from app.capture.capture_http import http_snapshot_once
+from app.capture.snapshot_catalog import DEFAULT_SNAPSHOT_DIR, find_latest_snapshot
+from app.capture.rtsp_ingest import ingestion_service
+from app.services.analysis_pool import analyze_image, analyze_image_file, get_pool, reset_pool
+from app.services.feature_cache import feature_cache, file_key
 
-def _find_latest_snapshot(lake_id: int, dir_path: str = "storage/snapshots") -> str | None:
-    if not os.path.exists(dir_path): return None
-    pattern = os.path.join(dir_path, f"lake{lake_id}_*.jpg")
-    files = sorted(glob.glob(pattern))
-    return files[-1] if files else None
+logger = logging.getLogger("realtime_index")
+
+SNAPSHOT_DIR = DEFAULT_SNAPSHOT_DIR
+
+
+def _find_latest_snapshot(lake_id: int, dir_path: str | None = None) -> str | None:
+    """查截图索引（O(1)），不再 glob + 排序整个目录。"""
+    return find_latest_snapshot(lake_id, dir_path or SNAPSHOT_DIR)
+
+
+def _build_index(
+    lake_id: int, img_path: str | None, analysis: Optional[Dict], captured_at: datetime, source: Optional[Dict] = None
+) -> RealtimeIndex:
+    """由图像分析结果组装实时指数；无分析结果时回退为 Serverless 模拟结果。source 为内存帧的来源说明。"""
+    if analysis:
+        score = analysis["score"]
+        reason = analysis["reason"]
+        factors = {"image_analysis": analysis["features"]}
+        if source:
+            factors["source"] = source
+    else:
+        # Mock analysis for Vercel/Serverless where OpenCV might be missing
+        score = random.randint(60, 95)
+        reason = "Mock Analysis (Serverless Mode)"
+        factors = {"image_analysis": {"saturation_mean": 0.5, "red_ratio": 0.3}}
+    return RealtimeIndex(
+        lake_id=lake_id,
+        lake_name=f"{lake_id}号盐湖",
+        score=int(score),
+        captured_at=captured_at.isoformat(),
+        image_path=img_path,
+        reason=reason,
+        factors=factors,
+    )
 
 
 def compute_and_store_realtime_index(lake_id: int) -> RealtimeIndex:
@@ -27,46 +62,142 @@ def compute_and_store_realtime_index(lake_id: int) -> RealtimeIndex:
     RTSP→截图（若可用）→分析HSV与红/粉比例→计算指数→写入DB→返回。
     若无截图可用，则尝试按需抓取；仍失败则回退启发式但也写库。
     """
-    lake_name = f"{lake_id}号盐湖"
     captured_at = datetime.now()
     img_path = _find_latest_snapshot(lake_id)
-    
-    # Mock analysis for Vercel/Serverless where OpenCV might be missing
-    score = random.randint(60, 95)
-    reason = "Mock Analysis (Serverless Mode)"
-    factors = {"image_analysis": {"saturation_mean": 0.5, "red_ratio": 0.3}}
 
     # Only try real analysis if OpenCV is available
-    if cv2 and img_path and os.path.exists(img_path):
-        from app.services.image_analysis import compute_color_features, score_from_features, build_reason_from_features
-        img = cv2.imread(img_path)
-        feats = compute_color_features(img)
-        img_score = score_from_features(feats)
-        reason_img = build_reason_from_features(feats)
-        score = int(img_score)
-        reason = reason_img
-        factors["image_analysis"] = feats
-    
-    # ... (Rest of logic simplified for brevity in this fix, can be re-expanded) ...
-    # For now, just return the result to unblock deployment
+    analysis = None
+    source = None
+    if cv2:
+        jobs, sources = _analysis_jobs({lake_id: img_path})
+        analysis = _analyze_many(jobs).get(lake_id)
+        source = sources.get(lake_id)
+    idx = _build_index(lake_id, img_path, analysis, captured_at, source)
 
     # 写入DB
     db: Session = SessionLocal()
     try:
         # Note: In Vercel serverless, local SQLite write might fail or be ephemeral
         # We wrap in try-except to not crash the request
-        save_realtime_index(db, lake_id, lake_name, int(score), img_path, captured_at)
+        save_realtime_index(db, lake_id, idx.lake_name, idx.score, img_path, captured_at)
     except Exception as e:
         print(f"DB Write Warning: {e}")
     finally:
         db.close()
 
-    return RealtimeIndex(
-        lake_id=lake_id,
-        lake_name=lake_name,
-        score=int(score),
-        captured_at=captured_at.isoformat(),
-        image_path=img_path,
-        reason=reason,
-        factors=factors,
-    )
+    return idx
+
+
+def _analysis_jobs(paths: Dict[int, Optional[str]]) -> Tuple[Dict[int, tuple], Dict[int, Dict]]:
+    """
+    为各湖区选择分析来源：RTSP 接入服务有新鲜帧时直接分析内存帧（无需读盘解码），
+    否则回退到最新截图文件。返回 ({lake_id: (缓存键, 任务函数, 参数)}, {lake_id: 内存帧来源})。
+    内存帧的缓存键包含连接 session，重连后 seq 重新计数也不会命中上一次连接的结果。
+    请求路径上不编码、不写盘：记录的 image_path 仍是接入服务按 RTSP_SNAPSHOT_INTERVAL 保存的最新截图，
+    来源中的 snapshot_exact 标明该截图是否就是被分析的那一帧。
+    """
+    jobs: Dict[int, tuple] = {}
+    sources: Dict[int, Dict] = {}
+    for lake_id, path in paths.items():
+        frame = ingestion_service.latest_frame(lake_id)
+        if frame is not None:
+            jobs[lake_id] = (("frame", lake_id, frame.session, frame.seq), analyze_image, frame.image)
+            exact = ingestion_service.snapshot_path(lake_id, frame)
+            sources[lake_id] = {
+                "type": "rtsp_frame",
+                "session": frame.session,
+                "seq": frame.seq,
+                "frame_captured_at": frame.captured_at.isoformat(),
+                "snapshot_exact": exact is not None and exact == path,
+            }
+        elif path and os.path.exists(path):
+            jobs[lake_id] = (file_key(path), analyze_image_file, path)
+    return jobs, sources
+
+
+def _analyze_serial(lake_id: int, fn, arg) -> Optional[Dict]:
+    try:
+        return fn(arg)
+    except Exception as e:
+        logger.warning(f"湖区 {lake_id} 图像分析失败: {e}")
+        return None
+
+
+def _analyze_many(jobs: Dict[int, tuple]) -> Dict[int, Optional[Dict]]:
+    """
+    执行分析任务：先查分析结果缓存（截图或帧未更新则直接复用），
+    未命中的分发到进程池并行分析；进程池不可用时在当前进程串行执行。
+    """
+    results: Dict[int, Optional[Dict]] = {}
+    pending: Dict[int, tuple] = {}
+    for lake_id, (key, fn, arg) in jobs.items():
+        cached = feature_cache.get(key) if key else None
+        if cached is not None:
+            results[lake_id] = cached
+        else:
+            pending[lake_id] = (fn, arg)
+
+    analyzed: Dict[int, Optional[Dict]] = {}
+    pool = get_pool() if len(pending) > 1 else None
+    if pool is not None:
+        try:
+            futures = {lake_id: pool.submit(fn, arg) for lake_id, (fn, arg) in pending.items()}
+        except BrokenProcessPool as e:
+            logger.warning(f"进程池已损坏，改为串行: {e}")
+            reset_pool(pool)
+            futures = {}
+        for lake_id, f in futures.items():
+            try:
+                analyzed[lake_id] = f.result()
+            except BrokenProcessPool as e:
+                logger.warning(f"进程池已损坏，湖区 {lake_id} 改为串行: {e}")
+                reset_pool(pool)
+            except Exception as e:
+                # 单张图片失败（如损坏的 JPEG）只影响该湖区，进程池与其他湖区的结果照常使用
+                logger.warning(f"湖区 {lake_id} 进程池分析失败，改为串行: {e}")
+    for lake_id, (fn, arg) in pending.items():
+        if lake_id not in analyzed:
+            analyzed[lake_id] = _analyze_serial(lake_id, fn, arg)
+
+    for lake_id, analysis in analyzed.items():
+        key = jobs[lake_id][0]
+        if analysis is not None and key:
+            feature_cache.put(key, analysis)
+        results[lake_id] = analysis
+    return results
+
+
+def compute_realtime_indices(lake_ids: List[int]) -> List[RealtimeIndex]:
+    """
+    批量版 compute_and_store_realtime_index：各湖区最新帧/截图并行分析（耗时取决于最慢的一张），
+    所有记录在同一事务中写入。返回顺序与 lake_ids 一致。
+    """
+    captured_at = datetime.now()
+    paths = {lake_id: _find_latest_snapshot(lake_id) for lake_id in lake_ids}
+    analyses: Dict[int, Optional[Dict]] = {}
+    sources: Dict[int, Dict] = {}
+    if cv2:
+        jobs, sources = _analysis_jobs(paths)
+        analyses = _analyze_many(jobs)
+    indices = [
+        _build_index(lake_id, paths[lake_id], analyses.get(lake_id), captured_at, sources.get(lake_id))
+        for lake_id in lake_ids
+    ]
+
+    db: Session = SessionLocal()
+    try:
+        save_realtime_indices(db, [
+            {
+                "lake_id": idx.lake_id,
+                "lake_name": idx.lake_name,
+                "score": idx.score,
+                "image_path": idx.image_path,
+                "captured_at": captured_at,
+            }
+            for idx in indices
+        ])
+    except Exception as e:
+        print(f"DB Write Warning: {e}")
+    finally:
+        db.close()
+    return indices
@@ -0,0 +1,62 @@
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db.crud_subscriptions import iter_subscription_lakes, subscription_version
+
+# 订阅倒排索引：lake_id -> 按阈值升序的 (thresholds, openids) 两个平行数组。
+# 预测刷新时对每个湖区二分查找 threshold <= score 的前缀，即为需要推送的订阅者，
+# 复杂度 O(湖区数 × log 订阅数 + 命中数)，不再遍历全部订阅 × 全部预测。
+# 订阅写入后 subscription_version 变化，下次刷新时在定时任务线程中整体重建（百万级订阅为秒级，每小时至多一次）。
+
+
+class SubscriptionIndex:
+    def __init__(self):
+        self._lakes: Dict[int, Tuple[array, List[str]]] = {}
+        self._version: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build(rows: Iterable[Tuple[int, int, str]]) -> Dict[int, Tuple[array, List[str]]]:
+        grouped: Dict[int, list] = {}
+        for lake_id, threshold, openid in rows:
+            grouped.setdefault(lake_id, []).append((threshold, openid))
+        lakes: Dict[int, Tuple[array, List[str]]] = {}
+        for lake_id, pairs in grouped.items():
+            pairs.sort()
+            lakes[lake_id] = (array("i", (p[0] for p in pairs)), [p[1] for p in pairs])
+        return lakes
+
+    def load(self, rows: Iterable[Tuple[int, int, str]], version: Optional[Tuple[int, int]] = None):
+        lakes = self._build(rows)
+        with self._lock:
+            self._lakes = lakes
+            self._version = version
+
+    def refresh(self, db: Session) -> bool:
+        """订阅数据有变化时从数据库重建，返回是否重建。"""
+        version = subscription_version(db)
+        with self._lock:
+            if version == self._version:
+                return False
+        self.load(iter_subscription_lakes(db), version)
+        return True
+
+    def subscribers(self, lake_id: int, score: int) -> List[str]:
+        """订阅了 lake_id 且阈值 <= score 的 openid（阈值升序）。"""
+        with self._lock:
+            entry = self._lakes.get(lake_id)
+        if entry is None:
+            return []
+        thresholds, openids = entry
+        return openids[:bisect_right(thresholds, score)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"lakes": len(self._lakes), "entries": sum(len(e[1]) for e in self._lakes.values())}
+
+
+subscription_index = SubscriptionIndex()
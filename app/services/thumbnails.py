@@ -0,0 +1,117 @@
+import os
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# URL 计算在 app/utils/thumbnail_urls.py（schemas 也会用到），此处重新导出以兼容原有导入路径
+from app.utils.thumbnail_urls import (
+    CARD_WIDTH, STATIC_ROOTS, THUMB_DIR, derivative_path, forget_thumbnails, local_path_for_url,
+    thumbnail_url, thumbnail_widths,
+)
+
+logger = logging.getLogger("thumbnails")
+
+# 图片衍生图（缩略图）：上传景点封面 / 社区图片后，按若干宽度生成 WebP 与 JPEG 缩略图，
+# 存放在原图目录下的 thumbs/ 中：storage/attractions/abc.jpg -> storage/attractions/thumbs/abc_w320.webp。
+# 列表卡片只需 320px 宽的图，体积约为原图的 1/10～1/30。
+# - THUMBNAIL_WIDTHS：生成的宽度（默认 "320,640"），原图更窄时按原宽度输出
+# - THUMBNAIL_FORMAT：列表默认返回的格式（默认 webp，小程序 image 组件支持；设为 jpg 则返回 JPEG）
+# - THUMBNAIL_QUALITY：编码质量（默认 80）
+# 阿里云 OSS 上的图片不落本地，直接使用 OSS 图片处理参数（x-oss-process）按需缩放。
+# 缩略图是尽力而为的：生成失败（如 OpenCV 未编译 WebP、磁盘写入失败）只记录警告，不影响上传本身；
+# 列表中的缩略图 URL 由 app/utils/thumbnail_urls.py 计算，缺失时回退原图。
+
+FORMATS = ("webp", "jpg")
+
+
+def _quality() -> int:
+    return int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+
+def _encode_params(fmt: str) -> list:
+    if fmt == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, _quality()]
+    return [cv2.IMWRITE_JPEG_QUALITY, _quality(), cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+
+
+def generate_derivatives(src_path: str, widths: Optional[Iterable[int]] = None, force: bool = False) -> Dict[Tuple[int, str], str]:
+    """
+    为 src_path 生成各宽度、各格式的缩略图，返回 {(宽度, 格式): 路径}。
+    已存在且不旧于原图的衍生图跳过（force=True 时重建）；OpenCV 不可用或原图无法解码时返回空字典。
+    不抛出异常：单个尺寸 / 格式编码或写入失败时记录警告并跳过，上传流程可直接调用。
+    """
+    if cv2 is None:
+        return {}
+    try:
+        return _generate(src_path, widths, force)
+    except (cv2.error, OSError) as e:
+        logger.warning(f"缩略图生成失败: {src_path}: {e}")
+        return {}
+
+
+def _generate(src_path: str, widths: Optional[Iterable[int]], force: bool) -> Dict[Tuple[int, str], str]:
+    widths = list(widths) if widths is not None else thumbnail_widths()
+    src_mtime = os.path.getmtime(src_path)
+    todo = []
+    out: Dict[Tuple[int, str], str] = {}
+    for w in widths:
+        for fmt in FORMATS:
+            path = derivative_path(src_path, w, fmt)
+            if not force and os.path.exists(path) and os.path.getmtime(path) >= src_mtime:
+                out[(w, fmt)] = path
+            else:
+                todo.append((w, fmt, path))
+    if not todo:
+        return out
+
+    img = cv2.imread(src_path, cv2.IMREAD_COLOR)
+    if img is None:
+        logger.warning(f"无法解码图片，跳过缩略图: {src_path}")
+        return out
+    os.makedirs(os.path.join(os.path.dirname(src_path), THUMB_DIR), exist_ok=True)
+    h, w0 = img.shape[:2]
+    resized = {}
+    for w, fmt, path in todo:
+        if w not in resized:
+            if w >= w0:
+                resized[w] = img
+            else:
+                resized[w] = cv2.resize(img, (w, max(1, round(h * w / w0))), interpolation=cv2.INTER_AREA)
+        tmp = path + ".part"
+        try:
+            ok, buf = cv2.imencode(f".{fmt}", resized[w], _encode_params(fmt))
+            if not ok:
+                logger.warning(f"缩略图编码失败（{fmt}）: {src_path}")
+                continue
+            with open(tmp, "wb") as f:
+                f.write(buf.tobytes())
+            os.replace(tmp, path)
+        except (cv2.error, OSError) as e:
+            # 如 OpenCV 未编译 WebP 编码器，或磁盘已满；跳过该格式，其余照常生成
+            logger.warning(f"缩略图生成失败（{w}px {fmt}）: {src_path}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            continue
+        out[(w, fmt)] = path
+    return out
+
+
+def backfill(directories: Iterable[str], force: bool = False) -> Dict[str, int]:
+    """为目录中已有的原图补生成缩略图，返回 {"images", "failed"}。"""
+    images = failed = 0
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path) or not name.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
+                continue
+            if generate_derivatives(path, force=force):
+                images += 1
+            else:
+                failed += 1
+    return {"images": images, "failed": failed}
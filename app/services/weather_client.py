@@ -1,97 +1,379 @@
+import asyncio
 import os
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import threading
+import time
 from datetime import datetime, timedelta
 import logging
 
+from app.utils.http_pool import get_session
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 logger = logging.getLogger("weather")
 
 
-def _requests_session():
-    s = requests.Session()
-    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
-    s.mount("https://", HTTPAdapter(max_retries=retries))
-    s.mount("http://", HTTPAdapter(max_retries=retries))
-    return s
+# 和风天气逐小时预报端点（按覆盖小时数升序）；72h/168h 需账号支持，失败时回退 24h
+_HOURLY_ENDPOINTS = ((24, "24h"), (72, "72h"), (168, "168h"))
+MAX_FORECAST_DAYS = 7
+
+
+def _hourly_endpoint(days: int) -> str:
+    for span, name in _HOURLY_ENDPOINTS:
+        if days * 24 <= span:
+            return name
+    return _HOURLY_ENDPOINTS[-1][1]
+
+
+def _synthetic_hour(t: datetime, i: int) -> dict:
+    return {
+        "time": t.isoformat(),
+        "temp": 25 + (i % 6) - 3,
+        "humidity": 40 + (i % 20),
+        "uvIndex": 6 if 10 <= t.hour <= 16 else 1,
+        "windSpeed": 3 + (i % 4),
+        "cloud": 20 if 12 <= t.hour <= 16 else 50,
+        "precip": 0.0,
+        "visibility": 10.0,
+    }
+
+
+class _ForecastCache:
+    """
+    进程内预报缓存，键为 (location, days)：
+    - TTL 内直接命中；
+    - 过期但仍在 stale 窗口内：返回旧值，同时后台线程刷新（stale-while-revalidate）；
+    - 未命中：同一键只允许一个上游请求在途，其余调用等待其结果（请求合并）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (fresh_until, stale_until, forecast)
+        self._inflight = {}  # key -> threading.Event
+        self._tasks = {}     # key -> asyncio.Task（异步加载中的键）
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "upstream_calls": 0}
+
+    def get(self, key, loader):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and now < entry[0]:
+                    self._stats["hits"] += 1
+                    return entry[2]
+                if entry and now < entry[1]:
+                    self._stats["stale_hits"] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        self._stats["refreshes"] += 1
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry[2]
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    self._stats["misses"] += 1
+                    break
+                self._stats["coalesced"] += 1
+            waiter.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry:
+                return entry[2]
+        return self._load(key, loader)
+
+    async def get_async(self, key, async_loader, loader):
+        """
+        与 get 语义一致：未命中时由首个协程执行 async_loader，同一事件循环内的其他协程等待同一任务；
+        若该键正由同步线程加载，则在线程池中等待其完成。stale 刷新仍走后台线程 + 同步 loader。
+        """
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and now < entry[0]:
+                    self._stats["hits"] += 1
+                    return entry[2]
+                if entry and now < entry[1]:
+                    self._stats["stale_hits"] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = threading.Event()
+                        self._stats["refreshes"] += 1
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry[2]
+                task = self._tasks.get(key)
+                waiter = None
+                if task is not None:
+                    self._stats["coalesced"] += 1
+                elif key in self._inflight:
+                    self._stats["coalesced"] += 1
+                    waiter = self._inflight[key]
+                else:
+                    self._inflight[key] = threading.Event()
+                    self._stats["misses"] += 1
+                    task = asyncio.ensure_future(self._load_async(key, async_loader))
+                    self._tasks[key] = task
+            if task is not None:
+                return await asyncio.shield(task)
+            await asyncio.get_running_loop().run_in_executor(None, waiter.wait)
+
+    def _load(self, key, loader, refresh=False):
+        try:
+            with self._lock:
+                self._stats["upstream_calls"] += 1
+            return self._store(key, *loader(), refresh=refresh)
+        except Exception as e:
+            logger.exception(f"天气预报刷新失败: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    async def _load_async(self, key, async_loader):
+        try:
+            with self._lock:
+                self._stats["upstream_calls"] += 1
+            return self._store(key, *(await async_loader()))
+        except Exception as e:
+            logger.exception(f"天气预报刷新失败: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._tasks.pop(key, None)
+                self._inflight.pop(key).set()
+
+    def _store(self, key, forecast, ok, refresh=False):
+        ttl = _cache_ttl() if ok else _cache_fail_ttl()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if refresh and not ok and entry and now < entry[1]:
+                # 后台刷新失败（上游返回的是启发式回退数据）：保留旧值，WEATHER_CACHE_FAIL_TTL 秒后再试，
+                # stale 窗口结束前不会被回退数据覆盖
+                self._entries[key] = (now + ttl, max(entry[1], now + ttl), entry[2])
+                return entry[2]
+            self._entries[key] = (now + ttl, now + ttl + _cache_stale(), forecast)
+        return forecast
+
+    def _refresh(self, key, loader):
+        try:
+            self._load(key, loader, refresh=True)
+        except Exception:
+            pass  # 已记录日志，继续提供旧值直到 stale 窗口结束
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for k in self._stats:
+                self._stats[k] = 0
+
+
+def _cache_ttl() -> float:
+    return float(os.getenv("WEATHER_CACHE_TTL", "3600"))
+
+
+def _cache_stale() -> float:
+    return float(os.getenv("WEATHER_CACHE_STALE", "1800"))
+
+
+def _cache_fail_ttl() -> float:
+    return float(os.getenv("WEATHER_CACHE_FAIL_TTL", "60"))
+
+
+_forecast_cache = _ForecastCache()
 
 
 def get_forecast(days: int = 2):
     """
-    返回未来hours级别的天气数据（正式接入和风天气）。
-    - 24小时数据使用 /v7/weather/24h
-    - 若需要48小时，优先使用24小时并在末尾补充启发式；或如账号支持72h则改为72h并裁剪。
-    返回结构：{"source": str, "hours": [{time, temp, humidity, uvIndex, windSpeed, cloud, precip, visibility}]}
+    带缓存的天气预报（见 _ForecastCache），上游约每 WEATHER_CACHE_TTL 秒（默认1小时）调用一次。
+    上游失败或无密钥时的启发式数据只缓存 WEATHER_CACHE_FAIL_TTL 秒。
+    返回的字典为共享缓存对象，调用方不应修改。WEATHER_CACHE_TTL=0 时关闭缓存。
     """
+    days = max(1, min(int(days), MAX_FORECAST_DAYS))
+    if _cache_ttl() <= 0:
+        return _fetch_forecast(days)[0]
+    location = os.getenv("HEWEATHER_LOCATION", "110.9775,35.0661")
+    return _forecast_cache.get((location, days), lambda: _fetch_forecast(days))
+
+
+def get_forecast_cache_stats() -> dict:
+    """缓存命中/未命中等计数，用于监控。"""
+    return _forecast_cache.stats()
+
+
+def clear_forecast_cache():
+    _forecast_cache.clear()
+
+
+def _request_plan(days: int) -> dict:
+    """汇总一次上游请求所需的配置：密钥、定位、候选端点URL、请求头与超时。"""
     api_key = os.getenv("HEWEATHER_API_KEY")
     # 固定应用默认定位：运城盐湖主景区坐标（经度,纬度），可被 HEWEATHER_LOCATION 覆盖
     location = os.getenv("HEWEATHER_LOCATION", "110.9775,35.0661")
     # 新增：可配置 API 基础域名（开发/商业），以及可选 Referer 与超时
     api_base = os.getenv("HEWEATHER_API_BASE", "https://devapi.qweather.com")
     referer = os.getenv("HEWEATHER_REFERER")
-    timeout = int(os.getenv("HEWEATHER_TIMEOUT", "8"))
+    endpoints = [_hourly_endpoint(days)]
+    if endpoints[0] != "24h":
+        endpoints.append("24h")
+    return {
+        "api_key": api_key,
+        "location": location,
+        "api_base": api_base,
+        "referer": referer,
+        "headers": {"Referer": referer} if referer else {},
+        "timeout": int(os.getenv("HEWEATHER_TIMEOUT", "8")),
+        "urls": [(ep, f"{api_base}/v7/weather/{ep}?location={location}&key={api_key}") for ep in endpoints],
+    }
+
 
+def _parse_hourly(data: dict) -> list:
     hours = []
-    if api_key:
-        try:
-            session = _requests_session()
-            url_24h = f"{api_base}/v7/weather/24h?location={location}&key={api_key}"
-            headers = {}
-            if referer:
-                headers["Referer"] = referer
-            r = session.get(url_24h, headers=headers, timeout=timeout)
-            r.raise_for_status()
-            data = r.json()
-            for item in data.get("hourly", []):
-                hours.append({
-                    "time": item["fxTime"],
-                    "temp": float(item["temp"]),
-                    "humidity": int(item["humidity"]),
-                    "uvIndex": int(item.get("uvIndex", 0)),
-                    "windSpeed": float(item.get("windSpeed", 0)),
-                    "cloud": int(item.get("cloud", 0)),
-                    "precip": float(item.get("precip", 0.0)),
-                    # 新增：能见度（km），QWeather字段为 vis
-                    "visibility": float(item.get("vis", 0.0)),
-                })
-            logger.info(f"HeWeather获取成功，hour数: {len(hours)}，location={location}, base={api_base}, referer={referer or '-'}")
-        except Exception as e:
-            logger.exception(f"HeWeather调用失败: {e}")
+    for item in data.get("hourly", []):
+        hours.append({
+            "time": item["fxTime"],
+            "temp": float(item["temp"]),
+            "humidity": int(item["humidity"]),
+            "uvIndex": int(item.get("uvIndex", 0)),
+            "windSpeed": float(item.get("windSpeed", 0)),
+            "cloud": int(item.get("cloud", 0)),
+            "precip": float(item.get("precip", 0.0)),
+            # 新增：能见度（km），QWeather字段为 vis
+            "visibility": float(item.get("vis", 0.0)),
+        })
+    return hours
 
-    # 若需要48小时且不足，补充启发式段
-    if days >= 2 and len(hours) < 48:
+
+def _finalize_forecast(hours: list, days: int, plan: dict, ok: bool):
+    """多天请求且不足时补充启发式段；完全无数据时回退24小时启发式数据。"""
+    wanted = days * 24
+    if days >= 2 and len(hours) < wanted:
         now = datetime.fromisoformat(hours[0]["time"]) if hours else datetime.now().replace(minute=0, second=0, microsecond=0)
-        needed = 48 - len(hours)
-        for i in range(needed):
-            t = now + timedelta(hours=len(hours) + i)
-            hours.append({
-                "time": t.isoformat(),
-                "temp": 25 + (i % 6) - 3,
-                "humidity": 40 + (i % 20),
-                "uvIndex": 6 if 10 <= t.hour <= 16 else 1,
-                "windSpeed": 3 + (i % 4),
-                "cloud": 20 if 12 <= t.hour <= 16 else 50,
-                "precip": 0.0,
-                "visibility": 10.0,
-            })
+        have = len(hours)
+        for i in range(wanted - have):
+            hours.append(_synthetic_hour(now + timedelta(hours=have + i), i))
 
     if hours:
-        return {"source": "HeWeather" if api_key else "dummy", "hours": hours}
+        return {"source": "HeWeather" if plan["api_key"] else "dummy", "hours": hours}, ok
 
     # 回退：生成24小时启发式数据
     now = datetime.now().replace(minute=0, second=0, microsecond=0)
-    hours = []
-    for i in range(24):
-        t = now + timedelta(hours=i)
-        hours.append({
-            "time": t.isoformat(),
-            "temp": 25 + (i % 6) - 3,
-            "humidity": 40 + (i % 20),
-            "uvIndex": 6 if 10 <= t.hour <= 16 else 1,
-            "windSpeed": 3 + (i % 4),
-            "cloud": 20 if 12 <= t.hour <= 16 else 50,
-            "precip": 0.0,
-            "visibility": 10.0,
-        })
+    hours = [_synthetic_hour(now + timedelta(hours=i), i) for i in range(24)]
     logger.warning("使用启发式天气数据回退")
-    return {"source": "dummy", "hours": hours}
\ No newline at end of file
+    return {"source": "dummy", "hours": hours}, False
+
+
+def _log_success(plan: dict, endpoint: str, hours: list):
+    logger.info(
+        f"HeWeather获取成功，endpoint={endpoint}，hour数: {len(hours)}，location={plan['location']}, "
+        f"base={plan['api_base']}, referer={plan['referer'] or '-'}"
+    )
+
+
+def _fetch_forecast(days: int):
+    """
+    返回未来hours级别的天气数据（正式接入和风天气），以及上游是否调用成功。
+    - days 取 1~7：1 天用 /v7/weather/24h，≤3 天用 72h，其余用 168h（账号不支持时回退 24h）
+    - 多天请求且真实数据不足 days*24 小时时，在末尾补充启发式段
+    返回结构：({"source": str, "hours": [{time, temp, humidity, uvIndex, windSpeed, cloud, precip, visibility}]}, ok)
+    """
+    plan = _request_plan(days)
+    hours = []
+    if plan["api_key"]:
+        session = get_session()
+        for endpoint, url in plan["urls"]:
+            try:
+                r = session.get(url, headers=plan["headers"], timeout=plan["timeout"])
+                r.raise_for_status()
+                hours = _parse_hourly(r.json())
+                _log_success(plan, endpoint, hours)
+                break
+            except Exception as e:
+                hours = []
+                logger.exception(f"HeWeather调用失败（{endpoint}）: {e}")
+    return _finalize_forecast(hours, days, plan, bool(hours))
+
+
+# 异步客户端按事件循环复用（httpx.AsyncClient 绑定创建时的事件循环）；换循环时旧客户端在其所属循环上关闭
+_async_client = None
+_async_client_loop = None
+
+
+def _get_async_client():
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        if _async_client is not None:
+            _discard_async_client(_async_client, _async_client_loop)
+        pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=httpx.AsyncHTTPTransport(retries=int(os.getenv("HTTP_RETRIES", "3"))),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def _aclose_quietly(client):
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug(f"关闭旧的异步HTTP客户端失败: {e}")
+
+
+def _discard_async_client(client, loop):
+    """旧循环未关闭时把 aclose 投递到旧循环；旧循环已关闭则只能在当前循环上尽力关闭。"""
+    if loop is not None and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+    else:
+        asyncio.get_running_loop().create_task(_aclose_quietly(client))
+
+
+async def close_async_client():
+    """关闭当前事件循环上的异步客户端（供应用关闭时调用）。"""
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        client, _async_client, _async_client_loop = _async_client, None, None
+        await _aclose_quietly(client)
+
+
+async def _fetch_forecast_async(days: int):
+    """_fetch_forecast 的非阻塞版本；未安装 httpx 时退回线程池执行同步版本。"""
+    if httpx is None:
+        return await asyncio.to_thread(_fetch_forecast, days)
+    plan = _request_plan(days)
+    hours = []
+    if plan["api_key"]:
+        client = _get_async_client()
+        for endpoint, url in plan["urls"]:
+            try:
+                r = await client.get(url, headers=plan["headers"], timeout=plan["timeout"])
+                r.raise_for_status()
+                hours = _parse_hourly(r.json())
+                _log_success(plan, endpoint, hours)
+                break
+            except Exception as e:
+                hours = []
+                logger.exception(f"HeWeather调用失败（{endpoint}）: {e}")
+    return _finalize_forecast(hours, days, plan, bool(hours))
+
+
+async def get_forecast_async(days: int = 2):
+    """
+    get_forecast 的 asyncio 版本，供 async 路由使用：缓存命中直接返回，
+    未命中时在事件循环上等待上游响应，不占用线程池工作线程。与同步版本共享同一缓存。
+    """
+    days = max(1, min(int(days), MAX_FORECAST_DAYS))
+    if _cache_ttl() <= 0:
+        return (await _fetch_forecast_async(days))[0]
+    location = os.getenv("HEWEATHER_LOCATION", "110.9775,35.0661")
+    return await _forecast_cache.get_async(
+        (location, days),
+        lambda: _fetch_forecast_async(days),
+        lambda: _fetch_forecast(days),
+    )
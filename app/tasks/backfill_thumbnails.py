@@ -0,0 +1,17 @@
+import sys
+
+from app.services.thumbnails import STATIC_ROOTS, backfill
+
+
+def main():
+    # 用法：python -m app.tasks.backfill_thumbnails [--force] [目录 ...]
+    # 为启用缩略图之前上传的景点封面与社区图片补生成衍生图，默认处理 storage/attractions 与 storage/community
+    args = sys.argv[1:]
+    force = "--force" in args
+    directories = [a for a in args if a != "--force"] or list(STATIC_ROOTS.values())
+    result = backfill(directories, force=force)
+    print(f"Generated thumbnails for {result['images']} images ({result['failed']} failed).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,13 @@
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
-from app.db.models import Prediction
+from app.db.crud import clear_predictions
 from app.tasks.scheduler import refresh_predictions
 
 def trigger_refresh():
     # 1. Clear old predictions (optional, but good for clean slate)
     db = SessionLocal()
     try:
-        db.query(Prediction).delete()
-        db.commit()
+        clear_predictions(db)
         print("Cleared old predictions.")
     except Exception as e:
         print(f"Error clearing predictions: {e}")
@@ -0,0 +1,20 @@
+import sys
+
+from app.db.session import SessionLocal
+from app.db.crud_sensor import rebuild_sensor_rollups
+
+
+def main():
+    # 用法：python -m app.tasks.rebuild_sensor_rollups [lake_id]
+    # 启用预聚合之前写入的历史传感器数据需执行一次，之后由写入路径增量维护
+    lake_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    db = SessionLocal()
+    try:
+        count = rebuild_sensor_rollups(db, lake_id)
+        print(f"Rebuilt rollups from {count} raw readings.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
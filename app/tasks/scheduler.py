@@ -1,7 +1,7 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
 import logging
-from sqlalchemy import func
+import os
 
 # Lazy imports moved inside functions to prevent import loops or side effects
 # from app.services.weather_client import get_forecast
@@ -14,31 +14,50 @@ LAKES = [] # Deprecated, use DB
 
 def _parse_iso(s: str) -> datetime:
     try:
-        return datetime.fromisoformat(s.replace("Z", "+00:00"))
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
     except Exception:
         return datetime.now()
+    # 带时区的时间（如和风天气 +08:00）转为本地时间，以便与 datetime.now() 比较
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
 
 
 def _check_and_trigger_push(db, preds):
-    """检查订阅阈值并打印模拟推送日志。"""
-    from app.db.crud_subscriptions import get_all_subscriptions
-    
-    subs = get_all_subscriptions(db)
+    """检查订阅阈值（按湖区查订阅倒排索引），将待推送消息写入发件箱，由推送工作线程异步投递。"""
+    from app.services.subscription_index import subscription_index
+    from app.services.push_queue import enqueue_pushes
+
+    subscription_index.refresh(db)
     now = datetime.now()
     within_2h = now + timedelta(hours=2)
-    for sub in subs:
-        try:
-            lake_ids = [int(x) for x in (sub.lake_ids or '').split(',') if x]
-        except ValueError:
-            lake_ids = []
-        for p in preds:
-            if p.lake_id in lake_ids and p.score >= (sub.threshold or 90):
-                start_dt = _parse_iso(p.best_time.start)
-                if now <= start_dt <= within_2h:
-                    # 模拟推送触发日志
-                    logger.info(
-                        f"[PUSH TRIGGER] 用户[{sub.openid}]订阅的{p.lake_name}将在{start_dt.strftime('%H:%M')}达到{p.score}分，准备推送！"
-                    )
+    messages = []
+    for p in preds:
+        start_dt = _parse_iso(p.best_time.start)
+        if not (now <= start_dt <= within_2h):
+            continue
+        for openid in subscription_index.subscribers(p.lake_id, p.score):
+            messages.append({
+                "openid": openid,
+                "lake_id": p.lake_id,
+                # 同一用户、同一湖区、同一拍摄窗口只推送一次（每小时刷新不会重复提醒）
+                "window": p.best_time.start,
+                "title": f"{p.lake_name}拍摄提醒",
+                "body": f"{p.lake_name}将在{start_dt.strftime('%H:%M')}达到{p.score}分",
+            })
+    if messages:
+        queued = enqueue_pushes(db, messages)
+        logger.info(f"[PUSH TRIGGER] 命中{len(messages)}条订阅提醒，新入队{queued}条")
+
+def _publish_prediction_snapshot(db, lakes, forecast):
+    """刷新后重建 /prediction/today 系列接口的预渲染快照（失败不影响刷新本身）。"""
+    from app.db.crud import get_latest_predictions
+    from app.services.prediction_snapshot import publish_snapshot
+
+    try:
+        # 刚写入过预测，库中不为空，默认湖区列表不会用到
+        publish_snapshot(get_latest_predictions(db), lakes, forecast, lakes)
+    except Exception as e:
+        logger.warning(f"预测快照构建失败，将在请求时重建: {e}")
+
 
 def refresh_predictions():
     from app.db.session import SessionLocal
@@ -61,6 +80,7 @@ def refresh_predictions():
         preds = predict_for_lakes(lakes, forecast)
         save_predictions(db, preds)
         logger.info(f"刷新预测成功，写入{len(preds)}条。")
+        _publish_prediction_snapshot(db, lakes, forecast)
         _check_and_trigger_push(db, preds)
     except Exception as e:
         logger.exception(f"刷新预测失败: {e}")
@@ -73,10 +93,14 @@ def check_daily_recommendations():
     """每日推荐检查任务 (8:00, 16:00)"""
     from app.db.session import SessionLocal
     from app.db.models_poi import PointOfInterest
-    from app.services.realtime_index import compute_and_store_realtime_index
-    from app.db.models import RealtimeIndexRecord
+    from app.services.realtime_index import compute_realtime_indices
+    from app.db.crud_realtime import get_daily_average_score
+    from app.services.subscription_index import subscription_index
+    from app.services.push_queue import enqueue_pushes
     
     logger.info("开始每日推荐检查...")
+    # 推送去重按检查时段（8:00 / 16:00 各一次），同一时段内重复执行不会重复推送
+    window = f"daily:{datetime.now():%Y-%m-%d:%H}"
     db = SessionLocal()
     try:
         # 1. 查询符合条件的点位：category == '摄影型' 且 composite_score >= 0.70
@@ -89,22 +113,19 @@ def check_daily_recommendations():
             logger.info("未找到符合条件的推荐点位")
             return
 
-        for poi in candidates:
+        # 2. 批量获取当前实时指数（并行分析，单事务写库）
+        # 注意：poi.id 需要对应 lake_id。假设数据中的ID与实时监测的Lake ID一致
+        current_indices = compute_realtime_indices([poi.id for poi in candidates])
+
+        for poi, current_idx in zip(candidates, current_indices):
             try:
-                # 2. 获取当前实时指数
-                # 注意：poi.id 需要对应 lake_id。假设数据中的ID与实时监测的Lake ID一致
-                current_idx = compute_and_store_realtime_index(poi.id)
                 current_score = float(current_idx.score)
                 
                 # 3. 获取昨日平均指数
                 yesterday_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
                 yesterday_end = yesterday_start + timedelta(days=1)
                 
-                avg_score = db.query(func.avg(RealtimeIndexRecord.score)).filter(
-                    RealtimeIndexRecord.lake_id == poi.id,
-                    RealtimeIndexRecord.captured_at >= yesterday_start,
-                    RealtimeIndexRecord.captured_at < yesterday_end
-                ).scalar()
+                avg_score = get_daily_average_score(db, poi.id, yesterday_start, yesterday_end)
                 
                 if avg_score is None:
                     logger.info(f"点位[{poi.name}]昨日无数据，跳过对比")
@@ -125,8 +146,13 @@ def check_daily_recommendations():
                         description=poi.description
                     )
                     
-                    logger.info(f"[WECHAT PUSH] {title} | {body}")
-                    # 在此处添加实际的微信推送逻辑
+                    # 推送给订阅了该点位且阈值不高于当前指数的用户，每个检查时段每人至多一次
+                    subscription_index.refresh(db)
+                    queued = enqueue_pushes(db, [
+                        {"openid": openid, "lake_id": poi.id, "window": window, "title": title, "body": body}
+                        for openid in subscription_index.subscribers(poi.id, int(current_score))
+                    ])
+                    logger.info(f"[WECHAT PUSH] {title} | {body}（入队{queued}条）")
                     
             except Exception as e:
                 logger.error(f"处理点位[{poi.name}]推荐检查时出错: {e}")
@@ -137,8 +163,47 @@ def check_daily_recommendations():
         db.close()
 
 
+def compact_sensor_data():
+    """传感器数据压缩：删除保留期外的原始数据与分钟级聚合（小时/天聚合长期保留）。"""
+    from app.db.session import SessionLocal
+    from app.db.crud_sensor import compact_sensor_data as _compact
+
+    db = SessionLocal()
+    try:
+        result = _compact(
+            db,
+            raw_retention_days=int(os.getenv("SENSOR_RAW_RETENTION_DAYS", "30")),
+            minute_retention_days=int(os.getenv("SENSOR_MINUTE_ROLLUP_RETENTION_DAYS", "90")),
+        )
+        logger.info(f"传感器数据压缩完成: {result}")
+    except Exception as e:
+        logger.exception(f"传感器数据压缩失败: {e}")
+    finally:
+        db.close()
+
+
 def start_scheduler():
     try:
+        # 已有数据库补建新增的表、索引与物化表
+        from app.db.migrations import upgrade
+        upgrade()
+
+        # 启动时从磁盘重建截图索引
+        from app.capture.snapshot_catalog import get_catalog
+        from app.services.realtime_index import SNAPSHOT_DIR
+        count = get_catalog(SNAPSHOT_DIR).rescan()
+        logger.info(f"截图索引已重建，{count}个湖区")
+
+        # 推送投递工作线程
+        from app.services.push_queue import push_workers
+        push_workers.start()
+
+        # RTSP 持续接入（RTSP_INGEST_ENABLED=1 时启用，摄像头地址取自 RTSP_LAKE_{id}）
+        if os.getenv("RTSP_INGEST_ENABLED", "0") == "1":
+            from app.capture.rtsp_ingest import ingestion_service, cameras_from_env
+            started = ingestion_service.start(cameras_from_env())
+            logger.info(f"RTSP持续接入已启动，{started}路摄像头")
+
         scheduler.add_job(
             refresh_predictions,
             "interval",
@@ -155,6 +220,14 @@ def start_scheduler():
             minute=0,
             id="daily_recommend_check"
         )
+
+        scheduler.add_job(
+            compact_sensor_data,
+            "cron",
+            hour=3,
+            minute=30,
+            id="compact_sensor_data",
+        )
         
         scheduler.start()
         logger.info("定时任务已启动")
@@ -163,6 +236,16 @@ def start_scheduler():
 
 
 def shutdown_scheduler():
+    try:
+        from app.capture.rtsp_ingest import ingestion_service
+        ingestion_service.stop()
+    except Exception:
+        pass
+    try:
+        from app.services.push_queue import push_workers
+        push_workers.stop()
+    except Exception:
+        pass
     try:
         scheduler.shutdown()
         logger.info("定时任务已关闭")
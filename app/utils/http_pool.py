@@ -0,0 +1,91 @@
+import os
+import socket
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+# 进程级共享连接池：天气API、ESP32-CAM HTTP快照、OSS上传复用同一套 keep-alive 连接，
+# 避免每次定时任务都重新进行 TCP/TLS 握手。
+# 配置（环境变量）：
+# - HTTP_POOL_SIZE：每个主机的最大连接数（默认 10）
+# - HTTP_RETRIES / HTTP_RETRY_BACKOFF：重试次数与退避系数（默认 3 / 0.5）
+# - HTTP_KEEPALIVE：是否开启 TCP keepalive 探测（默认 1）
+# - HTTP_KEEPALIVE_IDLE：空闲多少秒后开始探测（默认 60，仅 Linux 生效）
+
+_lock = threading.Lock()
+_adapter: HTTPAdapter | None = None
+_local = threading.local()
+# 所有线程创建过的 Session，close_pool 时统一关闭；_generation 变化后各线程的旧 Session 作废重建
+_sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+_generation = 0
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """在连接池创建的 socket 上开启 TCP keepalive，防止长空闲连接被 NAT/网关静默丢弃。"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        if os.getenv("HTTP_KEEPALIVE", "1") == "1":
+            options = list(HTTPConnection.default_socket_options)
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, int(os.getenv("HTTP_KEEPALIVE_IDLE", "60"))))
+            kwargs["socket_options"] = options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def new_adapter(retries: int | None = None) -> HTTPAdapter:
+    """按环境配置创建一个带连接池的 adapter；retries=0 用于自行处理重试的客户端（如 oss2）。"""
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    total = int(os.getenv("HTTP_RETRIES", "3")) if retries is None else retries
+    retry = Retry(
+        total=total,
+        backoff_factor=float(os.getenv("HTTP_RETRY_BACKOFF", "0.5")),
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    return _KeepAliveAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+
+def _shared_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        with _lock:
+            if _adapter is None:
+                _adapter = new_adapter()
+    return _adapter
+
+
+def get_session() -> requests.Session:
+    """
+    返回当前线程的 Session。各线程的 Session 挂载同一个共享 adapter，
+    因此连接池在线程间复用（urllib3 连接池是线程安全的），而 cookie 等会话状态互不干扰。
+    """
+    session = getattr(_local, "session", None)
+    if session is None or getattr(_local, "generation", None) != _generation:
+        adapter = _shared_adapter()
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        with _lock:
+            _sessions.add(session)
+            _local.generation = _generation
+        _local.session = session
+    return session
+
+
+def close_pool():
+    """关闭共享连接池及所有线程的 Session（进程退出或测试时调用），之后各线程的 get_session 会重建。"""
+    global _adapter, _generation
+    with _lock:
+        sessions = list(_sessions)
+        _sessions.clear()
+        _generation += 1
+        if _adapter is not None:
+            _adapter.close()
+            _adapter = None
+    for session in sessions:
+        session.close()
+    _local.__dict__.pop("session", None)
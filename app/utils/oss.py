@@ -1,8 +1,11 @@
 import oss2
 import os
+import threading
 import uuid
 from datetime import datetime
 
+from app.utils.http_pool import new_adapter
+
 # Initialize OSS Config
 # Use environment variables for security
 ACCESS_KEY_ID = os.getenv("ALIYUN_ACCESS_KEY_ID")
@@ -10,14 +13,38 @@ ACCESS_KEY_SECRET = os.getenv("ALIYUN_ACCESS_KEY_SECRET")
 BUCKET_NAME = os.getenv("ALIYUN_OSS_BUCKET")
 ENDPOINT = os.getenv("ALIYUN_OSS_ENDPOINT") # e.g., oss-cn-hangzhou.aliyuncs.com
 
+_bucket = None
+_bucket_lock = threading.Lock()
+
 def get_bucket():
+    """返回进程内复用的 Bucket；其 keep-alive 连接池来自 http_pool（重试交由 oss2 自身处理）。"""
+    global _bucket
     if not all([ACCESS_KEY_ID, ACCESS_KEY_SECRET, BUCKET_NAME, ENDPOINT]):
         print("Warning: OSS credentials not fully set.")
         return None
-    
-    auth = oss2.Auth(ACCESS_KEY_ID, ACCESS_KEY_SECRET)
-    bucket = oss2.Bucket(auth, ENDPOINT, BUCKET_NAME)
-    return bucket
+
+    if _bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                auth = oss2.Auth(ACCESS_KEY_ID, ACCESS_KEY_SECRET)
+                session = oss2.Session(adapter=new_adapter(retries=0))
+                _bucket = oss2.Bucket(auth, ENDPOINT, BUCKET_NAME, session=session)
+    return _bucket
+
+def _object_name(filename: str, folder: str) -> str:
+    # Generate unique path: folder/YYYYMMDD/uuid_filename
+    date_str = datetime.now().strftime("%Y%m%d")
+    ext = os.path.splitext(filename)[1]
+    unique_name = f"{uuid.uuid4().hex}{ext}"
+    return f"{folder}/{date_str}/{unique_name}"
+
+def _public_url(object_name: str) -> str:
+    # Construct URL (Assuming public-read or using authorized signing logic if private)
+    # For public-read buckets: https://bucket-name.endpoint/object-name
+    # For private buckets, we need to sign, but here we return the permanent key 
+    # or a public link if the user sets ACL to public-read.
+    # Let's assume standard public access pattern for web apps:
+    return f"https://{BUCKET_NAME}.{ENDPOINT}/{object_name}"
 
 def upload_file_to_oss(file_obj, filename: str, folder: str = "community") -> str:
     """
@@ -27,23 +54,27 @@ def upload_file_to_oss(file_obj, filename: str, folder: str = "community") -> st
     if not bucket:
         return None
 
-    # Generate unique path: folder/YYYYMMDD/uuid_filename
-    date_str = datetime.now().strftime("%Y%m%d")
-    ext = os.path.splitext(filename)[1]
-    unique_name = f"{uuid.uuid4().hex}{ext}"
-    object_name = f"{folder}/{date_str}/{unique_name}"
-
+    object_name = _object_name(filename, folder)
     try:
         # Put Object
         bucket.put_object(object_name, file_obj)
-        
-        # Construct URL (Assuming public-read or using authorized signing logic if private)
-        # For public-read buckets: https://bucket-name.endpoint/object-name
-        # For private buckets, we need to sign, but here we return the permanent key 
-        # or a public link if the user sets ACL to public-read.
-        # Let's assume standard public access pattern for web apps:
-        url = f"https://{BUCKET_NAME}.{ENDPOINT}/{object_name}"
-        return url
+        return _public_url(object_name)
+    except Exception as e:
+        print(f"OSS Upload Error: {e}")
+        return None
+
+def upload_path_to_oss(path: str, filename: str, folder: str = "community") -> str:
+    """
+    Uploads a local file to OSS (streamed from disk by oss2) and returns the public URL.
+    """
+    bucket = get_bucket()
+    if not bucket:
+        return None
+
+    object_name = _object_name(filename, folder)
+    try:
+        bucket.put_object_from_file(object_name, path)
+        return _public_url(object_name)
     except Exception as e:
         print(f"OSS Upload Error: {e}")
         return None
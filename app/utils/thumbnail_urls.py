@@ -0,0 +1,77 @@
+import os
+import threading
+from typing import List, Optional
+
+# 图片 URL -> 缩略图 URL 的映射（只做路径计算与存在性检查，不依赖 OpenCV），
+# 供 schemas / ui_templates / 路由在返回列表时使用；缩略图由 app/services/thumbnails.py 生成。
+# 本地衍生图位于原图目录下的 thumbs/：/static/attractions/abc.jpg -> /static/attractions/thumbs/abc_w320.webp。
+
+STATIC_ROOTS = {
+    "/static/attractions/": "storage/attractions",
+    "/static/community/": "storage/community",
+}
+THUMB_DIR = "thumbs"
+CARD_WIDTH = 320
+
+_known: set = set()
+_known_lock = threading.Lock()
+
+
+def thumbnail_widths() -> List[int]:
+    return sorted({int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "320,640").split(",") if w.strip()})
+
+
+def derivative_path(src_path: str, width: int, fmt: str) -> str:
+    directory, name = os.path.split(src_path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(directory, THUMB_DIR, f"{stem}_w{width}.{fmt}")
+
+
+def local_path_for_url(url: str) -> Optional[str]:
+    """/static/attractions/x.jpg -> storage/attractions/x.jpg；非本地静态图返回 None。"""
+    for prefix, root in STATIC_ROOTS.items():
+        if url.startswith(prefix):
+            return os.path.join(root, url[len(prefix):])
+    return None
+
+
+def _oss_variant(url: str, width: int, fmt: str) -> Optional[str]:
+    bucket, endpoint = os.getenv("ALIYUN_OSS_BUCKET"), os.getenv("ALIYUN_OSS_ENDPOINT")
+    if not bucket or not endpoint or not url.startswith(f"https://{bucket}.{endpoint}/") or "?" in url:
+        return None
+    fmt = "jpg" if fmt == "jpg" else "webp"
+    return f"{url}?x-oss-process=image/resize,w_{width}/format,{fmt}"
+
+
+def thumbnail_url(url: Optional[str], width: int = CARD_WIDTH, fmt: Optional[str] = None) -> Optional[str]:
+    """
+    图片 URL 对应的缩略图 URL（不小于 width 的最小已生成宽度）；
+    缩略图尚未生成（如未执行回填）时返回 None，调用方回退到原图。
+    """
+    if not url:
+        return None
+    fmt = fmt or os.getenv("THUMBNAIL_FORMAT", "webp")
+    if url.startswith("https://"):
+        return _oss_variant(url, width, fmt)
+    src = local_path_for_url(url)
+    if src is None:
+        return None
+    widths = [w for w in thumbnail_widths() if w >= width] or thumbnail_widths()[-1:]
+    base = url.rsplit("/", 1)[0]
+    for w in widths:
+        path = derivative_path(src, w, fmt)
+        thumb = f"{base}/{THUMB_DIR}/{os.path.basename(path)}"
+        with _known_lock:
+            if thumb in _known:
+                return thumb
+        # 只记住已存在的衍生图；不存在的每次重新检查，回填后无需重启即可生效
+        if os.path.exists(path):
+            with _known_lock:
+                _known.add(thumb)
+            return thumb
+    return None
+
+
+def forget_thumbnails():
+    with _known_lock:
+        _known.clear()
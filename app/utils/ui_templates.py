@@ -1,3 +1,5 @@
+from app.utils.thumbnail_urls import thumbnail_url
+
 
 UI_TEMPLATES = {
     "photo_alert_title": "【出片预警】{name} 色彩指数飙升！",
@@ -43,5 +45,7 @@ def format_for_ui(point):
         "ui_subtitle": point.description,
         "ui_category_icon": icon,
         "ui_is_photo_hotspot": point.category == "摄影型",
-        "ui_cover_image": image
+        "ui_cover_image": image,
+        # 列表卡片用缩略图（未生成时回退原图），详情页仍用 ui_cover_image
+        "ui_cover_thumbnail": thumbnail_url(image) or image
     }
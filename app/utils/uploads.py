@@ -0,0 +1,80 @@
+import hashlib
+import os
+from typing import BinaryIO, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# 流式保存上传文件：按块从（已由 Starlette 落到临时文件的）上传流复制到目标路径，
+# 同时计算 SHA-1 与大小，超过上限立即中止并删除半成品，单次上传的内存占用与文件大小无关。
+# 先写入 <目标>.part 再原子改名，截图目录扫描与静态文件服务不会看到写了一半的文件。
+# - UPLOAD_MAX_BYTES：单个文件上限（默认 20MB）
+# - UPLOAD_CHUNK_SIZE：复制块大小（默认 256KB）
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SavedUpload(NamedTuple):
+    path: str
+    size: int
+    sha1: str
+
+
+def max_upload_bytes() -> int:
+    return int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+
+
+def ensure_upload_dir(path: str, fallback: str = "/tmp") -> str:
+    """创建上传目录；只读文件系统（如 Vercel）上退回 fallback。"""
+    try:
+        os.makedirs(path, exist_ok=True)
+        return path
+    except Exception:
+        return fallback
+
+
+def save_stream(src: BinaryIO, dest_path: str, max_bytes: Optional[int] = None, chunk_size: Optional[int] = None) -> SavedUpload:
+    """把 src 按块写入 dest_path，返回 (路径, 字节数, SHA-1)；超过 max_bytes 时抛出 UploadTooLarge。"""
+    limit = max_upload_bytes() if max_bytes is None else max_bytes
+    chunk = chunk_size or int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+    digest = hashlib.sha1()
+    size = 0
+    tmp_path = dest_path + ".part"
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                block = src.read(chunk)
+                if not block:
+                    break
+                size += len(block)
+                if size > limit:
+                    raise UploadTooLarge(f"文件超过 {limit} 字节上限")
+                digest.update(block)
+                out.write(block)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return SavedUpload(dest_path, size, digest.hexdigest())
+
+
+def store_upload(upload: UploadFile, dest_path: str, max_bytes: Optional[int] = None) -> SavedUpload:
+    """同步路由用：已知大小超限时直接 413，否则流式保存（超限同样返回 413）。"""
+    limit = max_upload_bytes() if max_bytes is None else max_bytes
+    if upload.size is not None and upload.size > limit:
+        raise HTTPException(status_code=413, detail=f"文件过大（上限 {limit} 字节）")
+    upload.file.seek(0)
+    try:
+        return save_stream(upload.file, dest_path, limit)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def save_upload_file(upload: UploadFile, dest_path: str, max_bytes: Optional[int] = None) -> SavedUpload:
+    """异步路由用：在线程池中执行 store_upload，不阻塞事件循环。"""
+    return await run_in_threadpool(store_upload, upload, dest_path, max_bytes)
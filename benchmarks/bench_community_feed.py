@@ -0,0 +1,89 @@
+"""
+社区信息流基准：N 条帖子下对比 全量列表 与 键集分页（首页 / 深翻页）的耗时，
+以及点赞风暴下 逐条读改写提交 / 原子 UPDATE / 内存缓冲批量刷新 的吞吐。
+
+用法：python -m benchmarks.bench_community_feed [--posts 300000] [--likes 5000] [--db /tmp/bench_feed.db]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _timeit(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=300000)
+    parser.add_argument("--likes", type=int, default=5000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_feed.db"))
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+
+    from sqlalchemy import desc, insert
+    from app.db.session import Base, SessionLocal, engine
+    from app.db.models_community import CommunityPost
+    from app.db.crud_community import get_posts_page, increment_likes
+    from app.services.community_feed import LikeCounter
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    t0 = datetime(2026, 1, 1)
+    for start in range(0, args.posts, 50000):
+        db.execute(insert(CommunityPost), [
+            {"image_url": f"/static/community/{i}.jpg", "caption": "c", "author_name": "a", "likes": 0,
+             "created_at": t0 + timedelta(seconds=i * 7)}
+            for i in range(start, min(args.posts, start + 50000))
+        ])
+    db.commit()
+    print(f"posts={args.posts}")
+
+    full = _timeit(lambda: db.query(CommunityPost).order_by(desc(CommunityPost.created_at)).all(), repeat=1)
+    first = _timeit(lambda: get_posts_page(db, 20))
+    cursor = None
+    for _ in range(200):
+        _, cursor = get_posts_page(db, 20, cursor)
+    deep = _timeit(lambda: get_posts_page(db, 20, cursor))
+    print(f"  full list          {full * 1000:9.1f} ms")
+    print(f"  keyset first page  {first * 1000:9.3f} ms")
+    print(f"  keyset page 201    {deep * 1000:9.3f} ms")
+
+    hot = db.query(CommunityPost.id).first()[0]
+
+    def read_modify_write():
+        for _ in range(args.likes):
+            post = db.query(CommunityPost).filter(CommunityPost.id == hot).first()
+            post.likes += 1
+            db.commit()
+
+    def atomic():
+        for _ in range(args.likes):
+            increment_likes(db, hot)
+
+    counter = LikeCounter(interval=3600, max_pending=10 ** 9)
+
+    def buffered():
+        for _ in range(args.likes):
+            counter.add(hot)
+        counter.flush()
+
+    for name, fn in [("read-modify-write", read_modify_write), ("atomic UPDATE", atomic), ("buffered + flush", buffered)]:
+        elapsed = _timeit(fn, repeat=1)
+        print(f"  likes {name:18s} {args.likes / elapsed:12.0f} likes/s")
+    counter.stop()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+最新值查询与日均分查询基准：旧表结构（仅 lake_id 单列索引）与升级后
+（(lake_id, captured_at[, score]) 复合索引 + 最新值物化表）对比。
+
+用法：python -m benchmarks.bench_db_latest [--rows 10000000] [--lakes 50] [--repeat 200] [--db /tmp/bench_latest.db]
+在独立的临时 SQLite 文件上先按旧结构灌数，计时后执行 app.db.migrations.upgrade 再计时。
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+_LEGACY_DDL = [
+    "CREATE TABLE realtime_indices (id INTEGER PRIMARY KEY, lake_id INTEGER, lake_name VARCHAR, score INTEGER, captured_at DATETIME, image_path VARCHAR)",
+    "CREATE INDEX ix_realtime_indices_id ON realtime_indices (id)",
+    "CREATE INDEX ix_realtime_indices_lake_id ON realtime_indices (lake_id)",
+    "CREATE TABLE sensor_readings (id INTEGER PRIMARY KEY, lake_id INTEGER, captured_at DATETIME, air_temp INTEGER, humidity INTEGER, "
+    "wind_speed INTEGER, water_temp INTEGER, salinity INTEGER, dissolved_oxygen INTEGER, tds INTEGER, turbidity INTEGER)",
+    "CREATE INDEX ix_sensor_readings_id ON sensor_readings (id)",
+    "CREATE INDEX ix_sensor_readings_lake_id ON sensor_readings (lake_id)",
+    "CREATE INDEX ix_sensor_readings_captured_at ON sensor_readings (captured_at)",
+]
+
+# 每行间隔 1 秒、湖区轮转；用递归 CTE 在 SQLite 内部生成，避免 Python 侧逐行构造
+_FILL = """
+WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows - 1)
+INSERT INTO {table} ({cols})
+SELECT {values} FROM seq
+"""
+
+_QUERIES = {
+    "latest realtime (ORDER BY DESC LIMIT 1)":
+        "SELECT * FROM realtime_indices WHERE lake_id = :lake ORDER BY captured_at DESC LIMIT 1",
+    "latest sensor (ORDER BY DESC LIMIT 1)":
+        "SELECT * FROM sensor_readings WHERE lake_id = :lake ORDER BY captured_at DESC LIMIT 1",
+    "daily avg score":
+        "SELECT avg(score) FROM realtime_indices WHERE lake_id = :lake AND captured_at >= :start AND captured_at < :end",
+}
+
+_MATERIALIZED = {
+    "latest realtime (materialized)": "SELECT * FROM realtime_indices_latest WHERE lake_id = :lake",
+    "latest sensor (materialized)": "SELECT * FROM sensor_readings_latest WHERE lake_id = :lake",
+}
+
+
+def _fill(conn, rows: int, lakes: int, t0: datetime):
+    ts = f"datetime('{t0:%Y-%m-%d %H:%M:%S}', '+' || n || ' seconds')"
+    conn.execute(text(_FILL.format(
+        table="realtime_indices",
+        cols="lake_id, lake_name, score, captured_at",
+        values=f"n % {lakes} + 1, 'lake', 40 + abs(random()) % 60, {ts}",
+    )), {"rows": rows})
+    conn.execute(text(_FILL.format(
+        table="sensor_readings",
+        cols="lake_id, captured_at, air_temp, humidity, wind_speed",
+        values=f"n % {lakes} + 1, {ts}, abs(random()) % 40, abs(random()) % 100, abs(random()) % 12",
+    )), {"rows": rows})
+
+
+def _time(conn, sql: str, params_list, repeat: int) -> float:
+    samples = []
+    for i in range(repeat):
+        params = params_list[i % len(params_list)]
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000, help="每张表的行数")
+    parser.add_argument("--lakes", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_latest.db"))
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    from app.db.migrations import upgrade
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    t0 = datetime(2026, 1, 1)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for ddl in _LEGACY_DDL:
+            conn.execute(text(ddl))
+        _fill(conn, args.rows, args.lakes, t0)
+        conn.execute(text("ANALYZE"))
+    print(f"rows={args.rows:,} lakes={args.lakes}  fill {time.perf_counter() - start:.1f}s")
+
+    last_day = (t0 + timedelta(seconds=args.rows)).replace(hour=0, minute=0, second=0) - timedelta(days=1)
+    params = [
+        {"lake": lake, "start": f"{last_day:%Y-%m-%d %H:%M:%S}", "end": f"{last_day + timedelta(days=1):%Y-%m-%d %H:%M:%S}"}
+        for lake in range(1, args.lakes + 1)
+    ]
+    with engine.connect() as conn:
+        before = {name: _time(conn, sql, params, max(3, args.repeat // 20)) for name, sql in _QUERIES.items()}
+
+    start = time.perf_counter()
+    upgrade(engine)
+    print(f"upgrade {time.perf_counter() - start:.1f}s")
+
+    with engine.connect() as conn:
+        after = {name: _time(conn, sql, params, args.repeat) for name, sql in _QUERIES.items()}
+        after.update({name: _time(conn, sql, params, args.repeat) for name, sql in _MATERIALIZED.items()})
+
+    print(f"{'query':45s} {'before(us)':>12s} {'after(us)':>12s}")
+    for name, us in after.items():
+        b = f"{before[name]:12.1f}" if name in before else f"{'-':>12s}"
+        print(f"{name:45s} {b} {us:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+色彩特征提取基准：compute_color_features（全分辨率、多掩码）对比
+compute_color_features_fast（降采样 + 查找表单遍统计），报告 1080p / 4K 下的加速比与得分偏差。
+
+用法：python -m benchmarks.bench_image_analysis [--image path.jpg ...] [--target-pixels 230400] [--repeat 5]
+未指定 --image 时使用合成的“天空 + 粉色盐湖”画面。
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.image_analysis import (
+    cv2,
+    compute_color_features,
+    compute_color_features_fast,
+    score_from_features,
+)
+
+
+def synthetic_frame(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """合成测试帧：上部蓝天白云渐变，下部粉/红盐藻斑块，叠加噪声。"""
+    rng = np.random.default_rng(seed)
+    hsv = np.zeros((height, width, 3), dtype=np.uint8)
+    split = int(height * 0.35)
+    yy, xx = np.mgrid[0:height, 0:width]
+    # 天空：H≈105，饱和度随高度下降，局部白云
+    hsv[:split, :, 0] = 105
+    hsv[:split, :, 1] = np.clip(160 - yy[:split] * 100 // max(1, split), 0, 255)
+    hsv[:split, :, 2] = 200
+    clouds = (np.sin(xx[:split] / 90.0) + np.cos(yy[:split] / 40.0)) > 1.2
+    hsv[:split][clouds] = (0, 15, 235)
+    # 湖面：粉色与红色条带
+    blobs = np.sin(xx[split:] / 70.0) * np.cos(yy[split:] / 55.0)
+    hsv[split:, :, 0] = np.where(blobs > 0.3, 160, np.where(blobs < -0.5, 5, 20)).astype(np.uint8)
+    hsv[split:, :, 1] = np.where(blobs > 0.6, 150, 90).astype(np.uint8)
+    hsv[split:, :, 2] = 170
+    noise = rng.integers(-12, 13, size=hsv.shape)
+    hsv = np.clip(hsv.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    hsv[:, :, 0] %= 180
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(name: str, img: np.ndarray, target_pixels: int, repeat: int):
+    exact = compute_color_features(img, fast=False)
+    fast = compute_color_features_fast(img, target_pixels=target_pixels)
+    # 不缩放时融合统计必须与原实现完全一致
+    assert compute_color_features_fast(img, target_pixels=0) == exact
+
+    t_exact = _best_of(lambda: compute_color_features(img, fast=False), repeat)
+    t_fast = _best_of(lambda: compute_color_features_fast(img, target_pixels=target_pixels), repeat)
+    max_dev = max(abs(exact[k] - fast[k]) for k in exact)
+    score_dev = score_from_features(fast) - score_from_features(exact)
+    print(
+        f"{name:>10} {img.shape[1]}x{img.shape[0]}: exact {t_exact * 1000:7.1f} ms | "
+        f"fast {t_fast * 1000:6.1f} ms ({t_exact / t_fast:4.1f}x) | "
+        f"max feature dev {max_dev:.4f} | score {score_from_features(exact)} -> {score_from_features(fast)} ({score_dev:+d})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="色彩特征提取快速模式基准")
+    parser.add_argument("--image", action="append", default=[], help="真实截图路径（可多次指定）")
+    parser.add_argument("--target-pixels", type=int, default=640 * 360)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if cv2 is None:
+        raise SystemExit("需要安装 opencv-python-headless")
+
+    frames = [(p, cv2.imread(p)) for p in args.image]
+    if not frames:
+        frames = [("1080p", synthetic_frame(1920, 1080)), ("4K", synthetic_frame(3840, 2160))]
+    for name, img in frames:
+        run(name, img, args.target_pixels, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+预测引擎基准：向量化 predict_for_lakes 与旧版逐小时标量实现对比。
+
+用法：python -m benchmarks.bench_prediction [--lakes 1000] [--hours 168] [--repeat 3]
+结果一致性以断言校验（分数、最佳时段、原因与因素逐项相同）。
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from app.schemas.prediction import LakePrediction, TimeWindow
+from app.services.prediction_model import (
+    _build_reason_and_factors,
+    _score_hour,
+    build_forecast_matrix,
+    predict_for_lakes,
+    score_hours,
+)
+
+
+def predict_for_lakes_scalar(lakes: List[Dict], forecast: Dict, hours: int = 24) -> List[LakePrediction]:
+    """旧版实现（逐小时、逐湖区重复调用 _score_hour），仅作为基准参照。"""
+    hours_data = forecast.get("hours", [])[:hours]
+    best_start_idx = 0
+    best_avg = -1.0
+    for start in range(0, max(1, len(hours_data) - 1)):
+        avg = (_score_hour(hours_data[start]) + _score_hour(hours_data[min(start + 1, len(hours_data) - 1)])) / 2
+        if avg > best_avg:
+            best_avg = avg
+            best_start_idx = start
+
+    results: List[LakePrediction] = []
+    for lake in lakes:
+        random.seed(f"{datetime.now().strftime('%Y%m%d')}_{lake['id']}")
+        offset = random.randint(-10, 15)
+        time_shift = random.randint(-2, 2)
+        idx = max(0, min(best_start_idx + time_shift, len(hours_data) - 2))
+        base_score = (_score_hour(hours_data[idx]) + _score_hour(hours_data[idx + 1])) / 2
+        final_score = int(min(100, max(30, base_score + offset)))
+        reason, factors = _build_reason_and_factors(hours_data[idx], hours_data[idx + 1])
+        if offset > 3:
+            reason += " 该区域受地形影响，局部微气候更佳。"
+        elif offset < -3:
+            reason += " 局部风力可能略大，请注意防风。"
+        results.append(
+            LakePrediction(
+                lake_id=lake["id"],
+                lake_name=lake["name"],
+                score=final_score,
+                best_time=TimeWindow(start=hours_data[idx]["time"], end=hours_data[idx + 1]["time"]),
+                updated_at=datetime.now().isoformat(),
+                reason=reason,
+                factors=factors,
+            )
+        )
+    return results
+
+
+def make_forecast(hours: int, seed: int = 7) -> Dict:
+    rng = random.Random(seed)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return {
+        "source": "bench",
+        "hours": [
+            {
+                "time": (start + timedelta(hours=i)).isoformat(),
+                "temp": round(rng.uniform(-5, 38), 1),
+                "humidity": rng.randint(10, 100),
+                "uvIndex": rng.randint(0, 11),
+                "windSpeed": round(rng.uniform(0, 14), 1),
+                "cloud": rng.randint(0, 100),
+                "precip": round(rng.choice([0.0, 0.0, 0.0, rng.uniform(0, 3)]), 1),
+                "visibility": 10.0,
+            }
+            for i in range(hours)
+        ],
+    }
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量化预测引擎基准")
+    parser.add_argument("--lakes", type=int, default=1000)
+    parser.add_argument("--hours", type=int, default=168)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lakes = [{"id": i, "name": f"{i}号盐湖"} for i in range(1, args.lakes + 1)]
+    forecast = make_forecast(args.hours)
+
+    # 逐小时评分一致性
+    hours_data = forecast["hours"]
+    assert score_hours(build_forecast_matrix(hours_data)).tolist() == [_score_hour(h) for h in hours_data]
+
+    # 整体结果一致性（忽略 updated_at 时间戳）
+    vec = predict_for_lakes(lakes, forecast, hours=args.hours)
+    ref = predict_for_lakes_scalar(lakes, forecast, hours=args.hours)
+    strip = lambda ps: [p.model_dump(exclude={"updated_at"}) for p in ps]
+    assert strip(vec) == strip(ref), "向量化结果与标量实现不一致"
+
+    t_scalar = _best_of(lambda: predict_for_lakes_scalar(lakes, forecast, hours=args.hours), args.repeat)
+    t_vec = _best_of(lambda: predict_for_lakes(lakes, forecast, hours=args.hours), args.repeat)
+    print(f"lakes={args.lakes} hours={args.hours}")
+    print(f"scalar:     {t_scalar * 1000:8.2f} ms")
+    print(f"vectorized: {t_vec * 1000:8.2f} ms  ({t_scalar / t_vec:.1f}x)")
+    print("results identical: OK")
+
+    # 多日视野 + 任意窗口长度 + 前K窗口
+    t_topk = _best_of(lambda: predict_for_lakes(lakes, forecast, hours=args.hours, window_hours=3, top_k=3), args.repeat)
+    print(f"window=3h top_k=3: {t_topk * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+推送队列吞吐基准：向本地推送网关桩投递 N 条消息，对比不同批大小 / 工作线程数下的条/秒。
+
+用法：python -m benchmarks.bench_push_queue [--messages 5000] [--rate 100000] [--latency 0.005] [--db /tmp/bench_push.db]
+桩网关每个请求固定延迟 --latency 秒，模拟真实推送接口的往返耗时；--rate 为令牌桶限速（条/秒）。
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubGateway(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=100000)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_push.db"))
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ.setdefault("HTTP_POOL_SIZE", "16")
+
+    from app.db.session import Base, SessionLocal, engine
+    from app.db.models import PushMessage
+    from app.db.crud_push import enqueue_push_messages
+    from app.services.push_queue import HttpProvider, PushWorkerPool
+
+    Base.metadata.create_all(bind=engine)
+    _StubGateway.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubGateway)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/push"
+
+    print(f"messages={args.messages} gateway latency={args.latency * 1000:.1f}ms rate limit={args.rate:g}/s")
+    for workers, batch in [(1, 1), (4, 1), (1, 50), (4, 50), (4, 200)]:
+        db = SessionLocal()
+        db.query(PushMessage).delete()
+        db.commit()
+        start = time.perf_counter()
+        enqueue_push_messages(db, [
+            {"openid": f"u{i}", "lake_id": i % 3 + 1, "window": f"w{workers}-{batch}", "title": "t", "body": "b"}
+            for i in range(args.messages)
+        ])
+        enqueue_time = time.perf_counter() - start
+        db.close()
+
+        pool = PushWorkerPool(provider=HttpProvider(url), workers=workers, batch_size=batch, rate_per_sec=args.rate, poll_interval=0.01)
+        start = time.perf_counter()
+        pool.start()
+        while pool.sent + pool.failed < args.messages:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        pool.stop()
+        print(f"workers={workers} batch={batch:<4d} enqueue {enqueue_time * 1000:6.0f}ms  deliver {elapsed:6.2f}s  {args.messages / elapsed:8,.0f} msg/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
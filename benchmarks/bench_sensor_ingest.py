@@ -0,0 +1,59 @@
+"""
+传感器批量写入基准：逐条 save_sensor_reading（每行一次 commit + refresh）与
+save_sensor_readings（每块一次 executemany）的写入速率对比。
+
+用法：python -m benchmarks.bench_sensor_ingest [--rows 5000] [--chunk 1000] [--db /tmp/bench_sensor.db]
+使用独立的临时 SQLite 文件，不影响 data.db。
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_sensor.db"))
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+
+    from app.db.session import Base, SessionLocal, engine
+    from app.db import models  # noqa: F401  注册模型
+    from app.db.crud_sensor import SENSOR_FIELDS, save_sensor_reading, save_sensor_readings, sensor_row
+
+    Base.metadata.create_all(bind=engine)
+
+    rnd = random.Random(0)
+    t0 = datetime(2026, 7, 1)
+    readings = [
+        (rnd.randint(1, 3), t0 + timedelta(seconds=i), *(rnd.uniform(0, 60) for _ in SENSOR_FIELDS))
+        for i in range(args.rows)
+    ]
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for lake_id, captured_at, *values in readings:
+            save_sensor_reading(db, lake_id, captured_at, *values)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        save_sensor_readings(db, [sensor_row(*r) for r in readings], chunk_size=args.chunk)
+        batch = time.perf_counter() - start
+    finally:
+        db.close()
+
+    print(f"rows={args.rows} chunk={args.chunk}")
+    print(f"single-row : {single:.3f}s  {args.rows / single:,.0f} rows/s")
+    print(f"batch      : {batch:.3f}s  {args.rows / batch:,.0f} rows/s  ({single / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
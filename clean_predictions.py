@@ -1,11 +1,10 @@
 from app.db.session import SessionLocal
-from app.db.models import Prediction
+from app.db.crud import clear_predictions as _clear
 
 def clean_predictions():
     db = SessionLocal()
     try:
-        num = db.query(Prediction).delete()
-        db.commit()
+        num = _clear(db)
         print(f"Deleted {num} predictions.")
     except Exception as e:
         print(f"Error: {e}")
@@ -1,13 +1,12 @@
 from app.db.session import SessionLocal
-from app.db.models import Prediction
+from app.db.crud import clear_predictions as _clear
 from sqlalchemy import text
 
 def clear_predictions():
     db = SessionLocal()
     try:
-        # 使用 SQLAlchemy 的 delete 方法
-        num = db.query(Prediction).delete()
-        db.commit()
+        # 同时清空当前预测与历史归档
+        num = _clear(db)
         print(f"Deleted {num} old prediction records.")
     except Exception as e:
         print(f"Error: {e}")
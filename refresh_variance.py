@@ -1,5 +1,5 @@
 from app.db.session import SessionLocal
-from app.db.models import Prediction
+from app.db.crud import clear_predictions
 from app.tasks.scheduler import refresh_predictions
 import logging
 
@@ -11,8 +11,7 @@ def trigger_refresh_with_variance():
     # 1. Clear old predictions to force new logic to apply
     db = SessionLocal()
     try:
-        deleted = db.query(Prediction).delete()
-        db.commit()
+        deleted = clear_predictions(db)
         print(f"Cleared {deleted} old predictions.")
     except Exception as e:
         print(f"Error clearing predictions: {e}")
@@ -1,6 +1,7 @@
 from app.db.session import SessionLocal
 from app.db.models_poi import PointOfInterest
 from app.db.models_attractions import Attraction
+from app.db.attractions_fts import rebuild_attractions_fts
 
 def sync_data():
     db = SessionLocal()
@@ -37,6 +38,7 @@ def sync_data():
         
         db.commit()
         print("Synced POIs to Attractions.")
+        print(f"Rebuilt search index for {rebuild_attractions_fts(db)} attractions.")
         
     except Exception as e:
         print(f"Error: {e}")
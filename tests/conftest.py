@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+import pytest
+
+# 测试使用独立的临时 SQLite 库，须在导入 app 模块之前设置
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _create_tables():
+    from app.db.session import Base, engine
+    from app.db import models, models_attractions, models_community, models_poi, models_user  # noqa: F401
+    from app.db.attractions_fts import ensure_fts_table
+
+    Base.metadata.create_all(bind=engine)
+    ensure_fts_table(engine)
+    yield
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import attractions as attractions_route
+from app.db.crud_attractions import create_attraction, get_attractions, update_attraction
+from app.db.models_attractions import Attraction
+from app.db.session import SessionLocal
+from app.schemas.attraction import AttractionCreate, AttractionUpdate
+from app.services import ahp
+from app.services.ahp import AHPCalculator
+from app.services.ahp_ranking import ScoreMatrix, ahp_ranking
+
+
+def _old_order(rows, weights, k):
+    """原实现：逐个打分后稳定排序"""
+    w = dict(zip(("accessibility", "thematic", "colorfulness"), weights))
+    score = lambda r: w["accessibility"] * (r[1] or 0.5) + w["thematic"] * (r[2] or 0.5) + w["colorfulness"] * (r[3] or 0.5)
+    return [r[0] for r in sorted(rows, key=score, reverse=True)][:k]
+
+
+def test_weight_vector_is_cached_and_validated():
+    ahp._weights_for.cache_clear()
+    w = AHPCalculator.weight_vector(3, 5, 7)
+    assert AHPCalculator.weight_vector(3.0000001, 5, 7) == w
+    assert ahp._weights_for.cache_info().hits == 1
+    assert sum(w) == pytest.approx(1.0) and w[0] > w[1] > w[2]
+    assert AHPCalculator.calculate_weights(3, 5, 7)["thematic"] == w[1]
+    with pytest.raises(ValueError):
+        AHPCalculator.weight_vector(0, 5, 7)
+
+
+def test_top_k_matches_full_sort_with_ties():
+    rng = np.random.default_rng(7)
+    # 得分取少量离散值，制造大量并列，验证同分时保持默认顺序
+    rows = [(i, *rng.choice([None, 0.0, 0.2, 0.5, 0.8], 3).tolist()) for i in range(3000)]
+    matrix = ScoreMatrix(rows)
+    for at, tc, ac in [(1, 1, 1), (3, 5, 7), (1 / 9, 2, 1 / 3), (9, 9, 9)]:
+        w = AHPCalculator.weight_vector(at, tc, ac)
+        # 与完整稳定排序一致；与原实现逐个打分的结果仅可能在末位舍入误差造成的并列上不同
+        full = matrix.ids[np.argsort(-(matrix.scores @ np.array(w)), kind="stable")].tolist()
+        score = {r[0]: sum(x * (v or 0.5) for x, v in zip(w, r[1:])) for r in rows}
+        for k in (1, 10, 50, 3000, 5000):
+            got = matrix.top_k(w, k)
+            assert got == full[:k]
+            assert [score[i] for i in got] == pytest.approx([score[i] for i in _old_order(rows, w, k)])
+    assert ScoreMatrix([]).top_k((0.3, 0.3, 0.4), 10) == []
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.query(Attraction).delete()
+    session.commit()
+    ahp_ranking.invalidate()
+    yield session
+    session.query(Attraction).delete()
+    session.commit()
+    session.close()
+
+
+def test_recommend_route_ranks_all_candidates(db):
+    ids = [
+        create_attraction(db, AttractionCreate(name=f"景点{i}")).id
+        for i in range(120)
+    ]
+    hidden = create_attraction(db, AttractionCreate(name="未推荐", is_recommended=False)).id
+    update_attraction(db, hidden, AttractionUpdate(accessibility_score=1.0))
+    app = FastAPI()
+    app.include_router(attractions_route.router, prefix="/api")
+    client = TestClient(app)
+    params = {"ahp_at": 9, "ahp_tc": 1, "ahp_ac": 9, "limit": 3}
+
+    # 默认顺序下排在第 100 名之后的景点，改分后也能被排到第一
+    oldest = get_attractions(db, limit=200, is_recommended=True)[-1].id
+    assert client.get("/api/attractions/recommend", params=params).json()[0]["id"] != oldest
+    update_attraction(db, oldest, AttractionUpdate(accessibility_score=0.9))
+    body = client.get("/api/attractions/recommend", params=params).json()
+    assert body[0]["id"] == oldest and len(body) == 3 and set(a["id"] for a in body) <= set(ids)
+
+    # 非法判断值按默认顺序返回
+    body = client.get("/api/attractions/recommend", params={**params, "ahp_at": -1}).json()
+    assert [a["id"] for a in body] == [a.id for a in get_attractions(db, limit=3, is_recommended=True)]
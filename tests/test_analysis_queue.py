@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import predictions
+from app.services import analysis_pool
+from app.services.feature_cache import feature_cache
+from app.services.image_analysis import cv2
+
+pytestmark = pytest.mark.skipif(cv2 is None, reason="需要 OpenCV")
+
+
+def _jpeg(value=120) -> bytes:
+    img = np.full((64, 64, 3), value, dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img)
+    assert ok
+    return buf.tobytes()
+
+
+def _forecast():
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    hours = [
+        {"time": (now + timedelta(hours=i)).isoformat(), "temp": 28, "humidity": 40, "cloud": 20, "precip": 0, "wind_speed": 3}
+        for i in range(6)
+    ]
+    return {"source": "test", "hours": hours}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ANALYSIS_WORKERS", "0")
+    monkeypatch.setattr(analysis_pool, "upload_queue", analysis_pool._UploadQueue())
+
+    async def _forecast_async(days=1):
+        return _forecast()
+
+    monkeypatch.setattr(predictions, "get_forecast_async", _forecast_async)
+    feature_cache.clear()
+    app = FastAPI()
+    app.include_router(predictions.router, prefix="/api/prediction")
+    yield TestClient(app)
+    feature_cache.clear()
+
+
+def _upload(client, data: bytes, lake_id=1):
+    return client.post(
+        "/api/prediction/upload_snapshot",
+        data={"lake_id": str(lake_id)},
+        files={"file": ("snap.jpg", data, "image/jpeg")},
+    )
+
+
+def test_upload_analyzed_off_loop_and_reported(client):
+    resp = _upload(client, _jpeg())
+    assert resp.status_code == 200
+    assert "image_analysis" in resp.json()["factors"]
+
+    stats = client.get("/api/prediction/analysis_stats").json()
+    assert stats["submitted"] == 1 and stats["queue_depth"] == 0
+    assert {"queue_wait", "decode", "analyze", "total"} <= set(stats["stages"])
+
+    # 相同内容命中特征缓存，不再进入队列
+    assert _upload(client, _jpeg()).status_code == 200
+    assert client.get("/api/prediction/analysis_stats").json()["submitted"] == 1
+
+
+def test_full_queue_returns_429_without_saving(client, monkeypatch):
+    monkeypatch.setenv("ANALYSIS_QUEUE_SIZE", "0")
+    resp = _upload(client, _jpeg(30))
+    assert resp.status_code == 429
+    assert resp.headers["retry-after"] == "1"
+    assert not os.path.exists("storage/snapshots") or not os.listdir("storage/snapshots")
+    assert client.get("/api/prediction/analysis_stats").json()["rejected"] == 1
+
+
+def test_undecodable_upload_is_400(client):
+    resp = _upload(client, b"not an image")
+    assert resp.status_code == 400
+    assert client.get("/api/prediction/analysis_stats").json()["failed"] == 1
+
+
+def _jpeg_file(tmp_path, name="snap.jpg") -> str:
+    path = tmp_path / name
+    path.write_bytes(_jpeg())
+    return str(path)
+
+
+def test_queue_capacity_counts_in_flight(monkeypatch, tmp_path):
+    monkeypatch.setenv("ANALYSIS_WORKERS", "0")
+    monkeypatch.setenv("ANALYSIS_QUEUE_SIZE", "1")
+    queue = analysis_pool._UploadQueue()
+    release = threading.Event()
+    analyze = analysis_pool.analyze_upload
+
+    def _blocked(path, submitted_at):
+        release.wait(5)
+        return analyze(path, submitted_at)
+
+    monkeypatch.setattr(analysis_pool, "analyze_upload", _blocked)
+    path = _jpeg_file(tmp_path)
+    first = queue.submit(path)
+    with pytest.raises(analysis_pool.AnalysisQueueFull):
+        queue.submit(path)
+    assert queue.stats()["queue_depth"] == 1
+    release.set()
+    analysis, timings = first.result(5)
+    assert analysis["score"] >= 0 and timings["decode"] >= 0
+    # 完成回调可能晚于 result() 返回，稍等在途计数归零
+    deadline = time.monotonic() + 5
+    while queue.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert queue.stats()["queue_depth"] == 0
+    queue.submit(path).result(5)
+
+
+def test_process_pool_decodes_from_disk(monkeypatch, tmp_path):
+    monkeypatch.setenv("ANALYSIS_WORKERS", "1")
+    analysis_pool.reset_pool()
+    try:
+        queue = analysis_pool._UploadQueue()
+        analysis, timings = queue.submit(_jpeg_file(tmp_path)).result(30)
+        assert set(analysis) == {"score", "reason", "features"}
+        assert timings["queue_wait"] >= 0
+        garbage = tmp_path / "garbage.jpg"
+        garbage.write_bytes(b"garbage")
+        with pytest.raises(analysis_pool.ImageDecodeError):
+            queue.submit(str(garbage)).result(30)
+    finally:
+        analysis_pool.reset_pool()
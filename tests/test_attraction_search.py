@@ -0,0 +1,114 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api.routes import attractions as attractions_route
+from app.db import attractions_fts, crud_attractions
+from app.db.crud_attractions import create_attraction, delete_attraction, search_attractions_page, update_attraction
+from app.db.models_attractions import Attraction
+from app.db.session import SessionLocal
+from app.schemas.attraction import AttractionCreate, AttractionUpdate
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.query(Attraction).delete()
+    session.commit()
+    attractions_fts.rebuild_attractions_fts(session)
+    yield session
+    session.query(Attraction).delete()
+    session.commit()
+    attractions_fts.rebuild_attractions_fts(session)
+    session.close()
+
+
+def _add(db, name, description="", category="景点", sort_order=0):
+    return create_attraction(db, AttractionCreate(name=name, description=description, category=category, sort_order=sort_order)).id
+
+
+def test_tokenize_and_match():
+    assert attractions_fts.tokenize("盐湖 Salt湖") == "盐 湖 盐湖 salt 湖"
+    assert attractions_fts.build_match("天空之境") == '"天空" AND "空之" AND "之境"'
+    assert attractions_fts.build_match("湖") == '"湖"'
+    assert attractions_fts.build_match('Sky"') == '"sky"*'
+    assert attractions_fts.build_match("！？") is None
+
+
+def test_ranked_paginated_search(db):
+    in_name = _add(db, "盐湖湿地公园", "湿地与候鸟")
+    in_desc = _add(db, "落日红堤", "可以远眺盐湖的堤坝")
+    _add(db, "天空之境", "倒影如镜")
+    for i in range(12):
+        _add(db, f"观测点{i}", "位于盐湖东岸")
+
+    items, total = search_attractions_page(db, "盐湖", skip=0, limit=5)
+    assert total == 14
+    assert items[0].id == in_name
+    pages = [search_attractions_page(db, "盐湖", skip=s, limit=5)[0] for s in (0, 5, 10)]
+    ids = [a.id for page in pages for a in page]
+    assert len(ids) == 14 == len(set(ids)) and in_desc in ids
+    assert search_attractions_page(db, "盐湖", skip=20, limit=5) == ([], 14)
+
+    # 单字与中英文混合
+    assert {a.name for a in search_attractions_page(db, "境", limit=50)[0]} == {"天空之境"}
+    assert search_attractions_page(db, "不存在的词", limit=5) == ([], 0)
+
+
+def test_index_follows_update_and_delete(db):
+    aid = _add(db, "项链池", "串珠般的盐池")
+    update_attraction(db, aid, AttractionUpdate(name="硝花池"))
+    assert search_attractions_page(db, "项链")[1] == 0
+    assert [a.id for a in search_attractions_page(db, "硝花")[0]] == [aid]
+
+    update_attraction(db, aid, AttractionUpdate(category="Photo"))
+    assert [a.id for a in search_attractions_page(db, "pho")[0]] == [aid]
+
+    delete_attraction(db, aid)
+    assert search_attractions_page(db, "硝花") == ([], 0)
+    assert db.execute(text("SELECT count(*) FROM attractions_fts")).scalar() == 0
+
+
+def test_like_fallback_when_fts_unavailable(db, monkeypatch):
+    _add(db, "盐湖博物馆", "科普")
+    _add(db, "芦苇荡", "靠近盐湖")
+    monkeypatch.setattr(crud_attractions, "fts_available", lambda _db: False)
+    items, total = search_attractions_page(db, "盐湖", limit=1)
+    assert total == 2 and len(items) == 1
+
+
+def test_list_route_reports_real_total(db):
+    for i in range(7):
+        _add(db, f"色彩之境{i}")
+    app = FastAPI()
+    app.include_router(attractions_route.router, prefix="/api")
+    client = TestClient(app)
+    body = client.get("/api/attractions", params={"keyword": "色彩", "page": 2, "page_size": 5}).json()
+    assert body["total"] == 7 and len(body["items"]) == 2 and body["page"] == 2
+
+
+def test_missing_index_table_leaves_caller_session_alone(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.session import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'no_fts.db'}")
+    Base.metadata.create_all(bind=engine)
+    # 未执行升级（或 SQLite 不支持 FTS5）：增删改照常提交，搜索退回 LIKE
+    session = sessionmaker(bind=engine)()
+    aid = create_attraction(session, AttractionCreate(name="盐湖博物馆")).id
+    update_attraction(session, aid, AttractionUpdate(description="科普展馆"))
+    session.close()
+
+    session = sessionmaker(bind=engine)()
+    assert session.get(Attraction, aid).description == "科普展馆"
+    assert not attractions_fts.available(session)
+    assert [a.id for a in search_attractions_page(session, "盐湖")[0]] == [aid]
+
+    # 升级建表时从现有数据全量构建，之后走全文索引
+    assert attractions_fts.ensure_fts_table(engine)
+    assert attractions_fts.available(session)
+    assert attractions_fts.search_ids(session, attractions_fts.build_match("博物"), 0, 10) == ([aid], 1)
+    session.close()
+    engine.dispose()
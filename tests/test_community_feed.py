@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import community
+from app.db.models_community import CommunityPost
+from app.db.session import SessionLocal
+from app.services.community_feed import LikeCounter, TrendingCache
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.query(CommunityPost).delete()
+    session.commit()
+    yield session
+    session.query(CommunityPost).delete()
+    session.commit()
+    session.close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(community, "like_counter", LikeCounter(interval=60))
+    monkeypatch.setattr(community, "trending_cache", TrendingCache())
+    app = FastAPI()
+    app.include_router(community.router, prefix="/api/community")
+    return TestClient(app)
+
+
+def _post(db, created_at=None, likes=0):
+    post = CommunityPost(image_url="/static/community/x.jpg", caption="c", author_name="a", likes=likes, created_at=created_at)
+    db.add(post)
+    db.commit()
+    return post.id
+
+
+def test_keyset_pagination_visits_every_post_once(db, client):
+    same = datetime(2026, 5, 1, 12, 0, 0)
+    ids = [_post(db, same) for _ in range(4)]
+    ids += [_post(db, same - timedelta(hours=i)) for i in range(1, 4)]
+    ids += [_post(db) for _ in range(3)]  # 服务器默认时间（CURRENT_TIMESTAMP 文本格式不同）
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        resp = client.get("/api/community/posts", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        seen += [p["id"] for p in resp.json()]
+        pages += 1
+        cursor = resp.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(ids) and len(seen) == len(ids)
+    assert pages == 4
+    # 同一时间内按 id 倒序
+    same_ids = [i for i in seen if i in ids[:4]]
+    assert same_ids == sorted(ids[:4], reverse=True)
+
+    assert client.get("/api/community/posts", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_buffered_likes_flush_in_one_batch(db, client):
+    pid = _post(db)
+    counts = [client.post(f"/api/community/posts/{pid}/like").json()["likes"] for _ in range(25)]
+    assert counts == list(range(1, 26))
+    assert db.get(CommunityPost, pid).likes == 0
+    assert client.get("/api/community/posts").json()[0]["likes"] == 25
+
+    assert community.like_counter.flush() == 25
+    db.expire_all()
+    assert db.get(CommunityPost, pid).likes == 25
+    assert community.like_counter.pending(pid) == 0
+    assert client.post("/api/community/posts/999999/like").status_code == 404
+
+
+def test_unbuffered_likes_are_atomic(db, client, monkeypatch):
+    monkeypatch.setattr(community, "like_counter", LikeCounter(interval=0))
+    pid = _post(db)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: client.post(f"/api/community/posts/{pid}/like").json()["likes"], range(40)))
+    assert sorted(results) == list(range(1, 41))
+    db.expire_all()
+    assert db.get(CommunityPost, pid).likes == 40
+    assert client.post("/api/community/posts/999999/like").status_code == 404
+
+
+def test_trending_is_cached_and_ranked(db, client, monkeypatch):
+    now = datetime.utcnow()
+    fresh = _post(db, now - timedelta(hours=1), likes=10)
+    old_popular = _post(db, now - timedelta(days=3), likes=50)
+    _post(db, now - timedelta(days=30), likes=1000)  # 超出时间窗口
+    quiet = _post(db, now - timedelta(hours=2), likes=0)
+
+    body = client.get("/api/community/posts/trending").json()
+    assert [p["id"] for p in body] == [fresh, old_popular, quiet]
+
+    # 缓存有效期内不重算；过期后反映新的点赞
+    db.get(CommunityPost, quiet).likes = 500
+    db.commit()
+    assert [p["id"] for p in client.get("/api/community/posts/trending").json()][0] == fresh
+    monkeypatch.setenv("TRENDING_TTL", "0")
+    assert [p["id"] for p in client.get("/api/community/posts/trending", params={"limit": 1}).json()] == [quiet]
+
+
+def test_trending_likes_do_not_go_backwards_after_flush(db, client):
+    pid = _post(db, datetime.utcnow() - timedelta(hours=1), likes=3)
+    assert client.get("/api/community/posts/trending").json()[0]["likes"] == 3
+    for _ in range(4):
+        client.post(f"/api/community/posts/{pid}/like")
+    assert client.get("/api/community/posts/trending").json()[0]["likes"] == 7
+    # 刷新写库后缓存榜单里的帖子仍是旧点赞数，返回值取库中最新值
+    community.like_counter.flush()
+    assert client.get("/api/community/posts/trending").json()[0]["likes"] == 7
+
+
+def test_buffered_likes_count_exactly_during_flushes(db, client, monkeypatch):
+    counter = LikeCounter(interval=0.001, max_pending=3)
+    monkeypatch.setattr(community, "like_counter", counter)
+    pid = _post(db)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: client.post(f"/api/community/posts/{pid}/like").json()["likes"], range(60)))
+    counter.stop()
+    assert sorted(results) == list(range(1, 61))
+    db.expire_all()
+    assert db.get(CommunityPost, pid).likes == 60
+
+
+def test_like_reads_do_not_wait_for_the_flush_lock(db, client):
+    pid = _post(db, likes=5)
+    counter = community.like_counter
+    counter.add(pid)
+    # 读请求不应排在正在执行的批量 UPDATE 之后
+    with ThreadPoolExecutor(1) as pool, counter._flush_lock:
+        assert pool.submit(lambda: client.post(f"/api/community/posts/{pid}/like").json()["likes"]).result(timeout=5) == 7
+        assert pool.submit(lambda: client.get("/api/community/posts/trending").json()[0]["likes"]).result(timeout=5) == 7
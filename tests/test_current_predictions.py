@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from app.db.crud import clear_predictions, get_latest_predictions, save_predictions
+from app.db.models import CurrentPrediction, Prediction
+from app.db.session import SessionLocal
+from app.schemas.prediction import LakePrediction, TimeWindow
+
+
+def _pred(lake_id, score, updated_at):
+    return LakePrediction(
+        lake_id=lake_id,
+        lake_name=f"{lake_id}号盐湖",
+        score=score,
+        best_time=TimeWindow(start="2026-08-01T10:00:00", end="2026-08-01T12:00:00"),
+        updated_at=updated_at,
+    )
+
+
+def test_refresh_overwrites_current_and_archives_history():
+    db = SessionLocal()
+    try:
+        clear_predictions(db)
+        ts = datetime(2026, 8, 1, 9).isoformat()
+        save_predictions(db, [_pred(1, 70, ts), _pred(2, 60, ts)])
+        # 同一时间戳再次刷新：旧实现会对同一湖区返回两条
+        save_predictions(db, [_pred(1, 85, ts), _pred(2, 65, ts), _pred(3, 50, ts)])
+
+        latest = get_latest_predictions(db)
+        assert [(p.lake_id, p.score) for p in latest] == [(1, 85), (2, 65), (3, 50)]
+        assert db.query(Prediction).count() == 5
+        assert db.query(CurrentPrediction).count() == 3
+
+        # 下线的湖区不再出现在当前预测中
+        save_predictions(db, [_pred(1, 80, ts), _pred(3, 55, ts)])
+        assert [(p.lake_id, p.score) for p in get_latest_predictions(db)] == [(1, 80), (3, 55)]
+        assert db.query(Prediction).count() == 7
+
+        assert clear_predictions(db) == 7
+        assert get_latest_predictions(db) == []
+    finally:
+        db.close()
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.crud_realtime import get_daily_average_score, get_latest_realtime_index_record, save_realtime_index, save_realtime_indices
+from app.db.crud_sensor import get_latest_sensor_reading, save_sensor_reading, save_sensor_readings, sensor_row
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal
+
+
+def test_latest_tables_follow_writes_and_ignore_late_rows():
+    t0 = datetime(2026, 8, 1, 12, 0)
+    db = SessionLocal()
+    try:
+        save_realtime_indices(db, [
+            {"lake_id": 701, "lake_name": "701号盐湖", "score": 60, "image_path": None, "captured_at": t0},
+            {"lake_id": 701, "lake_name": "701号盐湖", "score": 80, "image_path": None, "captured_at": t0 + timedelta(minutes=5)},
+        ])
+        latest = get_latest_realtime_index_record(db, 701)
+        assert latest.score == 80 and latest.record_id is not None
+        # 乱序补写的更早记录不覆盖最新值
+        save_realtime_index(db, 701, "701号盐湖", 10, None, t0 - timedelta(hours=1))
+        assert get_latest_realtime_index_record(db, 701).score == 80
+        save_realtime_index(db, 701, "701号盐湖", 90, None, t0 + timedelta(hours=1))
+        assert get_latest_realtime_index_record(db, 701).score == 90
+        assert get_daily_average_score(db, 701, datetime(2026, 8, 1), datetime(2026, 8, 2)) == 60.0
+
+        save_sensor_readings(db, [sensor_row(702, t0, 20, 30, None, None, None, None, None, None)])
+        save_sensor_reading(db, 702, t0 - timedelta(days=1), 1, 1, None, None, None, None, None, None)
+        rec = get_latest_sensor_reading(db, 702)
+        assert (rec.air_temp, rec.captured_at) == (20, t0) and rec.reading_id is not None
+    finally:
+        db.close()
+
+
+def test_upgrade_existing_sqlite_file(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        # 升级前的表结构：无复合索引、无物化表
+        conn.execute(text("CREATE TABLE realtime_indices (id INTEGER PRIMARY KEY, lake_id INTEGER, lake_name VARCHAR, score INTEGER, captured_at DATETIME, image_path VARCHAR)"))
+        conn.execute(text("CREATE INDEX ix_realtime_indices_lake_id ON realtime_indices (lake_id)"))
+        conn.execute(text(
+            "CREATE TABLE sensor_readings (id INTEGER PRIMARY KEY, lake_id INTEGER, captured_at DATETIME, air_temp INTEGER, humidity INTEGER, "
+            "wind_speed INTEGER, water_temp INTEGER, salinity INTEGER, dissolved_oxygen INTEGER, tds INTEGER, turbidity INTEGER)"
+        ))
+        conn.execute(text(
+            "INSERT INTO realtime_indices (lake_id, lake_name, score, captured_at) VALUES "
+            "(1, 'a', 50, '2026-08-01 10:00:00'), (1, 'a', 70, '2026-08-01 11:00:00'), (2, 'b', 40, '2026-08-01 09:00:00')"
+        ))
+
+    summary = upgrade(engine)
+    assert "ix_realtime_indices_lake_captured" in summary["indexes"]
+    assert "ix_sensor_readings_lake_captured" in summary["indexes"]
+    assert summary["backfilled"]["realtime_indices_latest"] == 2
+    names = {ix["name"] for ix in inspect(engine).get_indexes("realtime_indices")}
+    assert "ix_realtime_indices_lake_captured" in names
+
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT lake_id, score FROM realtime_indices_latest")).all())
+        assert rows == {1: 70, 2: 40}
+        plan = " ".join(str(r[-1]) for r in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT avg(score) FROM realtime_indices WHERE lake_id = 1 "
+            "AND captured_at >= '2026-08-01' AND captured_at < '2026-08-02'"
+        )))
+        assert "COVERING INDEX ix_realtime_indices_lake_captured" in plan
+
+    # 幂等：再次执行无变更
+    again = upgrade(engine)
+    assert again == {"tables": [], "indexes": [], "backfilled": {}}
+
+
+def test_upgrade_migrates_subscription_csv(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/subs.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE subscriptions (id INTEGER PRIMARY KEY, openid VARCHAR UNIQUE, lake_ids VARCHAR, threshold INTEGER, created_at DATETIME)"))
+        conn.execute(text("INSERT INTO subscriptions (openid, lake_ids, threshold) VALUES ('a', '1,2,2', 80), ('b', '', NULL), ('c', '3,x', NULL)"))
+
+    summary = upgrade(engine)
+    assert summary["backfilled"]["subscription_lakes"] == 3
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT s.openid, l.lake_id, l.threshold FROM subscription_lakes l JOIN subscriptions s ON s.id = l.subscription_id ORDER BY l.id"
+        )).all()
+    assert [tuple(r) for r in rows] == [("a", 1, 80), ("a", 2, 80), ("c", 3, 90)]
+    assert "subscription_lakes" not in upgrade(engine)["backfilled"]
@@ -0,0 +1,39 @@
+from app.services import realtime_index
+from app.services.feature_cache import FeatureCache, content_key, feature_cache, file_key
+
+
+def test_lru_evicts_oldest():
+    cache = FeatureCache(max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # a 变为最近使用
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["entries"] == 2
+    assert content_key(b"x") == content_key(b"x") != content_key(b"y")
+
+
+def test_realtime_reuses_analysis_until_new_frame(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_analyze(path):
+        calls.append(path)
+        return {"score": 77, "reason": "stub", "features": {"lake_saturation": 0.5}}
+
+    monkeypatch.setattr(realtime_index, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(realtime_index, "cv2", object())
+    monkeypatch.setattr(realtime_index, "analyze_image_file", fake_analyze)
+    feature_cache.clear()
+
+    frame = tmp_path / "lake201_20260701_120000.jpg"
+    frame.write_bytes(b"frame-1")
+    for _ in range(3):
+        assert realtime_index.compute_and_store_realtime_index(201).score == 77
+    assert len(calls) == 1
+
+    newer = tmp_path / "lake201_20260701_120100.jpg"
+    newer.write_bytes(b"frame-2")
+    realtime_index.compute_and_store_realtime_index(201)
+    assert calls == [str(frame), str(newer)]
+    assert file_key(str(newer)) is not None
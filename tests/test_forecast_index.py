@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from app.schemas.prediction import LakePrediction, TimeWindow
+from app.services.forecast_index import HourlyForecast, forecast_index
+from app.services.prediction_model import attach_explanations
+
+
+def _hours(t0, n, fmt=lambda t: t.isoformat()):
+    return [{"time": fmt(t0 + timedelta(hours=i)), "temp": 20 + i, "humidity": 40, "cloud": 10, "precip": 0, "windSpeed": 3} for i in range(n)]
+
+
+def test_nearest_hour_across_formats():
+    t0 = datetime(2026, 7, 1, 0)
+    index = HourlyForecast(_hours(t0, 24))
+    assert index.nearest_index("2026-07-01T05:00:00") == 5
+    assert index.nearest_index("2026-07-01T05:29") == 5
+    assert index.nearest_index("2026-07-01T05:31") == 6
+    assert index.nearest_index(datetime(2026, 6, 1)) == 0
+    assert index.nearest_index("2026-08-01T00:00") == 23
+    assert index.nearest_index("not-a-time") is None
+    assert index.current_index(datetime(2026, 7, 1, 7, 59)) == 7
+    assert index.current_index(datetime(2026, 6, 30)) == 0
+    # 无法解析的时间沿用原回退：中位窗口
+    assert index.nearest_pair("???")[0]["temp"] == 20 + 12
+
+
+def test_index_memoized_per_forecast():
+    t0 = datetime(2026, 7, 1, 0)
+    fc = {"hours": _hours(t0, 24)}
+    assert forecast_index(fc) is forecast_index(fc)
+    assert forecast_index({"hours": _hours(t0, 24)}) is not forecast_index(fc)
+
+
+def test_attach_explanations_uses_nearest_hour():
+    t0 = datetime(2026, 7, 1, 0)
+    # 预报与预测时间格式不同（分钟精度），旧实现无法精确匹配而退回中位小时
+    fc = {"hours": _hours(t0, 24, fmt=lambda t: t.strftime("%Y-%m-%dT%H:%M"))}
+    pred = LakePrediction(
+        lake_id=1, lake_name="1号盐湖", score=80,
+        best_time=TimeWindow(start="2026-07-01T03:00:00", end="2026-07-01T05:00:00"),
+        updated_at="2026-07-01T00:00:00",
+    )
+    explained = attach_explanations([pred], fc)[0]
+    expected = attach_explanations([pred], {"hours": [fc["hours"][3], fc["hours"][4]]})[0]
+    assert explained.factors == expected.factors
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import attractions as attractions_route
+from app.db.crud_attractions import create_attraction, update_attraction
+from app.db.models_attractions import Attraction
+from app.db.session import SessionLocal
+from app.schemas.attraction import AttractionCreate, AttractionUpdate
+from app.services.geo_index import GeoGridIndex, format_distance, haversine_km, nearby_index
+
+
+def _brute(points, lat, lon, radius, limit):
+    ids = np.array([p[0] for p in points])
+    d = haversine_km(lat, lon, np.array([p[1] for p in points]), np.array([p[2] for p in points]))
+    order = np.argsort(d, kind="stable")
+    return [(int(ids[i]), float(d[i])) for i in order if d[i] <= radius][:limit]
+
+
+def test_haversine_and_format():
+    assert abs(float(haversine_km(39.9042, 116.4074, 31.2304, 121.4737)) - 1067) < 5
+    assert format_distance(0.85) == "850 m" and format_distance(2.46) == "2.5 km"
+
+
+def test_grid_matches_brute_force():
+    rng = np.random.default_rng(1)
+    points = [(i, 37.0 + rng.random(), 111.0 + rng.random()) for i in range(20000)]
+    index = GeoGridIndex(points + [(-1, 0.0, 0.0)])
+    assert len(index) == 20000
+    for _ in range(50):
+        lat, lon = 37.0 + rng.random(), 111.0 + rng.random()
+        radius = float(rng.choice([0.3, 2.0, 8.0, 40.0, 300.0]))
+        got = index.nearest(lat, lon, radius, 10)
+        want = _brute(points, lat, lon, radius, 10)
+        assert [g[0] for g in got] == [w[0] for w in want]
+        assert np.allclose([g[1] for g in got], [w[1] for w in want])
+
+
+def test_grid_handles_antimeridian_and_empty():
+    index = GeoGridIndex([(1, 0.5, 179.99), (2, 0.5, -179.99), (3, 10.0, 0.0)])
+    assert [i for i, _ in index.nearest(0.5, 179.995, 5, 5)] == [1, 2]
+    assert index.nearest(50.0, 50.0, 1, 5) == []
+    assert GeoGridIndex([]).nearest(0, 0, 10, 5) == []
+
+
+@pytest.fixture
+def client():
+    db = SessionLocal()
+    db.query(Attraction).delete()
+    db.commit()
+    nearby_index.invalidate()
+    app = FastAPI()
+    app.include_router(attractions_route.router, prefix="/api")
+    yield TestClient(app), db
+    db.query(Attraction).delete()
+    db.commit()
+    db.close()
+
+
+def test_nearby_route_uses_live_coordinates(client):
+    client, db = client
+    near = create_attraction(db, AttractionCreate(name="落日红堤", latitude=37.0010, longitude=111.0, distance="2.5 km")).id
+    far = create_attraction(db, AttractionCreate(name="天空之境", latitude=37.0300, longitude=111.0)).id
+    create_attraction(db, AttractionCreate(name="无坐标", latitude=None, longitude=None))
+
+    body = client.get("/api/attractions/nearby", params={"lat": 37.0, "lon": 111.0, "radius": 5}).json()
+    assert [a["id"] for a in body] == [near, far]
+    assert body[0]["distance"] == "111 m" and body[1]["distance"] == "3.3 km"
+    assert body[0]["distance_km"] == pytest.approx(0.111, abs=0.001)
+
+    # 坐标更新后索引随版本号重建
+    update_attraction(db, far, AttractionUpdate(latitude=37.0001))
+    body = client.get("/api/attractions/nearby", params={"lat": 37.0, "lon": 111.0, "radius": 0.05, "limit": 1}).json()
+    assert [a["id"] for a in body] == [far]
+    assert client.get("/api/attractions/nearby", params={"lat": 95, "lon": 0}).status_code == 422
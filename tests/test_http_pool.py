@@ -0,0 +1,66 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.utils import http_pool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    peers = set()
+
+    def do_GET(self):
+        self.peers.add(self.client_address)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pooled_session_reuses_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/capture"
+    try:
+        http_pool.close_pool()
+        for _ in range(5):
+            assert http_pool.get_session().get(url, timeout=5).text == "ok"
+        assert len(_Handler.peers) == 1
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(http_pool.get_session()))
+        t.start()
+        t.join()
+        assert other[0] is not http_pool.get_session()
+        assert other[0].get_adapter(url) is http_pool.get_session().get_adapter(url)
+    finally:
+        server.shutdown()
+        http_pool.close_pool()
+
+
+def test_close_pool_resets_sessions_of_every_thread():
+    http_pool.close_pool()
+    sessions = []
+    ready, closed = threading.Event(), threading.Event()
+
+    def worker():
+        sessions.append(http_pool.get_session())
+        ready.set()
+        closed.wait(5)
+        sessions.append(http_pool.get_session())
+
+    t = threading.Thread(target=worker)
+    t.start()
+    ready.wait(5)
+    old_adapter = sessions[0].get_adapter("http://example.com")
+    http_pool.close_pool()
+    closed.set()
+    t.join(5)
+    try:
+        assert sessions[1] is not sessions[0]
+        assert sessions[1].get_adapter("http://example.com") is not old_adapter
+    finally:
+        http_pool.close_pool()
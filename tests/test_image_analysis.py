@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from app.services.image_analysis import compute_color_features, compute_color_features_fast, score_from_features
+
+cv2 = pytest.importorskip("cv2")
+
+
+def test_fast_features_match_exact_without_downscale():
+    img = np.random.default_rng(5).integers(0, 255, size=(240, 320, 3), dtype=np.uint8)
+    assert compute_color_features_fast(img, target_pixels=0) == compute_color_features(img, fast=False)
+
+
+def test_fast_features_downscaled_close_to_exact():
+    hsv = np.zeros((720, 1280, 3), dtype=np.uint8)
+    hsv[:252] = (105, 140, 210)  # 蓝天
+    hsv[252:, :640] = (160, 150, 180)  # 粉色湖面
+    hsv[252:, 640:] = (5, 120, 150)  # 红色湖面
+    noise = np.random.default_rng(2).integers(-3, 4, size=hsv.shape)
+    hsv = np.clip(hsv.astype(np.int16) + noise, 0, 179).astype(np.uint8)
+    img = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+    exact = compute_color_features(img, fast=False)
+    fast = compute_color_features(img, fast=True)
+    assert set(fast) == set(exact)
+    assert max(abs(exact[k] - fast[k]) for k in exact) < 0.05
+    assert abs(score_from_features(exact) - score_from_features(fast)) <= 2
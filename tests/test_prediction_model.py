@@ -0,0 +1,72 @@
+import random
+
+from app.services.prediction_model import (
+    _score_hour,
+    attach_explanations,
+    build_forecast_matrix,
+    deep_weather_score,
+    deep_weather_scores,
+    predict_for_lakes,
+    score_hours,
+)
+
+
+def _random_hours(n, seed=3):
+    rng = random.Random(seed)
+    return [
+        {
+            "time": f"2026-06-{1 + i // 24:02d}T{i % 24:02d}:00+08:00",
+            "temp": round(rng.uniform(-10, 40), 1),
+            "humidity": rng.randint(0, 100),
+            "uvIndex": rng.randint(0, 12),
+            "windSpeed": round(rng.uniform(0, 20), 1),
+            "cloud": rng.randint(0, 100),
+            "precip": round(rng.uniform(0, 2), 1),
+        }
+        for i in range(n)
+    ]
+
+
+def test_vectorized_scores_match_scalar():
+    hours = _random_hours(500) + [{}]
+    m = build_forecast_matrix(hours)
+    assert score_hours(m).tolist() == [_score_hour(h) for h in hours]
+    assert deep_weather_scores(m).tolist() == [deep_weather_score(h) for h in hours]
+
+
+def test_predict_for_lakes_single_hour():
+    lakes = [{"id": 1, "name": "1号盐湖"}, {"id": 2, "name": "2号盐湖"}]
+    preds = predict_for_lakes(lakes, {"hours": _random_hours(1)})
+    assert [p.lake_id for p in preds] == [1, 2]
+    assert all(30 <= p.score <= 100 for p in preds)
+
+
+def test_top_k_windows_do_not_overlap():
+    hours = _random_hours(168)
+    preds = predict_for_lakes([{"id": 7, "name": "7号盐湖"}], {"hours": hours}, hours=168, window_hours=3, top_k=4)
+    windows = preds[0].windows
+    assert 1 <= len(windows) <= 4
+    assert preds[0].best_time.start == windows[0].start
+    index = {h["time"]: i for i, h in enumerate(hours)}
+    starts = sorted({index[w.start] for w in windows})
+    assert all(b - a >= 3 for a, b in zip(starts, starts[1:]))
+    assert all(index[w.end] - index[w.start] == 2 for w in windows)
+
+
+def test_shifted_windows_stay_disjoint_and_sorted():
+    # 短视野 + 多个湖区：时间偏移在边界处截断，容易把候选窗口挤到一起
+    hours = _random_hours(9, seed=5)
+    lakes = [{"id": i, "name": f"{i}号盐湖"} for i in range(1, 60)]
+    index = {h["time"]: i for i, h in enumerate(hours)}
+    for p in predict_for_lakes(lakes, {"hours": hours}, hours=9, window_hours=2, top_k=3):
+        starts = [index[w.start] for w in p.windows]
+        assert all(abs(a - b) >= 2 for i, a in enumerate(starts) for b in starts[i + 1:])
+        assert [w.score for w in p.windows] == sorted((w.score for w in p.windows), reverse=True)
+        assert (p.best_time.start, p.score) == (p.windows[0].start, p.windows[0].score)
+
+
+def test_explanations_keep_windows():
+    forecast = {"hours": _random_hours(48)}
+    preds = predict_for_lakes([{"id": 3, "name": "3号盐湖"}], forecast, hours=48, top_k=3)
+    enriched = attach_explanations(preds, forecast)
+    assert enriched[0].windows == preds[0].windows and enriched[0].windows
@@ -0,0 +1,111 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import predictions
+from app.schemas.prediction import LakePrediction, TimeWindow
+from app.services import prediction_snapshot
+
+
+def _forecast():
+    t0 = datetime(2026, 8, 1, 0)
+    hours = [
+        {"time": (t0 + timedelta(hours=i)).isoformat(), "temp": 28, "humidity": 40, "cloud": 20, "precip": 0, "wind_speed": 3}
+        for i in range(48)
+    ]
+    return {"source": "test", "hours": hours}
+
+
+def _preds(scores):
+    return [
+        LakePrediction(
+            lake_id=i + 1,
+            lake_name=f"{i + 1}号盐湖",
+            score=s,
+            best_time=TimeWindow(start="2026-08-01T10:00:00", end="2026-08-01T12:00:00"),
+            updated_at="2026-08-01T09:00:00",
+        )
+        for i, s in enumerate(scores)
+    ]
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(predictions.router, prefix="/api/prediction")
+    return TestClient(app)
+
+
+def test_routes_serve_snapshot_with_etag(monkeypatch):
+    lakes = [{"id": 1, "name": "1号盐湖"}, {"id": 2, "name": "2号盐湖"}]
+    prediction_snapshot.publish_snapshot(_preds([70, 88]), lakes, _forecast(), lakes)
+
+    # 热路径不应访问数据库
+    def _no_db():
+        raise AssertionError("hot path hit the database")
+
+    monkeypatch.setattr(predictions, "_load_predictions_and_lakes", _no_db)
+    client = _client()
+
+    best = client.get("/api/prediction/today/best")
+    assert best.status_code == 200
+    assert best.json()["best"]["lake_id"] == 2
+    etag = best.headers["etag"]
+    assert client.get("/api/prediction/today/best", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/prediction/today/best", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    today = client.get("/api/prediction/today")
+    body = today.json()
+    assert [p["score"] for p in body] == [70, 88]
+    assert body[0]["reason"]
+
+    # 新快照原子替换后 ETag 变化
+    prediction_snapshot.publish_snapshot(_preds([95, 60]), lakes, _forecast(), lakes)
+    fresh = client.get("/api/prediction/today/best", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert json.loads(fresh.content)["best"]["lake_id"] == 1
+    prediction_snapshot.clear_snapshot()
+
+
+def test_snapshot_expires_and_partial_db_falls_back(monkeypatch):
+    lakes = [{"id": 1, "name": "1号盐湖"}, {"id": 2, "name": "2号盐湖"}]
+    snap = prediction_snapshot.publish_snapshot(_preds([70]), lakes, _forecast(), lakes)
+    # 库中预测不全时 best 按全部湖区实时计算，today 仍返回库中数据
+    assert len(json.loads(snap.best_body)["all"]) == 2
+    assert len(json.loads(snap.today_body)) == 1
+    assert prediction_snapshot.get_snapshot() is snap
+
+    monkeypatch.setenv("PREDICTION_SNAPSHOT_TTL", "-1")
+    assert prediction_snapshot.get_snapshot() is None
+    prediction_snapshot.clear_snapshot()
+
+
+def test_missing_snapshot_is_rebuilt_once_under_concurrency(monkeypatch):
+    import asyncio
+    import time
+
+    lakes = [{"id": 1, "name": "1号盐湖"}]
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return _preds([80]), lakes
+
+    async def forecast(days=2):
+        return _forecast()
+
+    monkeypatch.setattr(predictions, "_load_predictions_and_lakes", load)
+    monkeypatch.setattr(predictions, "get_forecast_async", forecast)
+    prediction_snapshot.clear_snapshot()
+
+    async def burst():
+        return await asyncio.gather(*(predictions._current_snapshot() for _ in range(10)))
+
+    try:
+        snaps = asyncio.run(burst())
+        assert len(calls) == 1
+        assert all(s is snaps[0] for s in snaps)
+    finally:
+        prediction_snapshot.clear_snapshot()
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.db.crud_push import enqueue_push_messages
+from app.db.models import PushMessage
+from app.db.session import SessionLocal
+from app.services.push_queue import HttpProvider, PushWorkerPool, TokenBucket
+
+
+class _StubPush(BaseHTTPRequestHandler):
+    """本地推送网关桩：记录收到的批次，fail_next 次请求返回 500。"""
+
+    protocol_version = "HTTP/1.1"
+    batches = []
+    fail_next = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        if cls.fail_next > 0:
+            cls.fail_next -= 1
+            self.send_response(500)
+        else:
+            cls.batches.append(body["messages"])
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_push():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPush)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _StubPush.batches = []
+    _StubPush.fail_next = 0
+    db = SessionLocal()
+    db.query(PushMessage).delete()
+    db.commit()
+    db.close()
+    yield f"http://127.0.0.1:{server.server_port}/push", _StubPush
+    server.shutdown()
+
+
+def _messages(n, window="w1"):
+    return [{"openid": f"u{i}", "lake_id": 1, "window": window, "title": "t", "body": "b"} for i in range(n)]
+
+
+def test_batches_and_dedup(stub_push):
+    url, stub = stub_push
+    db = SessionLocal()
+    try:
+        assert enqueue_push_messages(db, _messages(25)) == 25
+        assert enqueue_push_messages(db, _messages(30)) == 5  # 前 25 条重复
+    finally:
+        db.close()
+    pool = PushWorkerPool(provider=HttpProvider(url), workers=1, batch_size=10, rate_per_sec=1000)
+    while pool.process_once():
+        pass
+    assert [len(b) for b in stub.batches] == [10, 10, 10]
+    assert pool.stats()["queue"] == {"sent": 30}
+
+
+def test_failed_batch_is_retried_then_dead(stub_push, monkeypatch):
+    url, stub = stub_push
+    monkeypatch.setenv("PUSH_RETRY_BASE", "0")
+    monkeypatch.setenv("PUSH_MAX_ATTEMPTS", "2")
+    db = SessionLocal()
+    try:
+        enqueue_push_messages(db, _messages(3, window="retry"))
+    finally:
+        db.close()
+    pool = PushWorkerPool(provider=HttpProvider(url), workers=1, batch_size=10, rate_per_sec=1000)
+
+    stub.fail_next = 1
+    pool.process_once()
+    assert pool.stats()["queue"] == {"pending": 3}
+    pool.process_once()
+    assert pool.stats()["queue"] == {"sent": 3}
+
+    db = SessionLocal()
+    try:
+        enqueue_push_messages(db, _messages(2, window="dead"))
+    finally:
+        db.close()
+    stub.fail_next = 2
+    pool.process_once()
+    pool.process_once()
+    assert pool.stats()["queue"] == {"sent": 3, "dead": 2}
+
+
+def test_worker_threads_drain_queue(stub_push):
+    url, stub = stub_push
+    pool = PushWorkerPool(provider=HttpProvider(url), workers=3, batch_size=5, rate_per_sec=1000, poll_interval=0.05)
+    pool.start()
+    try:
+        db = SessionLocal()
+        try:
+            enqueue_push_messages(db, _messages(40, window="threads"))
+        finally:
+            db.close()
+        pool.notify()
+        deadline = time.monotonic() + 5
+        while pool.sent < 40 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        pool.stop()
+    delivered = [m["openid"] for b in stub.batches for m in b]
+    assert sorted(delivered) == sorted(f"u{i}" for i in range(40))  # 每条恰好投递一次
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=200, burst=10)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire(10)
+    # 首批 10 个来自初始容量，其余 40 个以 200/s 补充
+    assert time.monotonic() - start >= 0.18
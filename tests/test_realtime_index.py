@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.db.models import RealtimeIndexRecord
+from app.db.session import SessionLocal
+from app.services import realtime_index
+
+cv2 = pytest.importorskip("cv2")
+
+
+def _write_snapshots(dir_path, lake_ids):
+    rng = np.random.default_rng(0)
+    for lake_id in lake_ids:
+        img = rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8)
+        cv2.imwrite(str(dir_path / f"lake{lake_id}_20260701_120000.jpg"), img)
+
+
+def test_compute_realtime_indices_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(realtime_index, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setenv("ANALYSIS_WORKERS", "2")
+    lake_ids = [101, 102, 103]
+    _write_snapshots(tmp_path, lake_ids)
+
+    db = SessionLocal()
+    before = db.query(RealtimeIndexRecord).filter(RealtimeIndexRecord.lake_id.in_(lake_ids)).count()
+    batch = realtime_index.compute_realtime_indices(lake_ids)
+    after = db.query(RealtimeIndexRecord).filter(RealtimeIndexRecord.lake_id.in_(lake_ids)).count()
+    db.close()
+    realtime_index.reset_pool()
+
+    assert [i.lake_id for i in batch] == lake_ids
+    assert after - before == 3
+    serial = [realtime_index.compute_and_store_realtime_index(l) for l in lake_ids]
+    assert [i.score for i in batch] == [i.score for i in serial]
+    assert [i.factors for i in batch] == [i.factors for i in serial]
+
+
+def _corrupt(_arg):
+    raise ValueError("corrupt jpeg")
+
+
+def test_failed_job_does_not_reset_shared_pool(monkeypatch):
+    monkeypatch.setenv("ANALYSIS_WORKERS", "2")
+    img = np.full((60, 80, 3), 128, dtype=np.uint8)
+    pool = realtime_index.get_pool()
+    try:
+        results = realtime_index._analyze_many({
+            1: (None, realtime_index.analyze_image, img),
+            2: (None, _corrupt, None),
+            3: (None, realtime_index.analyze_image, img),
+        })
+        # 单个任务失败只让该湖区回退，进程池（上传分析共用）不被关闭
+        assert realtime_index.get_pool() is pool
+        assert results[2] is None
+        assert results[1] is not None and results[1] == results[3]
+    finally:
+        realtime_index.reset_pool()
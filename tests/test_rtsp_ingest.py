@@ -0,0 +1,124 @@
+import time
+
+import numpy as np
+
+from app.capture.rtsp_ingest import CameraStream, IngestionService, cameras_from_env
+from app.services import realtime_index
+from app.services.feature_cache import feature_cache
+
+
+class FakeCapture:
+    """模拟 cv2.VideoCapture：可控制是否打开成功及可读取的帧数。"""
+
+    def __init__(self, opened=True, frames=1000):
+        self.opened = opened
+        self.remaining = frames
+        self.value = 0
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def retrieve(self):
+        self.value = (self.value + 1) % 256
+        return True, np.full((4, 4, 3), self.value, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def _wait_for(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_stream_reconnects_and_buffers_frames(monkeypatch, tmp_path):
+    monkeypatch.setenv("RTSP_BACKOFF_BASE", "0.01")
+    opens = []
+
+    def factory(url):
+        opens.append(url)
+        # 第一次打开失败，之后每次连接读若干帧后断流
+        return FakeCapture(opened=len(opens) > 1, frames=50)
+
+    stream = CameraStream(7, "rtsp://cam7", buffer_size=3, decode_interval=0,
+                          snapshot_interval=0, output_dir=str(tmp_path), capture_factory=factory)
+    stream.start()
+    try:
+        assert _wait_for(lambda: stream.reconnects >= 1 and stream.latest() is not None)
+        assert len(stream.frames()) <= 3
+        seqs = [f.seq for f in stream.frames()]
+        assert seqs == sorted(seqs)
+        # 每次连接的帧带不同的 session，用作缓存键时不会与上一次连接的帧混淆
+        first = stream.latest().session
+        assert first and _wait_for(lambda: stream.latest().session != first)
+    finally:
+        stream.stop()
+        stream.join(2)
+    assert not stream.is_alive()
+    assert len(opens) >= 2
+
+
+def test_service_latest_frame_and_max_age(monkeypatch, tmp_path):
+    service = IngestionService()
+    service.start({3: "rtsp://cam3"}, decode_interval=0, snapshot_interval=0,
+                  output_dir=str(tmp_path), capture_factory=lambda url: FakeCapture())
+    try:
+        assert _wait_for(lambda: service.latest_frame(3) is not None)
+        assert service.latest_frame(3).image.shape == (4, 4, 3)
+        assert service.latest_frame(3, max_age=-1) is None
+        assert service.latest_frame(99) is None
+        assert service.status()[3]["connected"] in (True, False)
+    finally:
+        service.stop()
+    assert service.latest_frame(3) is None
+
+
+def test_realtime_index_prefers_in_memory_frame(monkeypatch, tmp_path):
+    monkeypatch.setenv("RTSP_BACKOFF_BASE", "30")  # 断流后测试期间不再重连
+    service = IngestionService()
+    service.start({301: "rtsp://cam301"}, decode_interval=0, snapshot_interval=0,
+                  output_dir=str(tmp_path), capture_factory=lambda url: FakeCapture(frames=5))
+    calls = []
+
+    def fake_analyze(img):
+        calls.append(img.shape)
+        return {"score": 66, "reason": "frame", "features": {}}
+
+    monkeypatch.setattr(realtime_index, "ingestion_service", service)
+    monkeypatch.setattr(realtime_index, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(realtime_index, "cv2", object())
+    monkeypatch.setattr(realtime_index, "analyze_image", fake_analyze)
+    feature_cache.clear()
+    try:
+        assert _wait_for(lambda: service.latest_frame(301) is not None)
+        # 流已读完，最新帧不再变化：第二次直接命中缓存
+        assert _wait_for(lambda: not service.status()[301]["connected"])
+        for _ in range(2):
+            idx = realtime_index.compute_and_store_realtime_index(301)
+            assert idx.score == 66
+        assert calls == [(4, 4, 3)]
+        # 请求路径上不写盘：snapshot_interval=0 时没有截图，来源记录被分析的帧
+        assert idx.image_path is None and not list(tmp_path.iterdir())
+        frame = service.latest_frame(301)
+        assert idx.factors["source"]["seq"] == frame.seq and idx.factors["source"]["session"] == frame.session
+        assert idx.factors["source"]["snapshot_exact"] is False
+    finally:
+        service.stop()
+
+
+def test_cameras_from_env(monkeypatch):
+    monkeypatch.setenv("RTSP_LAKE_5", "rtsp://user:pw@10.0.0.5/stream")
+    monkeypatch.setenv("RTSP_LAKE_6", "http://10.0.0.6/snapshot.jpg")
+    cams = cameras_from_env()
+    assert cams.get(5) == "rtsp://user:pw@10.0.0.5/stream"
+    assert 6 not in cams
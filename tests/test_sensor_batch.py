@@ -0,0 +1,114 @@
+import json
+import time
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import sensors
+from app.db.crud_sensor import get_latest_sensor_reading
+from app.db.models import SensorReading
+from app.db.session import SessionLocal
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(sensors.router)
+    return TestClient(app)
+
+
+def test_batch_array_reports_row_errors(monkeypatch):
+    monkeypatch.setattr(sensors, "SENSOR_BATCH_CHUNK", 2)
+    rows = [
+        {"lake_id": 501, "captured_at": "2026-07-01T10:00:00", "humidity": 40.7},
+        {"lake_id": "abc"},
+        {"lake_id": 501, "captured_at": "2026-07-01T10:05:00", "air_temp": 31},
+        {"lake_id": 501, "captured_at": "not-a-time"},
+        {"lake_id": 501, "captured_at": "2026-07-01T10:10:00", "wind_speed": 3.2},
+    ]
+    resp = _client().post("/sensors/ingest/batch", json=rows)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["accepted"] == 3 and body["rejected"] == 2
+    assert [e["index"] for e in body["errors"]] == [1, 3]
+
+    db = SessionLocal()
+    try:
+        latest = get_latest_sensor_reading(db, 501)
+        assert latest.wind_speed == 3
+    finally:
+        db.close()
+
+
+def test_batch_ndjson_stream():
+    lines = [json.dumps({"lake_id": 502, "captured_at": f"2026-07-02T08:{m:02d}:00", "salinity": 25}) for m in range(5)]
+    lines.insert(2, "{broken")
+    resp = _client().post(
+        "/sensors/ingest/batch",
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    body = resp.json()
+    assert body["accepted"] == 5 and body["rejected"] == 1
+    assert body["errors"][0]["index"] == 2
+
+
+def test_batch_row_limit(monkeypatch):
+    monkeypatch.setattr(sensors, "SENSOR_BATCH_MAX_ROWS", 2)
+    resp = _client().post("/sensors/ingest/batch", json=[{"lake_id": 1}] * 3)
+    assert resp.status_code == 413
+    assert _client().post("/sensors/ingest/batch", json={"lake_id": 1}).status_code == 400
+
+
+def test_ndjson_row_limit_reports_applied_rows(monkeypatch):
+    monkeypatch.setattr(sensors, "SENSOR_BATCH_MAX_ROWS", 3)
+    monkeypatch.setattr(sensors, "SENSOR_BATCH_CHUNK", 2)
+    lines = [json.dumps({"lake_id": 503, "captured_at": f"2026-07-03T08:{m:02d}:00", "salinity": m}) for m in range(5)]
+    resp = _client().post("/sensors/ingest/batch", content="\n".join(lines), headers={"Content-Type": "application/x-ndjson"})
+    # 超出上限时不报错丢弃已写入的块，而是返回已写入行数与续传位置
+    assert resp.status_code == 200
+    assert resp.json()["accepted"] == 3 and resp.json()["truncated_at"] == 3
+
+    db = SessionLocal()
+    try:
+        assert get_latest_sensor_reading(db, 503).salinity == 2
+    finally:
+        db.close()
+
+
+def test_batch_mixes_aware_and_naive_timestamps():
+    rows = [
+        {"lake_id": 504, "captured_at": "2026-07-04T10:00:00", "humidity": 40},
+        {"lake_id": 504, "captured_at": "2026-07-04T03:30:00Z", "humidity": 41},
+        {"lake_id": 504, "captured_at": "2026-07-04T12:00:00+08:00", "humidity": 42},
+    ]
+    body = _client().post("/sensors/ingest/batch", json=rows).json()
+    assert body["accepted"] == 3 and body["rejected"] == 0 and body["truncated_at"] is None
+
+
+@pytest.fixture
+def non_utc_host(monkeypatch):
+    # 模拟非 UTC 时区的服务器，本地时间与 UTC 不同时才能区分两种换算
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_aware_timestamps_are_stored_as_utc(non_utc_host):
+    rows = [
+        {"lake_id": 505, "captured_at": "2026-07-05T09:00:00", "humidity": 50},
+        # 东八区 12:00 即 UTC 04:00，早于上一行，不应成为最新值
+        {"lake_id": 505, "captured_at": "2026-07-05T12:00:00+08:00", "humidity": 51},
+    ]
+    assert _client().post("/sensors/ingest/batch", json=rows).json()["accepted"] == 2
+    db = SessionLocal()
+    try:
+        latest = get_latest_sensor_reading(db, 505)
+        assert latest.humidity == 50
+        assert latest.captured_at.replace(tzinfo=None) == datetime(2026, 7, 5, 9, 0)
+        assert db.query(SensorReading.captured_at).filter(SensorReading.lake_id == 505, SensorReading.humidity == 51).scalar() == datetime(2026, 7, 5, 4, 0)
+    finally:
+        db.close()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import sensors
+from app.db.crud_sensor import (
+    compact_sensor_data,
+    rebuild_sensor_rollups,
+    save_sensor_reading,
+    save_sensor_readings,
+    sensor_row,
+)
+from app.db.models import SensorReading, SensorRollup
+from app.db.session import SessionLocal
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(sensors.router)
+    return TestClient(app)
+
+
+def _reading(lake_id, ts, humidity, wind=None):
+    return sensor_row(lake_id, ts, None, humidity, wind, None, None, None, None, None)
+
+
+def test_rollups_accumulate_across_writes():
+    t0 = datetime(2026, 6, 1, 10, 0, 5)
+    db = SessionLocal()
+    try:
+        save_sensor_readings(db, [_reading(601, t0, 40), _reading(601, t0 + timedelta(seconds=20), 60, 3)])
+        save_sensor_reading(db, 601, t0 + timedelta(minutes=30), None, 20, None, None, None, None, None, None)
+        hour = db.query(SensorRollup).filter_by(lake_id=601, resolution="1h", metric="humidity").one()
+        assert (hour.min_value, hour.max_value, hour.sum_value, hour.count) == (20, 60, 120, 3)
+        minutes = db.query(SensorRollup).filter_by(lake_id=601, resolution="1m", metric="humidity").count()
+        assert minutes == 2
+        wind = db.query(SensorRollup).filter_by(lake_id=601, resolution="1d", metric="wind_speed").one()
+        assert wind.count == 1
+    finally:
+        db.close()
+
+
+def test_series_endpoint_reads_rollups():
+    t0 = datetime(2026, 6, 2, 0, 0, 0)
+    db = SessionLocal()
+    try:
+        save_sensor_readings(db, [_reading(602, t0 + timedelta(minutes=10 * i), 30 + i) for i in range(12)])
+    finally:
+        db.close()
+    client = _client()
+    resp = client.get("/sensors/602/series", params={"from": "2026-06-02T00:00:00", "to": "2026-06-02T02:00:00", "resolution": "1h", "metrics": "humidity"})
+    assert resp.status_code == 200
+    points = resp.json()["points"]
+    assert [p["t"] for p in points] == ["2026-06-02T00:00:00", "2026-06-02T01:00:00"]
+    assert points[0]["metrics"]["humidity"] == {"min": 30, "max": 35, "avg": 32.5, "count": 6}
+
+    # 带时区的区间换算为 UTC：东八区 08:00~09:00 即 UTC 00:00~01:00
+    local = client.get("/sensors/602/series", params={"from": "2026-06-02T08:00:00+08:00", "to": "2026-06-02T09:00:00+08:00", "resolution": "1h", "metrics": "humidity"}).json()
+    assert [p["t"] for p in local["points"]] == ["2026-06-02T00:00:00"]
+
+    # 两小时跨度自动选择分钟级
+    auto = client.get("/sensors/602/series", params={"from": "2026-06-02T00:00:00", "to": "2026-06-02T02:00:00"}).json()
+    assert auto["resolution"] == "1m" and len(auto["points"]) == 12
+    # 数月跨度自动降为天级
+    months = client.get("/sensors/602/series", params={"from": "2026-01-01T00:00:00", "to": "2026-07-01T00:00:00"}).json()
+    assert months["resolution"] == "1d" and months["points"][0]["metrics"]["humidity"]["count"] == 12
+
+    assert client.get("/sensors/602/series", params={"from": "2026-01-01T00:00:00", "to": "2026-07-01T00:00:00", "resolution": "1m"}).status_code == 400
+    assert client.get("/sensors/602/series", params={"from": "2026-06-02T00:00:00", "metrics": "bogus"}).status_code == 400
+
+
+def test_compaction_keeps_hourly_rollups_and_rebuild():
+    now = datetime(2026, 6, 30, 12, 0, 0)
+    old, recent = datetime(2026, 5, 1, 9, 15), datetime(2026, 6, 29, 9, 15)
+    db = SessionLocal()
+    try:
+        save_sensor_readings(db, [_reading(603, old, 50), _reading(603, recent, 70)])
+        result = compact_sensor_data(db, raw_retention_days=7, minute_retention_days=14, now=now)
+        assert result["raw_deleted"] >= 1
+        assert db.query(SensorReading).filter_by(lake_id=603).count() == 1
+        assert db.query(SensorRollup).filter_by(lake_id=603, resolution="1m", bucket_start=old.replace(second=0)).count() == 0
+        assert db.query(SensorRollup).filter_by(lake_id=603, resolution="1h", metric="humidity").count() == 2
+
+        # 重建只覆盖仍有原始数据的日期，压缩掉的历史聚合保持不变
+        db.query(SensorRollup).filter_by(lake_id=603, resolution="1d", bucket_start=datetime(2026, 6, 29)).delete()
+        db.commit()
+        assert rebuild_sensor_rollups(db, 603) == 1
+        assert db.query(SensorRollup).filter_by(lake_id=603, resolution="1d", metric="humidity").count() == 2
+        hourly_recent = db.query(SensorRollup).filter_by(lake_id=603, resolution="1h", bucket_start=datetime(2026, 6, 29, 9)).one()
+        assert hourly_recent.count == 1
+    finally:
+        db.close()
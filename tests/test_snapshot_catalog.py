@@ -0,0 +1,35 @@
+from app.capture.snapshot_catalog import SnapshotCatalog, get_catalog, record_snapshot
+
+
+def _touch(dir_path, name):
+    p = dir_path / name
+    p.write_bytes(b"jpg")
+    return str(p)
+
+
+def test_catalog_rescan_and_record(tmp_path):
+    _touch(tmp_path, "lake1_20260701_080000.jpg")
+    _touch(tmp_path, "lake1_20260701_090000.jpg")
+    _touch(tmp_path, "lake12_20260701_100000.jpg")
+    _touch(tmp_path, "notes.txt")
+
+    catalog = get_catalog(str(tmp_path))
+    assert catalog.latest(1).name == "lake1_20260701_090000.jpg"
+    assert catalog.latest(12).captured_at.hour == 10
+    assert catalog.latest(2) is None
+
+    newer = _touch(tmp_path, "lake1_20260701_100500.jpg")
+    record_snapshot(1, newer)
+    assert catalog.latest(1).path == newer
+    # 旧帧登记不会覆盖更新的帧
+    record_snapshot(1, str(tmp_path / "lake1_20260701_070000.jpg"))
+    assert catalog.latest(1).path == newer
+
+
+def test_catalog_detects_external_writes(tmp_path):
+    catalog = SnapshotCatalog(str(tmp_path))
+    assert catalog.latest(3) is None
+    _touch(tmp_path, "lake3_20260702_120000.jpg")  # 其他进程写入，未登记
+    assert catalog.latest(3).name == "lake3_20260702_120000.jpg"
+    (tmp_path / "lake3_20260702_120000.jpg").unlink()
+    assert catalog.latest(3) is None
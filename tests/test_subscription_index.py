@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from app.db.crud_subscriptions import get_subscription_lake_ids, get_subscriptions_for_lake, upsert_subscription
+from app.db.models import PushMessage
+from app.db.session import SessionLocal
+from app.schemas.prediction import LakePrediction, TimeWindow
+from app.services.subscription_index import SubscriptionIndex, subscription_index
+from app.tasks import scheduler
+
+
+def test_upsert_replaces_lakes_and_range_query():
+    db = SessionLocal()
+    try:
+        upsert_subscription(db, "sub-a", [801, 802, 801], threshold=80)
+        upsert_subscription(db, "sub-b", [801], threshold=95)
+        sub = upsert_subscription(db, "sub-a", [802, 803], threshold=85)
+        assert get_subscription_lake_ids(db, sub.id) == [802, 803]
+        assert {s.openid for s in get_subscriptions_for_lake(db, 801)} == {"sub-b"}
+        assert [s.openid for s in get_subscriptions_for_lake(db, 802, max_threshold=90)] == ["sub-a"]
+        assert get_subscriptions_for_lake(db, 802, max_threshold=84) == []
+    finally:
+        db.close()
+
+
+def test_index_prefix_lookup_and_refresh():
+    index = SubscriptionIndex()
+    index.load([(1, 70, "u1"), (1, 85, "u2"), (1, 90, "u3"), (2, 60, "u1")])
+    assert index.subscribers(1, 85) == ["u1", "u2"]
+    assert index.subscribers(1, 69) == []
+    assert index.subscribers(1, 100) == ["u1", "u2", "u3"]
+    assert index.subscribers(3, 100) == []
+
+    db = SessionLocal()
+    try:
+        upsert_subscription(db, "sub-idx", [811], threshold=75)
+        assert subscription_index.refresh(db) is True
+        assert subscription_index.refresh(db) is False
+        assert subscription_index.subscribers(811, 80) == ["sub-idx"]
+        upsert_subscription(db, "sub-idx", [811], threshold=90)
+        assert subscription_index.refresh(db) is True
+        assert subscription_index.subscribers(811, 80) == []
+    finally:
+        db.close()
+
+
+def test_push_check_only_queues_matching_subscribers():
+    db = SessionLocal()
+    try:
+        upsert_subscription(db, "push-low", [821], threshold=70)
+        upsert_subscription(db, "push-high", [821], threshold=99)
+        soon = (datetime.now() + timedelta(minutes=30)).astimezone().isoformat(timespec="minutes")
+        later = (datetime.now() + timedelta(hours=5)).isoformat()
+        preds = [
+            LakePrediction(lake_id=821, lake_name="821号盐湖", score=88, best_time=TimeWindow(start=soon, end=soon), updated_at=soon),
+            LakePrediction(lake_id=821, lake_name="821号盐湖", score=100, best_time=TimeWindow(start=later, end=later), updated_at=later),
+        ]
+        for _ in range(2):  # 重复刷新不重复入队
+            scheduler._check_and_trigger_push(db, preds)
+        queued = db.query(PushMessage).filter(PushMessage.lake_id == 821).all()
+        assert [(m.openid, m.window) for m in queued] == [("push-low", soon)]
+    finally:
+        db.close()
@@ -0,0 +1,109 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import attractions, community
+from app.services import thumbnails
+from app.utils.ui_templates import format_for_ui
+
+pytestmark = pytest.mark.skipif(thumbnails.cv2 is None, reason="需要 OpenCV")
+
+
+def _write_jpeg(path, width=1600, height=900):
+    img = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    ok, buf = thumbnails.cv2.imencode(".jpg", img, [thumbnails.cv2.IMWRITE_JPEG_QUALITY, 95])
+    assert ok
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(buf.tobytes())
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def _storage(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("THUMBNAIL_WIDTHS", "320,640")
+    monkeypatch.delenv("THUMBNAIL_FORMAT", raising=False)
+    thumbnails.forget_thumbnails()
+    yield
+    thumbnails.forget_thumbnails()
+
+
+def test_generate_derivatives_widths_and_formats(tmp_path):
+    src = _write_jpeg(tmp_path / "storage/attractions/cover.jpg")
+    out = thumbnails.generate_derivatives(src)
+    assert set(out) == {(320, "webp"), (320, "jpg"), (640, "webp"), (640, "jpg")}
+    small = thumbnails.cv2.imread(out[(320, "jpg")])
+    assert small.shape[:2] == (180, 320)
+    assert os.path.getsize(out[(320, "webp")]) < os.path.getsize(src) / 10
+
+    # 已是最新的衍生图不重复编码
+    mtime = os.path.getmtime(out[(640, "webp")])
+    thumbnails.generate_derivatives(src)
+    assert os.path.getmtime(out[(640, "webp")]) == mtime
+
+
+def test_thumbnail_url_falls_back_until_generated(tmp_path):
+    url = "/static/attractions/cover.jpg"
+    src = _write_jpeg(tmp_path / "storage/attractions/cover.jpg")
+    point = SimpleNamespace(name="天空之境", category="摄影型", description="d", cover_image=url)
+    assert format_for_ui(point)["ui_cover_thumbnail"] == url
+
+    assert thumbnails.backfill(["storage/attractions"]) == {"images": 1, "failed": 0}
+    ui = format_for_ui(point)
+    assert ui["ui_cover_image"] == url
+    assert ui["ui_cover_thumbnail"] == "/static/attractions/thumbs/cover_w320.webp"
+    assert thumbnails.thumbnail_url(url, width=500, fmt="jpg") == "/static/attractions/thumbs/cover_w640.jpg"
+    assert os.path.exists(src)
+
+
+def test_oss_urls_use_image_processing(monkeypatch):
+    monkeypatch.setenv("ALIYUN_OSS_BUCKET", "b")
+    monkeypatch.setenv("ALIYUN_OSS_ENDPOINT", "oss-cn-hangzhou.aliyuncs.com")
+    url = "https://b.oss-cn-hangzhou.aliyuncs.com/community/20260101/x.jpg"
+    assert thumbnails.thumbnail_url(url) == url + "?x-oss-process=image/resize,w_320/format,webp"
+    assert thumbnails.thumbnail_url("https://elsewhere.example.com/x.jpg") is None
+
+
+def test_uploads_generate_thumbnails(monkeypatch, tmp_path):
+    monkeypatch.setattr(community, "UPLOAD_DIR", "storage/community")
+    app = FastAPI()
+    app.include_router(attractions.router, prefix="/api")
+    app.include_router(community.router, prefix="/api/community")
+    client = TestClient(app)
+    data = open(_write_jpeg(tmp_path / "src.jpg"), "rb").read()
+
+    resp = client.post("/api/attractions/upload-image", files={"file": ("a.jpg", data, "image/jpeg")})
+    stem = os.path.splitext(resp.json()["file_path"].rsplit("/", 1)[-1])[0]
+    assert os.path.exists(f"storage/attractions/thumbs/{stem}_w320.webp")
+
+    post = client.post("/api/community/posts", files={"file": ("p.jpg", data, "image/jpeg")}).json()
+    assert post["thumbnail_url"].startswith("/static/community/thumbs/") and post["thumbnail_url"].endswith("_w320.webp")
+    listed = client.get("/api/community/posts").json()
+    assert any(p["thumbnail_url"] == post["thumbnail_url"] for p in listed)
+
+
+def test_encoder_failure_does_not_break_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(community, "UPLOAD_DIR", "storage/community")
+    real_imencode = thumbnails.cv2.imencode
+
+    def imencode(ext, img, params=()):
+        if ext == ".webp":
+            raise thumbnails.cv2.error("WebP codec not available")
+        return real_imencode(ext, img, params)
+
+    monkeypatch.setattr(thumbnails.cv2, "imencode", imencode)
+    src = _write_jpeg(tmp_path / "storage" / "attractions" / "cover.jpg")
+    out = thumbnails.generate_derivatives(src)
+    assert sorted(out) == [(320, "jpg"), (640, "jpg")]
+    assert not any(name.endswith(".part") for name in os.listdir(os.path.dirname(out[(320, "jpg")])))
+
+    app = FastAPI()
+    app.include_router(community.router, prefix="/api/community")
+    data = open(_write_jpeg(tmp_path / "p.jpg"), "rb").read()
+    resp = TestClient(app).post("/api/community/posts", files={"file": ("p.jpg", data, "image/jpeg")})
+    # WebP 编码失败时帖子照常创建，默认的 WebP 缩略图缺失，回退原图
+    assert resp.status_code == 200 and resp.json()["thumbnail_url"] == resp.json()["image_url"]
@@ -0,0 +1,85 @@
+import hashlib
+import io
+import os
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import attractions, community
+from app.utils.uploads import UploadTooLarge, save_stream
+
+
+class _ZeroStream(io.RawIOBase):
+    """按需生成的 size 字节数据流，本身不占用与 size 成比例的内存。"""
+
+    def __init__(self, size: int):
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        n = self.remaining if n < 0 else min(n, self.remaining)
+        self.remaining -= n
+        return b"\x7f" * n
+
+
+def test_save_stream_hashes_and_sizes(tmp_path):
+    data = os.urandom(300_000)
+    saved = save_stream(io.BytesIO(data), str(tmp_path / "a.bin"), chunk_size=64 * 1024)
+    assert saved.size == len(data)
+    assert saved.sha1 == hashlib.sha1(data).hexdigest()
+    assert (tmp_path / "a.bin").read_bytes() == data
+
+
+def test_save_stream_limit_removes_partial_file(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        save_stream(io.BytesIO(b"x" * 1000), str(tmp_path / "big.bin"), max_bytes=999, chunk_size=100)
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_stream_memory_is_constant(tmp_path):
+    chunk = 64 * 1024
+    tracemalloc.start()
+    try:
+        save_stream(_ZeroStream(32 * 1024 * 1024), str(tmp_path / "big.bin"), max_bytes=64 * 1024 * 1024, chunk_size=chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert (tmp_path / "big.bin").stat().st_size == 32 * 1024 * 1024
+    assert peak < 8 * chunk
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "1024")
+    monkeypatch.setattr(community, "UPLOAD_DIR", str(tmp_path / "community"))
+    app = FastAPI()
+    app.include_router(attractions.router, prefix="/api")
+    app.include_router(community.router, prefix="/api/community")
+    return TestClient(app)
+
+
+def test_attraction_upload_streams_and_enforces_limit(client, tmp_path):
+    ok = client.post("/api/attractions/upload-image", files={"file": ("a.jpg", b"x" * 1024, "image/jpeg")})
+    assert ok.status_code == 200
+    name = ok.json()["file_path"].rsplit("/", 1)[-1]
+    assert (tmp_path / "storage/attractions" / name).read_bytes() == b"x" * 1024
+
+    big = client.post("/api/attractions/upload-image", files={"file": ("b.jpg", b"x" * 1025, "image/jpeg")})
+    assert big.status_code == 413
+    assert os.listdir(tmp_path / "storage/attractions") == [name]
+
+
+def test_community_post_streams_and_enforces_limit(client, tmp_path):
+    ok = client.post("/api/community/posts", data={"caption": "hi"}, files={"file": ("p.jpg", b"y" * 10, "image/jpeg")})
+    assert ok.status_code == 200
+    name = ok.json()["image_url"].rsplit("/", 1)[-1]
+    assert (tmp_path / "community" / name).read_bytes() == b"y" * 10
+
+    big = client.post("/api/community/posts", files={"file": ("p.jpg", b"y" * 2048, "image/jpeg")})
+    assert big.status_code == 413
+    assert os.listdir(tmp_path / "community") == [name]
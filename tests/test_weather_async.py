@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import predictions, weather
+from app.services import prediction_snapshot, weather_client
+
+
+class _StubHeWeather(BaseHTTPRequestHandler):
+    """本地和风天气桩：任意 /v7/weather/{N}h 返回 24 条逐小时数据，响应延迟可调。"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        time.sleep(self.delay)
+        hourly = [
+            {"fxTime": f"2026-07-01T{i:02d}:00+08:00", "temp": "26", "humidity": "55", "uvIndex": "5",
+             "windSpeed": "3", "cloud": "10", "precip": "0.0", "vis": "20"}
+            for i in range(24)
+        ]
+        body = json.dumps({"code": "200", "hourly": hourly}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_weather(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHeWeather)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("HEWEATHER_API_KEY", "test-key")
+    monkeypatch.setenv("HEWEATHER_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    _StubHeWeather.hits = 0
+    _StubHeWeather.delay = 0.0
+    weather_client.clear_forecast_cache()
+    prediction_snapshot.clear_snapshot()
+    yield _StubHeWeather
+    server.shutdown()
+    weather_client.clear_forecast_cache()
+
+
+def test_async_forecast_coalesces_burst(stub_weather):
+    stub_weather.delay = 0.2
+
+    async def burst():
+        return await asyncio.gather(*(weather_client.get_forecast_async(days=1) for _ in range(50)))
+
+    results = asyncio.run(burst())
+    assert stub_weather.hits == 1
+    assert all(r is results[0] for r in results)
+    assert results[0]["source"] == "HeWeather"
+    assert results[0]["hours"][0]["time"] == "2026-07-01T00:00+08:00"
+
+
+def test_async_routes_use_stub(stub_weather):
+    app = FastAPI()
+    app.include_router(weather.router, prefix="/api/weather")
+    app.include_router(predictions.router, prefix="/api/prediction")
+    client = TestClient(app)
+
+    now2h = client.get("/api/weather/now2h").json()
+    assert now2h["source"] == "HeWeather"
+    assert len(now2h["next2h"]) == 2
+
+    today = client.get("/api/prediction/today")
+    assert today.status_code == 200
+    best = client.get("/api/prediction/today/best")
+    assert best.status_code == 200
+    assert best.json()["best"]["score"] == max(p["score"] for p in best.json()["all"])
+    # days=2 先请求 72h 端点（桩返回成功），之后 /today/best 命中缓存
+    assert stub_weather.hits == 2
+
+
+def test_async_client_from_previous_loop_is_closed():
+    async def client():
+        c = weather_client._get_async_client()
+        await asyncio.sleep(0)
+        return c
+
+    # 旧循环仍在运行：aclose 投递到旧循环执行
+    other = asyncio.new_event_loop()
+    runner = threading.Thread(target=other.run_forever, daemon=True)
+    runner.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(client(), other).result(5)
+        second = asyncio.run(client())
+        deadline = time.monotonic() + 5
+        while not first.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert first.is_closed and second is not first
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        runner.join(5)
+        other.close()
+
+    # 旧循环已关闭：在新循环上关闭
+    third = asyncio.run(client())
+    assert second.is_closed and third is not second
+
+    # 关闭钩子：关闭当前循环上的客户端
+    async def shutdown():
+        c = await client()
+        await weather_client.close_async_client()
+        return c
+
+    last = asyncio.run(shutdown())
+    assert last.is_closed and weather_client._async_client is None
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from app.services import weather_client
+
+
+def _fake_fetch(calls, delay=0.0):
+    def fetch(days):
+        calls.append(days)
+        time.sleep(delay)
+        return {"source": "stub", "hours": [{"time": f"call-{len(calls)}"}]}, True
+    return fetch
+
+
+def test_forecast_cache_hits_and_coalesces(monkeypatch):
+    calls = []
+    monkeypatch.setattr(weather_client, "_fetch_forecast", _fake_fetch(calls, delay=0.2))
+    weather_client.clear_forecast_cache()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(weather_client.get_forecast(days=2))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    weather_client.get_forecast(days=2)
+    stats = weather_client.get_forecast_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] + stats["hits"] == 8
+    assert stats["upstream_calls"] == 1
+
+
+def test_forecast_cache_serves_stale_and_refreshes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(weather_client, "_fetch_forecast", _fake_fetch(calls))
+    monkeypatch.setenv("WEATHER_CACHE_TTL", "0.05")
+    monkeypatch.setenv("WEATHER_CACHE_STALE", "60")
+    weather_client.clear_forecast_cache()
+
+    first = weather_client.get_forecast(days=1)
+    time.sleep(0.1)
+    monkeypatch.setenv("WEATHER_CACHE_TTL", "60")
+    assert weather_client.get_forecast(days=1) is first  # 过期后先返回旧值
+    for _ in range(50):
+        if len(calls) == 2:
+            break
+        time.sleep(0.01)
+    assert len(calls) == 2
+    assert weather_client.get_forecast(days=1)["hours"][0]["time"] == "call-2"
+    assert weather_client.get_forecast_cache_stats()["stale_hits"] == 1
+
+
+def test_failed_refresh_keeps_stale_entry(monkeypatch):
+    calls = []
+    ok_fetch = _fake_fetch(calls)
+
+    def fetch(days):
+        if calls:
+            calls.append(days)
+            return {"source": "dummy", "hours": []}, False
+        return ok_fetch(days)
+
+    monkeypatch.setattr(weather_client, "_fetch_forecast", fetch)
+    monkeypatch.setenv("WEATHER_CACHE_TTL", "0.05")
+    monkeypatch.setenv("WEATHER_CACHE_STALE", "60")
+    weather_client.clear_forecast_cache()
+
+    first = weather_client.get_forecast(days=1)
+    time.sleep(0.1)
+    assert weather_client.get_forecast(days=1) is first
+    for _ in range(50):
+        if len(calls) == 2 and not weather_client._forecast_cache._inflight:
+            break
+        time.sleep(0.01)
+    assert len(calls) == 2
+    # 刷新失败不覆盖旧值，且在 WEATHER_CACHE_FAIL_TTL 内不再重复刷新
+    assert weather_client.get_forecast(days=1) is first
+    assert len(calls) == 2